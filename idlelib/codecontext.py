@@ -96,8 +96,11 @@ class CodeContext:
         If self.context doesn't exist, create it to match the size of the editor
         window text (toggle on).  If it does exist, destroy it (toggle off).
         Return 'break' to complete the processing of the binding.
+        Code context is not shown in large file mode.
         """
         if self.context is None:
+            if getattr(self.editwin, 'large_file', False):
+                return "break"
             # Calculate the border width and horizontal padding required to
             # align the context with the text in the main Text widget.
             #
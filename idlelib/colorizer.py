@@ -1,6 +1,10 @@
+from array import array
+from bisect import bisect_right
 import builtins
 import keyword
+import queue
 import re
+import threading
 import time
 
 from idlelib.config import idleConf
@@ -16,6 +20,10 @@ def any(name, alternates):
 
 def make_pat():
     kw = r"\b" + any("KEYWORD", keyword.kwlist) + r"\b"
+    definition = (
+        r"\b(?P<DEF_KEYWORD>def|class)\b" +
+        r"(?=\s+(?P<DEFINITION>\w+)|)"  # the name, if any, is lexed again
+    )
     match_softkw = (
         r"^[ \t]*" +  # at beginning of line + possible indentation
         r"(?P<MATCH_SOFTKW>match)\b" +
@@ -54,7 +62,7 @@ def make_pat():
     dq3string = stringprefix + r'"""[^"\\]*((\\.|"(?!""))[^"\\]*)*(""")?'
     string = any("STRING", [sq3string, dq3string, sqstring, dqstring])
     prog = re.compile("|".join([
-                                builtin, comment, string, kw,
+                                builtin, comment, string, definition, kw,
                                 match_softkw, case_default,
                                 case_softkw_and_pattern,
                                 any("SYNC", [r"\n"]),
@@ -70,7 +78,28 @@ prog_group_name_to_tag = {
     "CASE_SOFTKW": "KEYWORD",
     "CASE_DEFAULT_UNDERSCORE": "KEYWORD",
     "CASE_SOFTKW2": "KEYWORD",
+    "DEF_KEYWORD": "KEYWORD",
+}
+# The (group, tag) pairs to color for each m.lastgroup of a prog match.
+# A match has several named groups only when its last one follows them.
+prog_lastgroup_tags = {
+    name: ((name, prog_group_name_to_tag.get(name, name)),)
+    for name in prog.groupindex
 }
+prog_lastgroup_tags["CASE_DEFAULT_UNDERSCORE"] = (
+    ("CASE_SOFTKW", "KEYWORD"),
+    ("CASE_DEFAULT_UNDERSCORE", "KEYWORD"),
+)
+prog_lastgroup_tags["DEFINITION"] = (
+    ("DEF_KEYWORD", "KEYWORD"),
+    ("DEFINITION", "DEFINITION"),
+)
+
+# Lexer states at the start of a line: outside any string, or inside a
+# string opened by the quotes at that index of state_quotes.
+UNKNOWN_STATE = -1
+state_quotes = ("", "'", '"', "'''", '"""')
+quotes_state = {q: i for i, q in enumerate(state_quotes) if q}
 
 
 def matched_named_groups(re_match):
@@ -78,6 +107,34 @@ def matched_named_groups(re_match):
     return ((k, v) for (k, v) in re_match.groupdict().items() if v)
 
 
+def line_starts(chars):
+    "Return the offsets of the starts of the lines in chars."
+    starts = [0]
+    find = chars.find
+    i = find('\n')
+    while i >= 0:
+        starts.append(i + 1)
+        i = find('\n', i + 1)
+    return starts
+
+
+def offsets_to_indexes(starts, head, offsets):
+    """Return 'line.col' text indexes for offsets into some text.
+
+    starts are the line_starts() of text found at index head.  Absolute
+    indexes, unlike head+Nc, do not make Tk count characters from head.
+    """
+    line, col = map(int, head.split('.'))
+    indexes = []
+    for offset in offsets:
+        n = bisect_right(starts, offset) - 1
+        if n:
+            indexes.append(f"{line + n}.{offset - starts[n]}")
+        else:
+            indexes.append(f"{line}.{col + offset}")
+    return indexes
+
+
 def color_config(text):
     """Set color options of Text widget.
 
@@ -113,7 +170,42 @@ class ColorDelegator(Delegator):
         colorizing: Boolean flag when colorizing is in process.
         stop_colorizing: Boolean flag to end an active colorizing
                 process.
+        view_colorized: (first, last) indexes of the lines last
+                colorized by colorize_view(), or None.
+        line_states: array with the lexer state at the start of each
+                line, for line number n at [n - 1], as of the last
+                time the line was colorized.  Missing or UNKNOWN_STATE
+                for lines not colorized yet.
+        version: Count of text changes, to recognize stale results.
+        thread_job: (version, results queue, cancel event) of the
+                worker thread started by start_thread(), or None.
+        thread_mark: Index where the next section from the worker
+                thread goes.
+        poll_id: Identifier for scheduled poll_thread() call.
+
+    Class variables:
+        view_first: Colorize the visible lines before the text above
+                them.
+        view_margin: Number of lines above and below the view that
+                colorize_view() includes.
+        view_only: Colorize only the lines in view, checking for a
+                change of view every view_interval milliseconds.  For
+                texts too large to colorize in full; strings that start
+                more than view_margin lines above the view are missed.
+        time_slice: Seconds recolorize() works before letting Tk
+                handle other events.
+        threaded: Lex what is left after the first time slice in a
+                worker thread, leaving only tagging to the Tk thread.
+        thread_lines: Number of lines in a section lexed by the worker
+                thread.
     """
+    view_first = True
+    view_only = False
+    view_interval = 100
+    view_margin = 50
+    time_slice = 0.05
+    threaded = True
+    thread_lines = 500
 
     def __init__(self):
         Delegator.__init__(self)
@@ -128,6 +220,12 @@ class ColorDelegator(Delegator):
         self.allow_colorizing = True
         self.stop_colorizing = False
         self.colorizing = False
+        self.view_colorized = None
+        self.line_states = array('b', [0])
+        self.version = 0
+        self.thread_job = None
+        self.thread_mark = None
+        self.poll_id = None
 
     def setdelegate(self, delegate):
         """Set the delegate for this instance.
@@ -144,6 +242,7 @@ class ColorDelegator(Delegator):
             self.unbind("<<toggle-auto-coloring>>")
         Delegator.setdelegate(self, delegate)
         if delegate is not None:
+            self.line_states = array('b', [0])
             self.config_colors()
             self.bind("<<toggle-auto-coloring>>", self.toggle_colorize_event)
             self.notify_range("1.0", "end")
@@ -151,6 +250,7 @@ class ColorDelegator(Delegator):
             # No delegate - stop any colorizing.
             self.stop_colorizing = True
             self.allow_colorizing = False
+            self.stop_thread()
 
     def config_colors(self):
         "Configure text widget tags with colors from tagdefs."
@@ -178,21 +278,37 @@ class ColorDelegator(Delegator):
             }
         if DEBUG: print('tagdefs', self.tagdefs)
 
+    def _text_index(self, index):
+        "Return index as line.col, at most the index of the final newline."
+        index = self.index(index)
+        if self.compare(index, ">", "end-1c"):
+            # Text never changes anything after the final newline.
+            index = self.index("end-1c")
+        return index
+
     def insert(self, index, chars, tags=None):
         "Insert chars into widget at index and mark for colorizing."
-        index = self.index(index)
+        index = self._text_index(index)
         self.delegate.insert(index, chars, tags)
+        if newlines := chars.count("\n"):
+            line = int(float(index))
+            unknown = array('b', [UNKNOWN_STATE]) * newlines
+            self.line_states[line:line] = unknown
         self.notify_range(index, index + "+%dc" % len(chars))
 
     def delete(self, index1, index2=None):
         "Delete chars between indexes and mark for colorizing."
-        index1 = self.index(index1)
+        index1 = self._text_index(index1)
+        last = self._text_index(index2 if index2 else index1 + "+1c")
         self.delegate.delete(index1, index2)
+        del self.line_states[int(float(index1)):int(float(last))]
         self.notify_range(index1)
 
     def notify_range(self, index1, index2=None):
         "Mark text changes for processing and restart colorizing, if active."
         self.tag_add("TODO", index1, index2)
+        self.view_colorized = None
+        self.version += 1
         if self.after_id:
             if DEBUG: print("colorizing already scheduled")
             return
@@ -210,6 +326,7 @@ class ColorDelegator(Delegator):
             self.after_id = None
             if DEBUG: print("cancel scheduled recolorizer")
             self.after_cancel(after_id)
+        self.stop_thread()
         self.allow_colorizing = False
         self.stop_colorizing = True
 
@@ -257,29 +374,47 @@ class ColorDelegator(Delegator):
         if self.colorizing:
             if DEBUG: print("already colorizing")
             return
+        self.stop_thread()
         try:
             self.stop_colorizing = False
             self.colorizing = True
             if DEBUG: print("colorizing...")
             t0 = time.perf_counter()
-            self.recolorize_main()
+            self.recolorize_main(t0 + self.time_slice)
             t1 = time.perf_counter()
             if DEBUG: print("%.3f seconds" % (t1-t0))
         finally:
             self.colorizing = False
         if self.allow_colorizing and self.tag_nextrange("TODO", "1.0"):
-            if DEBUG: print("reschedule colorizing")
-            self.after_id = self.after(1, self.recolorize)
-
-    def recolorize_main(self):
-        "Evaluate text and apply colorizing tags."
+            if self.view_only:
+                self.after_id = self.after(self.view_interval,
+                                           self.recolorize)
+            elif self.threaded and not self.stop_colorizing:
+                self.start_thread()
+            else:
+                if DEBUG: print("reschedule colorizing")
+                self.after_id = self.after(1, self.recolorize)
+
+    def recolorize_main(self, deadline=None):
+        """Evaluate text and apply colorizing tags.
+
+        Each TODO range is lexed from the closest point before it with
+        a known lexer state: a SYNC tag or a line start recorded in
+        line_states.  Lexing goes on past the range until the state at
+        a line start is the one recorded there before.
+
+        If deadline, a time.perf_counter() value, passes first, stop
+        and leave the rest for the next call.  If view_only, only
+        colorize the view.
+        """
+        if self.view_first or self.view_only:
+            self.colorize_view()
+        if self.view_only:
+            return
         next = "1.0"
         while todo_tag_range := self.tag_nextrange("TODO", next):
             self.tag_remove("SYNC", todo_tag_range[0], todo_tag_range[1])
-            sync_tag_range = self.tag_prevrange("SYNC", todo_tag_range[0])
-            head = sync_tag_range[1] if sync_tag_range else "1.0"
-
-            chars = ""
+            head, state = self._restart_point(todo_tag_range[0])
             next = head
             lines_to_get = 1
             ok = False
@@ -288,20 +423,14 @@ class ColorDelegator(Delegator):
                 next = self.index(mark + "+%d lines linestart" %
                                          lines_to_get)
                 lines_to_get = min(lines_to_get * 2, 100)
-                ok = "SYNC" in self.tag_names(next + "-1c")
-                line = self.get(mark, next)
-                ##print head, "get", mark, next, "->", repr(line)
-                if not line:
+                chars = self.get(mark, next)
+                ##print head, "get", mark, next, "->", repr(chars)
+                if not chars:
                     return
-                for tag in self.tagdefs:
-                    self.tag_remove(tag, mark, next)
-                chars += line
-                self._add_tags_in_section(chars, head)
-                if "SYNC" in self.tag_names(next + "-1c"):
-                    head = next
-                    chars = ""
-                else:
-                    ok = False
+                starts = line_starts(chars)
+                ranges, states = self._section_ranges(chars, starts, state)
+                ok = self._apply_section(mark, next, starts, ranges, states)
+                state = states[-1] if states else 0
                 if not ok:
                     # We're in an inconsistent state, and the call to
                     # update may tell us to stop.  It may also change
@@ -314,40 +443,223 @@ class ColorDelegator(Delegator):
                 if self.stop_colorizing:
                     if DEBUG: print("colorizing stopped")
                     return
+                if deadline is not None and time.perf_counter() > deadline:
+                    if DEBUG: print("colorizing paused")
+                    return
+                if self.view_first:
+                    self.colorize_view()
 
-    def _add_tag(self, start, end, head, matched_group_name):
-        """Add a tag to a given range in the text widget.
-
-        This is a utility function, receiving the range as `start` and
-        `end` positions, each of which is a number of characters
-        relative to the given `head` index in the text widget.
+    def _apply_section(self, mark, next, starts, ranges, states):
+        """Replace the tags from mark to next; return True if in sync.
 
-        The tag to add is determined by `matched_group_name`, which is
-        the name of a regular expression "named group" as matched by
-        by the relevant highlighting regexps.
+        The text from mark to next was lexed into ranges and states
+        by _section_ranges().  In sync means that the lexer state at
+        next is the one recorded before and that next is not TODO, so
+        the text after it needs no new tags.
         """
-        tag = prog_group_name_to_tag.get(matched_group_name,
-                                         matched_group_name)
-        self.tag_add(tag,
-                     f"{head}+{start:d}c",
-                     f"{head}+{end:d}c")
-
-    def _add_tags_in_section(self, chars, head):
-        """Parse and add highlighting tags to a given part of the text.
-
-        `chars` is a string with the text to parse and to which
-        highlighting is to be applied.
+        synced = "SYNC" in self.tag_names(next + "-1c")
+        for tag in self.tagdefs:
+            self.tag_remove(tag, mark, next)
+        for tag, offsets in ranges.items():
+            self.tag_add(tag, *offsets_to_indexes(starts, mark, offsets))
+        old = self._store_states(int(float(mark)), states)
+        if old == UNKNOWN_STATE and synced:
+            old = 0
+        state = states[-1] if states else 0
+        return state == old and "TODO" not in self.tag_names(next)
+
+    def start_thread(self):
+        """Lex the text from the first TODO range on in a worker thread.
+
+        The thread queues the tag ranges and line states of each
+        section of thread_lines lines.  poll_thread() tags them in the
+        Tk thread as long as the text is unchanged.
+        """
+        todo = self.tag_nextrange("TODO", "1.0")
+        head, state = self._restart_point(todo[0])
+        chars = self.get(head, "end")
+        results = queue.SimpleQueue()
+        cancel = threading.Event()
+        self.thread_job = (self.version, results, cancel)
+        self.thread_mark = head
+        threading.Thread(target=self._lex_sections,
+                         args=(chars, state, results, cancel),
+                         daemon=True).start()
+        if DEBUG: print("colorizing in thread from", head)
+        self.poll_id = self.after(1, self.poll_thread)
+
+    def _lex_sections(self, chars, state, results, cancel):
+        "Run in the worker thread: queue sections of chars, then None."
+        starts = line_starts(chars)
+        last = len(starts) - 1
+        for first in range(0, last, self.thread_lines):
+            if cancel.is_set():
+                return
+            end = min(first + self.thread_lines, last)
+            offset = starts[first]
+            section = chars[offset:starts[end]]
+            section_starts = [i - offset for i in starts[first:end + 1]]
+            ranges, states = self._section_ranges(section, section_starts,
+                                                  state)
+            state = states[-1]
+            results.put((section_starts, ranges, states))
+        results.put(None)
+
+    def poll_thread(self):
+        "Tag the sections lexed by the worker thread so far."
+        self.poll_id = None
+        version, results, cancel = self.thread_job
+        if (not self.delegate or not self.allow_colorizing
+                or version != self.version):
+            self.stop_thread()  # recolorize() is scheduled after a change.
+            return
+        if self.view_first:
+            self.colorize_view()
+        deadline = time.perf_counter() + self.time_slice
+        while time.perf_counter() < deadline:
+            try:
+                section = results.get_nowait()
+            except queue.Empty:
+                self.poll_id = self.after(20, self.poll_thread)
+                return
+            if section is None:
+                break
+            mark = self.thread_mark
+            starts, ranges, states = section
+            next = f"{int(float(mark)) + len(states)}.0"
+            if self._apply_section(mark, next, starts, ranges, states):
+                break
+            self.tag_add("TODO", next)  # Resume here if stopped.
+            self.thread_mark = next
+        else:
+            self.poll_id = self.after(1, self.poll_thread)
+            return
+        # Done or back in sync; there may be other TODO ranges.
+        self.stop_thread()
+        if self.tag_nextrange("TODO", "1.0") and not self.after_id:
+            self.after_id = self.after(1, self.recolorize)
 
-            `head` is the index in the text widget where the text is found.
+    def stop_thread(self):
+        "Stop using the worker thread started by start_thread()."
+        if self.poll_id:
+            self.after_cancel(self.poll_id)
+            self.poll_id = None
+        if self.thread_job:
+            self.thread_job[2].set()
+            self.thread_job = None
+
+    def _restart_point(self, index, limit=None):
+        """Return where to start lexing to colorize text at index.
+
+        Return the index and lexer state of the last SYNC point or line
+        start with a known state at or before index, but not before
+        line number limit.  If there is none, return (None, 0).
+        """
+        line = int(float(index))
+        if limit is None:
+            sync = self.tag_prevrange("SYNC", index)
+            first = 1
+        else:
+            sync = self.tag_prevrange("SYNC", index, f"{limit}.0")
+            first = limit
+        if sync:
+            first = int(float(sync[1])) + 1
+        states = self.line_states
+        for n in range(min(line, len(states)), first - 1, -1):
+            if states[n - 1] != UNKNOWN_STATE:
+                return f"{n}.0", states[n - 1]
+        if sync:
+            return sync[1], 0
+        return ("1.0" if first == 1 else None), 0
+
+    def _store_states(self, line, states):
+        """Record states of the lines after line; return the old last one.
+
+        states[i] is the lexer state at the start of line + i + 1.
+        """
+        table = self.line_states
+        end = line + len(states)
+        old = table[end - 1] if end <= len(table) else UNKNOWN_STATE
+        if len(table) < end:
+            table.extend([UNKNOWN_STATE] * (end - len(table)))
+        table[line:end] = array('b', states)
+        return old
+
+    def colorize_view(self):
+        """Colorize the visible lines if text above them is still TODO.
+
+        recolorize_main() works down from the top of the text, so the
+        lines in view, plus view_margin lines on each side, are done
+        here first.  The lexer state at the start of these lines is
+        not known yet; it is taken from the nearest synchronization
+        point or recorded line state within the margin, or else assumed
+        to be outside any string.  The lines stay tagged TODO so that
+        recolorize_main() checks them when it gets there.
+        """
+        margin = self.view_margin
+        first = self.index(f"@0,0 -{margin} lines linestart")
+        last = self.index(f"@0,{self.winfo_height()} +{margin + 1} lines"
+                          " linestart")
+        if (first, last) == self.view_colorized:
+            return
+        if not (self.view_only or self.tag_nextrange("TODO", "1.0", first)):
+            return  # recolorize_main() gets to the view first.
+        if not ("TODO" in self.tag_names(first) or
+                self.tag_nextrange("TODO", first, last)):
+            return
+        if DEBUG: print("colorizing view", first, last)
+        self.view_colorized = (first, last)
+        head, state = self._restart_point(
+                first, max(1, int(float(first)) - margin))
+        head = head or first
+        for tag in self.tagdefs:
+            if tag not in ("SYNC", "TODO"):
+                self.tag_remove(tag, head, last)
+        self.tag_add("TODO", head, last)
+        chars = self.get(head, last)
+        starts = line_starts(chars)
+        ranges, states = self._section_ranges(chars, starts, state)
+        ranges.pop("SYNC", None)
+        for tag, offsets in ranges.items():
+            self.tag_add(tag, *offsets_to_indexes(starts, head, offsets))
+
+    def _section_ranges(self, chars, starts, state=0):
+        """Return tag ranges and line states for a section of text.
+
+        The ranges map tags to lists of start, end offsets into chars.
+        The states are those at starts[1:], the line_starts(chars) after
+        the first, given the lexer state at the start of chars.
         """
-        for m in self.prog.finditer(chars):
-            for name, matched_text in matched_named_groups(m):
+        # A string continued from above is lexed from its quotes.
+        quotes = state_quotes[state]
+        shift = len(quotes)
+        states = [0] * (len(starts) - 1)
+        text = quotes + chars
+        ranges = {}
+        groups = {
+            last: tuple((name, ranges.setdefault(tag, []).extend)
+                        for name, tag in pairs)
+            for last, pairs in prog_lastgroup_tags.items()
+        }
+        for m in self.prog.finditer(text):
+            last = m.lastgroup
+            for name, extend in groups[last]:
                 a, b = m.span(name)
-                self._add_tag(a, b, head, name)
-                if matched_text in ("def", "class"):
-                    if m1 := self.idprog.match(chars, b):
-                        a, b = m1.span(1)
-                        self._add_tag(a, b, head, "DEFINITION")
+                if shift:
+                    a, b = max(a - shift, 0), b - shift
+                extend((a, b))
+            if last == "STRING":
+                matched_text = m[last]
+                if "\n" in matched_text:
+                    # Lines starting after a newline in the string.
+                    body = matched_text.lstrip("rRbBuUfF")
+                    inside = (quotes_state.get(body[:3]) or
+                              quotes_state[body[0]])
+                    for i in range(bisect_right(starts, a) - 1,
+                                   bisect_right(starts, b) - 1):
+                        states[i] = inside
+        ranges = {tag: offsets for tag, offsets in ranges.items() if offsets}
+        return ranges, states
 
     def removecolors(self):
         "Remove all colorizing tags."
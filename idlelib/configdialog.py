@@ -34,12 +34,13 @@ from idlelib.codecontext import CodeContext
 from idlelib.parenmatch import ParenMatch
 from idlelib.format import FormatParagraph
 from idlelib.squeezer import Squeezer
+from idlelib.scrollback import Scrollback
 from idlelib.textview import ScrollableTextFrame
 
 changes = ConfigChanges()
 # Reload changed options in the following classes.
 reloadables = (AutoComplete, CodeContext, ParenMatch, FormatParagraph,
-               Squeezer)
+               Squeezer, Scrollback)
 
 
 class ConfigDialog(Toplevel):
@@ -101,6 +101,35 @@ class IdbAdapter:
         stack = [(wrap_frame(frame2), k) for frame2, k in stack]
         return stack, i
 
+    def get_snapshot(self, fid, tbid, with_globals=False):
+        """Return in one call what the debugger GUI shows for a stop.
+
+        The result is a dict with 'fid' and 'tbid' as passed, 'stack' and
+        'index' as from get_stack(), 'frames' mapping each frame ID to
+        (f_lineno, co_name, co_filename, locals ID, globals ID, repr of
+        the globals' __name__ or None), and 'dicts' mapping the locals ID
+        of frame fid, and its globals ID if with_globals, to
+        dict_snapshot().  The namespaces of other frames are fetched only
+        if they are selected.
+        """
+        stack, i = self.get_stack(fid, tbid)
+        frames = {}
+        for fid2 in [fid2 for fid2, k in stack] + [fid]:
+            if fid2 in frames:
+                continue
+            frame = frametable[fid2]
+            code = frame.f_code
+            name = frame.f_globals.get('__name__')
+            frames[fid2] = (frame.f_lineno, code.co_name, code.co_filename,
+                            self.frame_locals(fid2), self.frame_globals(fid2),
+                            None if name is None else reprlib.repr(name))
+        lid, gid = frames[fid][3:5]
+        dicts = {lid: self.dict_snapshot(lid)}
+        if with_globals and gid not in dicts:
+            dicts[gid] = self.dict_snapshot(gid)
+        return {'fid': fid, 'tbid': tbid, 'stack': stack, 'index': i,
+                'frames': frames, 'dicts': dicts}
+
     def run(self, cmd):
         import __main__
         self.idb.run(cmd, __main__.__dict__)
@@ -170,6 +199,11 @@ class IdbAdapter:
         value = dicttable[did][key]
         return reprlib.repr(value) # Can't pickle module 'builtins'.
 
+    def dict_snapshot(self, did):
+        "Return a dict of the keys and dict_item() values of a dict."
+        return {key: reprlib.repr(value)
+                for key, value in dicttable[did].items()}
+
 #----------end class IdbAdapter----------
 
 
@@ -196,12 +230,19 @@ def start_debugger(rpchandler, gui_adap_oid):
 
 
 class FrameProxy:
+    """Frame in the subprocess.
+
+    Attributes are read from snapshot, an IdbAdapter.get_snapshot()
+    result, if it has them, else fetched with one call each.
+    """
 
-    def __init__(self, conn, fid):
+    def __init__(self, conn, fid, snapshot=None):
         self._conn = conn
         self._fid = fid
         self._oid = "idb_adapter"
         self._dictcache = {}
+        self._snapshot = snapshot
+        self._info = snapshot and snapshot['frames'].get(fid)
 
     def __getattr__(self, name):
         if name[:1] == "_":
@@ -212,39 +253,54 @@ class FrameProxy:
             return self._get_f_globals()
         if name == "f_locals":
             return self._get_f_locals()
+        if name == "f_lineno" and self._info:
+            return self._info[0]
         return self._conn.remotecall(self._oid, "frame_attr",
                                      (self._fid, name), {})
 
     def _get_f_code(self):
+        if self._info:
+            return CodeProxy(self._conn, self._oid, None,
+                             co_name=self._info[1], co_filename=self._info[2])
         cid = self._conn.remotecall(self._oid, "frame_code", (self._fid,), {})
         return CodeProxy(self._conn, self._oid, cid)
 
     def _get_f_globals(self):
+        if self._info:
+            name = self._info[5]
+            return self._get_dict_proxy(
+                    self._info[4], None if name is None else {'__name__': name})
         did = self._conn.remotecall(self._oid, "frame_globals",
                                     (self._fid,), {})
         return self._get_dict_proxy(did)
 
     def _get_f_locals(self):
+        if self._info:
+            return self._get_dict_proxy(self._info[3])
         did = self._conn.remotecall(self._oid, "frame_locals",
                                     (self._fid,), {})
         return self._get_dict_proxy(did)
 
-    def _get_dict_proxy(self, did):
+    def _get_dict_proxy(self, did, known=None):
         if did in self._dictcache:
             return self._dictcache[did]
-        dp = DictProxy(self._conn, self._oid, did)
+        items = self._snapshot and self._snapshot['dicts'].get(did)
+        dp = DictProxy(self._conn, self._oid, did, items, known)
         self._dictcache[did] = dp
         return dp
 
 
 class CodeProxy:
 
-    def __init__(self, conn, oid, cid):
+    def __init__(self, conn, oid, cid, **attrs):
         self._conn = conn
         self._oid = oid
         self._cid = cid
+        self._attrs = attrs  # Known co_name and co_filename.
 
     def __getattr__(self, name):
+        if name in self._attrs:
+            return self._attrs[name]
         if name == "co_name":
             return self._conn.remotecall(self._oid, "code_name",
                                          (self._cid,), {})
@@ -254,21 +310,35 @@ class CodeProxy:
 
 
 class DictProxy:
+    """Dict in the subprocess, with the reprs of its values as values.
 
-    def __init__(self, conn, oid, did):
+    items, the dict from IdbAdapter.dict_snapshot(), is fetched by the
+    first keys() call if not given.  known holds values already known
+    without it, such as the __name__ of globals for the stack viewer.
+    """
+
+    def __init__(self, conn, oid, did, items=None, known=None):
         self._conn = conn
         self._oid = oid
         self._did = did
+        self._items = items
+        self._known = known or {}
 
 ##    def keys(self):
 ##        return self._conn.remotecall(self._oid, "dict_keys", (self._did,), {})
 
     # 'temporary' until dict_keys is a pickleable built-in type
     def keys(self):
-        return self._conn.remotecall(self._oid,
-                                     "dict_keys_list", (self._did,), {})
+        if self._items is None:
+            self._items = self._conn.remotecall(self._oid, "dict_snapshot",
+                                                (self._did,), {})
+        return list(self._items)
 
     def __getitem__(self, key):
+        if self._items is not None:
+            return self._items[key]
+        if key in self._known:
+            return self._known[key]
         return self._conn.remotecall(self._oid, "dict_item",
                                      (self._did, key), {})
 
@@ -285,7 +355,13 @@ class GUIAdapter:
 
     def interaction(self, message, fid, modified_info):
         ##print("*** Interaction: (%s, %s, %s)" % (message, fid, modified_info))
-        frame = FrameProxy(self.conn, fid)
+        tbid = modified_info[2] if modified_info else None
+        # Globals are snapshot only if the GUI is showing them.
+        vglobals = self.gui.vglobals
+        with_globals = bool(vglobals and vglobals.get())
+        snapshot = self.conn.remotecall(idb_adap_oid, "get_snapshot",
+                                        (fid, tbid, with_globals), {})
+        frame = FrameProxy(self.conn, fid, snapshot)
         self.gui.interaction(message, frame, modified_info)
 
 
@@ -308,9 +384,15 @@ class IdbProxy:
         self.shell.interp.active_seq = seq
 
     def get_stack(self, frame, tbid):
-        # passing frame and traceback IDs, not the objects themselves
-        stack, i = self.call("get_stack", frame._fid, tbid)
-        stack = [(FrameProxy(self.conn, fid), k) for fid, k in stack]
+        snapshot = frame._snapshot
+        if (snapshot and snapshot['fid'] == frame._fid and
+                snapshot['tbid'] == tbid):
+            stack, i = snapshot['stack'], snapshot['index']
+        else:
+            # passing frame and traceback IDs, not the objects themselves
+            stack, i = self.call("get_stack", frame._fid, tbid)
+        stack = [(FrameProxy(self.conn, fid, snapshot), k)
+                 for fid, k in stack]
         return stack, i
 
     def set_continue(self):
@@ -17,6 +17,7 @@ from tkinter import messagebox
 
 from idlelib.config import idleConf
 from idlelib import configdialog
+from idlelib.delegator import Delegator
 from idlelib import grep
 from idlelib import help
 from idlelib import help_about
@@ -72,6 +73,13 @@ class EditorWindow:
     allow_line_numbers = True
     user_input_insert_tags = None
 
+    # Files with at least this many characters or lines are edited in
+    # large file mode; see set_large_file().
+    large_file = False
+    large_file_chars = 10_000_000
+    large_file_lines = 200_000
+    large_file_undo_chars = 1_000_000
+
     def __init__(self, flist=None, filename=None, key=None, root=None):
         # Delay import: runscript imports pyshell imports EditorWindow.
         from idlelib.runscript import ScriptBinding
@@ -233,6 +241,9 @@ class EditorWindow:
         # Making the initial values larger slows things down more often.
         self.num_context_lines = 50, 500, 5000000
         self.per = per = self.Percolator(text)
+        # Below undo, to also see the changes undo and redo make.
+        self.parse = ParseDelegator()
+        per.insertfilter(self.parse)
         self.undo = undo = self.UndoDelegator()
         per.insertfilter(undo)
         text.undo_block_start = undo.undo_block_start
@@ -325,6 +336,8 @@ class EditorWindow:
             text.bind("<<toggle-line-numbers>>", self.toggle_line_numbers_event)
         else:
             self.update_menu_state('options', '*行号*', 'disabled')
+        if self.large_file:
+            self.set_large_file(True)
 
         # Rebind F-keys for Chinese IME fix
         if hasattr(self, '_rebind_f_keys'):
@@ -415,6 +428,30 @@ class EditorWindow:
         self.status_bar.set_label('column', '列: %s' % column)
         self.status_bar.set_label('line', '行: %s' % line)
 
+    def is_large_file(self, chars):
+        "Return True if chars should be edited in large file mode."
+        return (len(chars) >= self.large_file_chars or
+                chars.count('\n') >= self.large_file_lines)
+
+    def set_large_file(self, flag):
+        """Turn large file mode on or off.
+
+        In large file mode, only the lines in view are colorized, undo
+        keeps at most large_file_undo_chars characters, and code context
+        is not available.  The status bar shows the mode.
+        """
+        self.large_file = flag
+        self.undo.max_undo_chars = self.large_file_undo_chars if flag else None
+        if self.color:
+            self.color.view_only = flag
+        if self.code_context is not None:
+            if flag and self.code_context.context is not None:
+                self.code_context.toggle_code_context_event()
+            self.update_menu_state('options', '*代码上文*',
+                                   'disabled' if flag else 'normal')
+        self.status_bar.set_label('large_file', '大文件模式' if flag else '',
+                                  side=RIGHT)
+
 
     """ Menu definitions and functions.
     * self.menubar - the always visible horizontal menu bar.
@@ -802,6 +839,7 @@ class EditorWindow:
             self.color = self.ColorDelegator()
         # can add more colorizers here...
         if self.color:
+            self.color.view_only = self.large_file
             self.per.insertfilterafter(filter=self.color, after=self.undo)
 
     def _rmcolorizer(self):
@@ -1116,6 +1154,7 @@ class EditorWindow:
         self.io.close()
         self.io = None
         self.undo = None
+        self.parse = None
         if self.color:
             self.color.close()
             self.color = None
@@ -1514,16 +1553,22 @@ class EditorWindow:
             lno = index2line(text.index('insert'))
             y = pyparse.Parser(self.indentwidth, self.tabwidth)
             if not self.prompt_last_line:
-                for context in self.num_context_lines:
-                    startat = max(lno - context, 1)
-                    startatindex = repr(startat) + ".0"
-                    rawtext = text.get(startatindex, "insert")
+                startat = self.parse.stmt_index.indent_start(lno)
+                if startat is not None:
+                    rawtext = text.get(repr(startat) + ".0", "insert")
                     y.set_code(rawtext)
-                    bod = y.find_good_parse_start(
-                            self._build_char_in_string_func(startatindex))
-                    if bod is not None or startat == 1:
-                        break
-                y.set_lo(bod or 0)
+                else:
+                    # Too far past the indexed lines; look back from here.
+                    for context in self.num_context_lines:
+                        startat = max(lno - context, 1)
+                        startatindex = repr(startat) + ".0"
+                        rawtext = text.get(startatindex, "insert")
+                        y.set_code(rawtext)
+                        bod = y.find_good_parse_start(
+                                self._build_char_in_string_func(startatindex))
+                        if bod is not None or startat == 1:
+                            break
+                    y.set_lo(bod or 0)
             else:
                 r = text.tag_prevrange("console", "insert")
                 if r:
@@ -1710,6 +1755,52 @@ class IndentSearcher:
 ### end autoindent code ###
 
 
+class ParseDelegator(Delegator):
+    """Keep what is known from parsing the text current across edits.
+
+    stmt_index is a pyparse.StatementIndex of the text.  revision counts
+    the edits.  cached() remembers other results until the next edit.
+    """
+    cache_size = 100
+
+    def __init__(self):
+        Delegator.__init__(self)
+        self.stmt_index = pyparse.StatementIndex(self.get_lines)
+        self.revision = 0
+        self.cache = {}
+
+    def get_lines(self, first, last):
+        return self.get("%d.0" % first, "%d.0" % last)
+
+    def cached(self, key, compute):
+        "Return compute(), or what it returned before for key."
+        try:
+            return self.cache[key]
+        except KeyError:
+            pass
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        value = self.cache[key] = compute()
+        return value
+
+    def changed(self, index):
+        "Forget what depends on the text from index on."
+        # Text never changes anything after the final newline.
+        lineno = min(index2line(self.index(index)),
+                     index2line(self.index("end-1c")))
+        self.stmt_index.invalidate(lineno)
+        self.revision += 1
+        self.cache.clear()
+
+    def insert(self, index, chars, tags=None):
+        self.changed(index)
+        self.delegate.insert(index, chars, tags)
+
+    def delete(self, index1, index2=None):
+        self.changed(index1)
+        self.delegate.delete(index1, index2)
+
+
 def prepstr(s):
     """Extract the underscore from a string.
 
@@ -4,7 +4,9 @@ HyperParser uses PyParser.  PyParser mostly gives information on the
 proper indentation of code.  HyperParser gives additional information on
 the structure of code.
 """
+from bisect import bisect_left
 from keyword import iskeyword
+from operator import itemgetter
 import string
 
 from idlelib import pyparse
@@ -29,21 +31,54 @@ class HyperParser:
         self.editwin = editwin
         self.text = text = editwin.text
 
-        parser = pyparse.Parser(editwin.indentwidth, editwin.tabwidth)
-
         def index2line(index):
             return int(float(index))
         lno = index2line(text.index(index))
 
-        if not editwin.prompt_last_line:
+        # An editor's ParseDelegator knows where statements start, and
+        # keeps the parse of each until the text changes, for the
+        # several HyperParsers made for one keystroke or cursor move.
+        # Too far past the indexed lines, _parse() finds where to start.
+        parse = getattr(editwin, 'parse', None)
+        if parse is None:
+            parsed = self._parse(editwin, index, lno)
+        else:
+            if not editwin.prompt_last_line:
+                startat = parse.stmt_index.stmt_start(lno)
+                startatindex = None if startat is None else "%d.0" % startat
+            else:
+                r = text.tag_prevrange("console", index)
+                startatindex = r[1] if r else "1.0"
+            parsed = parse.cached(
+                    ('hyperparser', startatindex, lno),
+                    lambda: self._parse(editwin, index, lno, startatindex))
+        (self.rawtext, self.stopatindex,
+         self.bracketing, self.isopener) = parsed
+
+        self.set_index(index)
+
+    @staticmethod
+    def _parse(editwin, index, lno, startatindex=None):
+        """Return the statement up to line lno and its bracketing.
+
+        Parse from startatindex, if given, else find where to start.
+        Return (rawtext, stopatindex, bracketing, isopener).
+        """
+        text = editwin.text
+        parser = pyparse.Parser(editwin.indentwidth, editwin.tabwidth)
+        stopatindex = "%d.end" % lno
+
+        if startatindex is not None:
+            # We add the newline because PyParse requires a newline
+            # at end. We add a space so that index won't be at end
+            # of line, so that its status will be the same as the
+            # char before it, if should.
+            parser.set_code(text.get(startatindex, stopatindex)+' \n')
+            parser.set_lo(0)
+        elif not editwin.prompt_last_line:
             for context in editwin.num_context_lines:
                 startat = max(lno - context, 1)
                 startatindex = repr(startat) + ".0"
-                stopatindex = "%d.end" % lno
-                # We add the newline because PyParse requires a newline
-                # at end. We add a space so that index won't be at end
-                # of line, so that its status will be the same as the
-                # char before it, if should.
                 parser.set_code(text.get(startatindex, stopatindex)+' \n')
                 bod = parser.find_good_parse_start(
                           editwin._build_char_in_string_func(startatindex))
@@ -56,27 +91,20 @@ class HyperParser:
                 startatindex = r[1]
             else:
                 startatindex = "1.0"
-            stopatindex = "%d.end" % lno
-            # We add the newline because PyParse requires it. We add a
-            # space so that index won't be at end of line, so that its
-            # status will be the same as the char before it, if should.
             parser.set_code(text.get(startatindex, stopatindex)+' \n')
             parser.set_lo(0)
 
         # We want what the parser has, minus the last newline and space.
-        self.rawtext = parser.code[:-2]
+        rawtext = parser.code[:-2]
         # Parser.code apparently preserves the statement we are in, so
         # that stopatindex can be used to synchronize the string with
         # the text box indices.
-        self.stopatindex = stopatindex
-        self.bracketing = parser.get_last_stmt_bracketing()
+        bracketing = parser.get_last_stmt_bracketing()
         # find which pairs of bracketing are openers. These always
         # correspond to a character of rawtext.
-        self.isopener = [i>0 and self.bracketing[i][1] >
-                         self.bracketing[i-1][1]
-                         for i in range(len(self.bracketing))]
-
-        self.set_index(index)
+        isopener = [i>0 and bracketing[i][1] > bracketing[i-1][1]
+                    for i in range(len(bracketing))]
+        return rawtext, stopatindex, bracketing, isopener
 
     def set_index(self, index):
         """Set the index to which the functions relate.
@@ -89,11 +117,10 @@ class HyperParser:
             raise ValueError("Index %s precedes the analyzed statement"
                              % index)
         self.indexinrawtext = indexinrawtext
-        # find the rightmost bracket to which index belongs
-        self.indexbracket = 0
-        while (self.indexbracket < len(self.bracketing)-1 and
-               self.bracketing[self.indexbracket+1][0] < self.indexinrawtext):
-            self.indexbracket += 1
+        # find the rightmost bracket to which index belongs; the
+        # bracketing positions do not decrease
+        self.indexbracket = bisect_left(self.bracketing, indexinrawtext, 1,
+                                        key=itemgetter(0)) - 1
         if (self.indexbracket < len(self.bracketing)-1 and
             self.bracketing[self.indexbracket+1][0] == self.indexinrawtext and
            not self.isopener[self.indexbracket+1]):
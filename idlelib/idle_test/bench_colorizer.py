@@ -0,0 +1,88 @@
+"""Benchmark syntax coloring of Python source in a Tk Text widget.
+
+The corpus is generated by benchmark.python_source().
+    lex: _section_ranges() over the whole text, the lexing without any
+        Tk calls, for 1k and 10k lines (and 100k without --quick),
+    colorize: recolorize_main() over the whole text, as after a file
+        is opened, for 1k and 10k lines (and 100k without --quick),
+    edit: recoloring after typing in the middle of the text and deleting
+        it again, for a '#', which changes one line, and for a triple
+        quote, which changes the rest of the text,
+    section: lexing and tagging 100 lines, the unit of work between
+        update_idletasks() calls.
+
+A display is required for all but lex.  Run with --help for the options; see
+idle_test/benchmark.py.
+"""
+import sys
+
+from idlelib.colorizer import ColorDelegator, line_starts
+from idlelib.idle_test import benchmark
+from idlelib.percolator import Percolator
+
+LINES = (1000, 10000, 100000)
+
+
+def run(results, quick):
+    color = ColorDelegator()
+    for nlines in LINES[:2] if quick else LINES:
+        chars = benchmark.python_source(nlines)
+        starts = line_starts(chars)
+        results.add(f'lex {nlines} lines', benchmark.measure(
+                color._section_ranges, 3 if quick else 10, chars, starts),
+                size=nlines)
+    try:
+        from tkinter import Tk, Text, TclError
+        root = Tk()
+    except (ImportError, TclError) as err:
+        print(f'bench_colorizer requires Tk and a display: {err}',
+              file=sys.stderr)
+        return
+    root.withdraw()
+    try:
+        text = Text(root)
+        percolator = Percolator(text)
+        color = ColorDelegator()
+        percolator.insertfilter(color)
+        for nlines in LINES[:2] if quick else LINES:
+            run_text(results, quick, text, color, nlines)
+        percolator.close()
+    finally:
+        root.destroy()
+
+
+def run_text(results, quick, text, color, nlines):
+    text.delete('1.0', 'end')
+    text.insert('1.0', benchmark.python_source(nlines))
+    color.recolorize_main()
+    repeat = max(3, (5 if quick else 20) * 1000 // nlines)
+
+    def colorize():
+        color.removecolors()
+        text.tag_add('TODO', '1.0', 'end')
+        color.recolorize_main()
+    results.add(f'colorize {nlines} lines', benchmark.measure(
+            colorize, repeat), size=nlines)
+
+    middle = f'{nlines // 2}.0'
+    for name, char in (('line', '#'), ('quote', '"""')):
+        def edit():
+            text.insert(middle, char)
+            color.recolorize_main()
+            text.delete(middle, f'{middle}+{len(char)}c')
+            color.recolorize_main()
+        results.add(f'edit {name} {nlines} lines', benchmark.measure(
+                edit, repeat))
+
+    if nlines == LINES[0]:
+        chars = text.get('101.0', '201.0')
+        def section():
+            starts = line_starts(chars)
+            ranges, states = color._section_ranges(chars, starts)
+            color._apply_section('101.0', '201.0', starts, ranges, states)
+        results.add('section 100 lines', benchmark.measure(
+                section, 50 if quick else 500), size=100)
+
+
+if __name__ == '__main__':
+    sys.exit(benchmark.main('bench_colorizer', run, __doc__))
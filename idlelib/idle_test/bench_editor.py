@@ -0,0 +1,166 @@
+"""Benchmark the editor's parsing, formatting, and search code.
+
+The corpus, from benchmark.python_source(), is 1k and 10k lines (and
+100k without --quick) long.  At lines spread through the text, it
+measures
+    indent: the smart indent computation of a newline, as in
+        EditorWindow.newline_and_indent_event(), after the line was
+        edited,
+    statement index: finding the statement starts of the whole text,
+    hyperparser: HyperParser().get_expression(), as for a calltip,
+        parsed anew and again at the same text revision,
+    format: FormatParagraph's find_paragraph() and reformatting,
+    search: SearchEngine.search_forward(), and search_backward() with
+        Tk, for a pattern that is not there, so wrapping around the
+        whole text.
+Syntax coloring is timed by bench_colorizer.
+
+The text is a Tk Text if there is a display.  Otherwise it is the
+mock_tk Text used by unit tests, and the keys start with 'mock '.
+Timings of one do not compare with the other.
+
+Run with --help for the options; see idle_test/benchmark.py.
+"""
+import itertools
+import re
+import sys
+from unittest import mock
+
+from idlelib import format
+from idlelib import pyparse
+from idlelib import searchengine
+from idlelib.editor import ParseDelegator
+from idlelib.hyperparser import HyperParser
+from idlelib.idle_test import benchmark
+from idlelib.idle_test.mock_tk import Text as MockText, Var
+
+LINES = (1000, 10000, 100000)
+POSITIONS = 100  # Lines spread through the text.
+
+
+class Editwin:
+    "Enough of an EditorWindow for HyperParser."
+    indentwidth = 4
+    tabwidth = 8
+    prompt_last_line = ''
+
+    def __init__(self, text, parse):
+        self.text = text
+        self.parse = parse
+
+
+def run(results, quick):
+    try:
+        from tkinter import Tk, Text, TclError
+        root = Tk()
+    except (ImportError, TclError) as err:
+        print(f'bench_editor: using the mock Text, no display: {err}',
+              file=sys.stderr)
+        root = None
+    try:
+        if root is None:
+            text = MockText()
+            results = benchmark.Prefixed(results, 'mock ')
+        else:
+            root.withdraw()
+            text = Text(root)
+        engine = search_engine(root)
+        for nlines in LINES[:2] if quick else LINES:
+            text.delete('1.0', 'end')
+            text.insert('1.0', benchmark.python_source(nlines))
+            run_text(results, quick, text, engine, root, nlines)
+    finally:
+        if root is not None:
+            root.destroy()
+
+
+def search_engine(root):
+    "Return a SearchEngine, with mock_tk Vars if there is no Tk root."
+    if root is not None:
+        return searchengine.SearchEngine(root)
+    with mock.patch.multiple(searchengine, StringVar=Var, BooleanVar=Var):
+        return searchengine.SearchEngine(None)
+
+
+def run_text(results, quick, text, engine, root, nlines):
+    step = max(nlines // POSITIONS, 1)
+    lines = range(step // 2 + 1, nlines, step)
+    repeat = len(lines) * (1 if quick else 5)
+    parse = ParseDelegator()
+    parse.setdelegate(text)
+    index = parse.stmt_index
+
+    def index_text():
+        index.invalidate(1)
+        index.stmt_start(nlines)
+    results.add(f'statement index {nlines} lines', benchmark.measure(
+            index_text, 3 if quick else 10), size=nlines)
+
+    def indent(lno):
+        index.invalidate(lno)
+        smart_indent(text, index, lno)
+    samples = []
+    for lno in itertools.islice(itertools.cycle(lines), repeat):
+        index.stmt_start(lno + 1)  # Not timed, as if edited at lno only.
+        samples += benchmark.measure(indent, 1, lno)
+    results.add(f'indent {nlines} lines', samples)
+
+    index.stmt_start(nlines)
+    positions = itertools.cycle(lines)
+
+    editwin = Editwin(text, parse)
+    def expression(clear):
+        lno = next(positions)
+        if clear:
+            parse.cache.clear()
+        hp = HyperParser(editwin, f'{lno}.end')
+        if hp.is_in_code():
+            hp.get_expression()
+    results.add(f'hyperparser {nlines} lines', benchmark.measure(
+            expression, repeat, True))
+    for lno in lines:  # Fill the cache.
+        expression(False)
+    results.add(f'hyperparser again {nlines} lines', benchmark.measure(
+            expression, repeat, False))
+
+    def paragraph():
+        lno = next(positions)
+        first, last, comment_header, data = format.find_paragraph(
+                text, f'{lno}.0')
+        if comment_header:
+            format.reformat_comment(data, 72, comment_header)
+        else:
+            format.reformat_paragraph(data, 72)
+    results.add(f'format {nlines} lines', benchmark.measure(
+            paragraph, repeat))
+
+    prog = re.compile('no such text')
+    middle = nlines // 2
+    results.add(f'search {nlines} lines', benchmark.measure(
+            engine.search_forward, 3 if quick else 10,
+            text, prog, middle, 0, True), size=nlines)
+    if root is not None:
+        results.add(f'search backward {nlines} lines', benchmark.measure(
+                engine.search_backward, 3 if quick else 10,
+                text, prog, middle, 0, True), size=nlines)
+
+
+def smart_indent(text, index, lno):
+    "Compute the indent of a new line after line lno, as the editor does."
+    startat = index.indent_start(lno + 1)
+    y = pyparse.Parser(Editwin.indentwidth, Editwin.tabwidth)
+    y.set_code(text.get(f'{startat}.0', f'{lno}.end') + '\n')
+    c = y.get_continuation_type()
+    if c == pyparse.C_BRACKET:
+        return y.compute_bracket_indent()
+    elif c == pyparse.C_BACKSLASH:
+        if y.get_num_lines_in_stmt() == 1:
+            return y.compute_backslash_indent()
+    elif c == pyparse.C_NONE:
+        y.is_block_opener() or y.is_block_closer()
+        return y.get_base_indent_string()
+    return None
+
+
+if __name__ == '__main__':
+    sys.exit(benchmark.main('bench_editor', run, __doc__))
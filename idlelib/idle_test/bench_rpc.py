@@ -0,0 +1,147 @@
+"""Benchmark the rpc link between IDLE and its execution subprocess.
+
+An RPCClient in this process accepts a connection from an RPCServer in
+a child process, as pyshell does with run.py, and measures
+    call: remotecall() round trip latency,
+    queue: remotequeue() round trip through the server's request thread,
+    asyncqueue: throughput of asyncqueue() requests sent back to back,
+    submit: throughput of pipelined calls, alone or in a batch(),
+    echo: round trips of payloads from 1 KB to 64 MB,
+    proxy: RPCProxy attribute fetches and method calls.
+Where Unix domain sockets are available, the 'unix' timings repeat the
+tests over one instead of over TCP.
+
+Run with --help for the options; see idle_test/benchmark.py.
+"""
+import os
+import queue
+import subprocess
+import socket
+import sys
+import tempfile
+import threading
+
+from idlelib import rpc
+from idlelib.idle_test import benchmark
+
+KB = 1024
+MB = KB * KB
+SIZES = (KB, 16*KB, 256*KB, MB, 16*MB, 64*MB)
+
+
+class Target:
+    "Object registered as 'bench' in the server."
+    value = 42
+
+    def nop(self):
+        pass
+
+    def echo(self, obj):
+        return obj
+
+
+def _queue_worker():
+    # Serve 'QUEUE' requests as run.main() does.
+    while True:
+        try:
+            seq, (method, args, kwargs) = rpc.request_queue.get(timeout=1)
+        except queue.Empty:
+            continue
+        rpc.response_queue.put((seq, method(*args, **kwargs)))
+
+
+def serve(address):
+    "Connect to the client at address and serve requests until EOF."
+    rpc.objecttable['bench'] = Target()
+    threading.Thread(target=_queue_worker, daemon=True).start()
+    server = rpc.RPCServer(address)
+    server.handle_request()  # Exits the process on EOF.
+
+
+def connect(path=None):
+    """Return an RPCClient connected to a server subprocess, and the process.
+
+    Listen on the Unix domain socket path if given, else on a TCP port.
+    """
+    if path is None:
+        client = rpc.RPCClient((rpc.LOCALHOST, 0))
+    else:
+        client = rpc.RPCClient(path, socket.AF_UNIX)
+    address = client.listening_sock.getsockname()
+    root = os.path.dirname(os.path.dirname(rpc.__file__))
+    code = ("import sys; sys.path.insert(0, %r); "
+            "from idlelib.idle_test.bench_rpc import serve; serve(%r)"
+            % (root, address))
+    proc = subprocess.Popen([sys.executable, '-c', code])
+    client.listening_sock.settimeout(10)
+    client.accept()
+    client.listening_sock.close()
+    return client, proc
+
+
+def run(results, quick):
+    run_transport(results, quick, '')
+    if hasattr(socket, 'AF_UNIX'):
+        with tempfile.TemporaryDirectory() as tmp:
+            run_transport(results, quick, 'unix ', os.path.join(tmp, 'rpc'))
+
+
+def run_transport(results, quick, prefix, path=None):
+    client, proc = connect(path)
+    try:
+        run_client(benchmark.Prefixed(results, prefix), client, quick)
+    finally:
+        client.close()
+        proc.wait(10)
+
+
+def run_client(results, client, quick):
+    repeat = 200 if quick else 5000
+    call = client.remotecall
+    results.add('call nop', benchmark.measure(
+            call, repeat, 'bench', 'nop', (), {}))
+    results.add('queue nop', benchmark.measure(
+            client.remotequeue, repeat // 2, 'bench', 'nop', (), {}))
+
+    burst = 100 if quick else 1000
+    def asyncqueue_burst():
+        for _ in range(burst - 1):
+            client.asyncqueue('bench', 'nop', (), {})
+        # Requests are served in order, so the last reply follows the rest.
+        client.remotequeue('bench', 'nop', (), {})
+    results.add(f'asyncqueue x{burst}', benchmark.measure(
+            asyncqueue_burst, 5 if quick else 20), size=burst)
+
+    def pipelined():
+        futures = [client.submit('bench', 'nop', (), {})
+                   for _ in range(burst)]
+        for future in futures:
+            future.result()
+    def batched():
+        with client.batch():
+            pipelined()
+    results.add(f'submit x{burst}', benchmark.measure(
+            pipelined, 5 if quick else 20), size=burst)
+    results.add(f'batch submit x{burst}', benchmark.measure(
+            batched, 5 if quick else 20), size=burst)
+
+    for size in SIZES:
+        if quick and size > MB:
+            break
+        data = bytes(size)
+        count = max(3, min(repeat, 64 * MB // size // 4))
+        results.add(f'echo {size // KB} KB', benchmark.measure(
+                call, count, 'bench', 'echo', (data,), {}), size=size)
+
+    def first_fetch():
+        return rpc.RPCProxy(client, 'bench').value
+    proxy = rpc.RPCProxy(client, 'bench')
+    results.add('proxy first attribute', benchmark.measure(
+            first_fetch, repeat // 4))
+    results.add('proxy attribute', benchmark.measure(
+            getattr, repeat, proxy, 'value'))
+    results.add('proxy method', benchmark.measure(proxy.nop, repeat))
+
+
+if __name__ == '__main__':
+    sys.exit(benchmark.main('bench_rpc', run, __doc__))
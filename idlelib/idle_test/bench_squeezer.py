@@ -0,0 +1,62 @@
+"""Benchmark the Shell's counting of output lines for squeezing.
+
+Squeezer's write() counts the wrapped lines of each long enough stdout
+write to decide whether to squeeze it.  For outputs from 1 KB to 100 MB
+(16 MB with --quick) of three kinds,
+    lines: lines of 60 characters or so, like most printed output,
+    long: lines of 1000 characters,
+    tabs: short lines with tabs, like a printed table,
+the timings are of
+    count: count_lines_with_wrapping() of the whole output, as for the
+        label of a squeezed button,
+    squeeze: the count with the limit write() uses, which stops at
+        auto_squeeze_min_lines.
+
+No display is required.  Run with --help for the options; see
+idle_test/benchmark.py.
+"""
+import sys
+
+from idlelib.idle_test import benchmark
+from idlelib.squeezer import count_lines_with_wrapping, Squeezer
+
+KB = 1024
+MB = KB * KB
+SIZES = (KB, 64*KB, MB, 16*MB, 100*MB)
+LINEWIDTH = 80
+
+
+def output(kind, size):
+    "Return size characters of output of the given kind."
+    if kind == 'lines':
+        line = 'x = {0}, y = [1, 2, 3], "some text printed by a program"\n'
+    elif kind == 'long':
+        line = '{0:a>1000}\n'
+    else:
+        line = '{0}\t{0:x}\t{0:o}\tsome\ttable\tcells\n'
+    chars = []
+    length = 0
+    n = 0
+    while length < size:
+        chars.append(line.format(n))
+        length += len(chars[-1])
+        n += 1
+    return ''.join(chars)[:size]
+
+
+def run(results, quick):
+    limit = Squeezer.auto_squeeze_min_lines
+    for size in SIZES[:-1] if quick else SIZES:
+        repeat = max(3, (1 if quick else 4) * MB // size)
+        for kind in ('lines', 'long', 'tabs'):
+            s = output(kind, size)
+            results.add(f'count {kind} {size // KB} KB', benchmark.measure(
+                    count_lines_with_wrapping, repeat, s, LINEWIDTH),
+                    size=size)
+            results.add(f'squeeze {kind} {size // KB} KB', benchmark.measure(
+                    count_lines_with_wrapping, repeat, s, LINEWIDTH, limit),
+                    size=size)
+
+
+if __name__ == '__main__':
+    sys.exit(benchmark.main('bench_squeezer', run, __doc__))
@@ -0,0 +1,221 @@
+"""Support for IDLE performance benchmarks, idle_test/bench_*.py.
+
+Benchmarks are not unit tests and are not run by test_idle.  Each
+bench_xyz.py module defines run(results, quick) and ends with a call
+to main().  For example:
+
+python -m idlelib.idle_test.bench_rpc
+python -m idlelib.idle_test.bench_rpc --quick --save new.json
+python -m idlelib.idle_test.bench_rpc --compare old.json
+
+--save writes the results as JSON.  --compare reports, and exits with
+status 1 for, any timing whose median is more than --threshold
+(default 0.25, i.e. 25%) slower than in the saved baseline.
+"""
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+
+
+# A block of Python with the constructs the editor treats specially.
+# {n} is replaced by a block number, to make each block different.
+_SOURCE_BLOCK = '''\
+class Spam{n}(Base):
+    """Docstring of Spam{n}.
+
+    Some text to fill a paragraph, long enough to be reformatted
+    by FormatParagraph, with a word or two more than a line holds.
+    """
+    limit = {n}  # A comment.
+
+    def __init__(self, value, *args, key=None, **kwds):
+        super().__init__(*args, **kwds)
+        self.value = value
+        self.table = {{
+            'name': 'spam{n}',
+            'items': [1, 2, 3,
+                      4, 5, 6],
+            'nested': {{'a': (1, 2), 'b': "x{{}}y"}},
+        }}
+
+    @property
+    def total(self):
+        # The sum of the items, if any.
+        total = 0
+        for item in self.table['items']:
+            if item % 2 and not item > self.limit:
+                total += item
+            elif item is None:
+                continue
+            else:
+                break
+        return total
+
+    def describe(self, width=70):
+        text = (f"{{self.value!r}} has {{len(self.table)}} keys, "
+                'with "quotes", ' r'raw \\d, ' \\
+                "and a backslash continuation.")
+        return text[:width] + '…' if len(text) > width else text
+
+
+def spam{n}(x, y=None):
+    \'\'\'Return a Spam{n} for x and y.\'\'\'
+    try:
+        result = Spam{n}(x, y, key=lambda v: v)
+    except (TypeError, ValueError) as err:
+        raise RuntimeError(f"spam{n} failed: {{err}}") from err
+    finally:
+        pass
+    match result.total:
+        case 0:
+            return None
+        case _:
+            return result
+
+
+'''
+
+
+def python_source(nlines):
+    """Return nlines of Python source, the same for every run.
+
+    The source is _SOURCE_BLOCK repeated with different numbers, and
+    does not change with the code being measured.
+    """
+    nblocks = nlines // _SOURCE_BLOCK.count('\n') + 1
+    lines = ''.join(_SOURCE_BLOCK.format(n=n) for n in range(nblocks))
+    return ''.join(lines.splitlines(keepends=True)[:nlines])
+
+
+def measure(func, repeat, *args):
+    "Return a list of the seconds taken by repeat calls of func(*args)."
+    samples = []
+    timer = time.perf_counter
+    for _ in range(repeat):
+        start = timer()
+        func(*args)
+        samples.append(timer() - start)
+    return samples
+
+
+def percentile(ordered, p):
+    "Return the nearest-rank p-th percentile of the sorted list ordered."
+    rank = math.ceil(p / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+class Results:
+    "Timings collected by one benchmark run, keyed by test name."
+
+    def __init__(self, name):
+        self.name = name
+        self.timings = {}
+
+    def add(self, key, samples, size=None):
+        """Record samples, a list of seconds, under key.
+
+        If size is given, the number of bytes or items processed by one
+        sample, a rate per second is recorded as well.
+        """
+        ordered = sorted(samples)
+        timing = {
+            'count': len(ordered),
+            'min': ordered[0],
+            'mean': sum(ordered) / len(ordered),
+            'p50': percentile(ordered, 50),
+            'p90': percentile(ordered, 90),
+            'p99': percentile(ordered, 99),
+        }
+        if size is not None:
+            timing['size'] = size
+            timing['rate'] = size / timing['p50'] if timing['p50'] else 0
+        self.timings[key] = timing
+        return timing
+
+    def report(self, file=None):
+        file = file or sys.stdout
+        print(f"{self.name}  (Python {platform.python_version()}, "
+              f"{platform.platform()})", file=file)
+        width = max(map(len, self.timings), default=0)
+        print(f"{'':{width}}  {'count':>6} {'p50 ms':>10} {'p90 ms':>10} "
+              f"{'p99 ms':>10}  rate/s", file=file)
+        for key, t in self.timings.items():
+            rate = f"  {format_rate(t['rate'])}" if 'rate' in t else ''
+            print(f"{key:{width}}  {t['count']:6} {t['p50']*1000:10.3f} "
+                  f"{t['p90']*1000:10.3f} {t['p99']*1000:10.3f}{rate}",
+                  file=file)
+
+    def asdict(self):
+        return {'name': self.name,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'timings': self.timings}
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.asdict(), f, indent=1)
+
+    def compare(self, baseline, threshold=0.25):
+        """Return (key, old p50, new p50) for timings slower than baseline.
+
+        baseline is a dict as returned by asdict().  Keys missing from
+        either run are ignored.
+        """
+        regressions = []
+        for key, old in baseline['timings'].items():
+            new = self.timings.get(key)
+            if new is not None and new['p50'] > old['p50'] * (1 + threshold):
+                regressions.append((key, old['p50'], new['p50']))
+        return regressions
+
+
+class Prefixed:
+    "Add timings to results with keys starting with prefix."
+
+    def __init__(self, results, prefix):
+        self.results = results
+        self.prefix = prefix
+
+    def add(self, key, samples, size=None):
+        return self.results.add(self.prefix + key, samples, size)
+
+
+def format_rate(rate):
+    for unit in ('', 'K', 'M', 'G'):
+        if rate < 1000:
+            break
+        rate /= 1000
+    return f"{rate:.1f}{unit}"
+
+
+def main(name, run, description=None, argv=None):
+    "Run benchmark run(results, quick) and handle the command line."
+    parser = argparse.ArgumentParser(prog=name, description=description,
+            epilog=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true',
+                        help='fewer repetitions and smaller sizes')
+    parser.add_argument('--save', metavar='FILE',
+                        help='write results as JSON')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare with results saved earlier')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='relative slowdown reported as a regression')
+    args = parser.parse_args(argv)
+    results = Results(name)
+    run(results, args.quick)
+    results.report()
+    if args.save:
+        results.save(args.save)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = results.compare(baseline, args.threshold)
+        for key, old, new in regressions:
+            print(f"REGRESSION {key}: {old*1000:.3f} ms -> {new*1000:.3f} ms")
+        if regressions:
+            return 1
+    return 0
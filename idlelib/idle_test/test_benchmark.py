@@ -0,0 +1,80 @@
+"Test benchmark, coverage 90%."
+
+from idlelib.idle_test import benchmark
+import io
+import json
+import os
+import tempfile
+from test.support import captured_stdout
+import unittest
+
+
+class ResultsTest(unittest.TestCase):
+
+    def test_percentile(self):
+        ordered = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(ordered, 50), 50)
+        self.assertEqual(benchmark.percentile(ordered, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 90), 7)
+
+    def test_python_source(self):
+        source = benchmark.python_source(3000)
+        self.assertEqual(source.count('\n'), 3000)
+        self.assertEqual(benchmark.python_source(3000), source)
+        block = benchmark._SOURCE_BLOCK.format(n=1)
+        self.assertIn(block, source)
+        compile(block, 'block', 'exec')
+
+    def test_measure(self):
+        calls = []
+        samples = benchmark.measure(calls.append, 3, 'x')
+        self.assertEqual(calls, ['x', 'x', 'x'])
+        self.assertEqual(len(samples), 3)
+
+    def test_add_and_report(self):
+        results = benchmark.Results('bench')
+        t = results.add('copy', [0.3, 0.1, 0.2], size=1000)
+        self.assertEqual((t['count'], t['min'], t['p50']), (3, 0.1, 0.2))
+        self.assertEqual(t['rate'], 5000)
+        out = io.StringIO()
+        results.report(out)
+        self.assertIn('5.0K', out.getvalue())
+
+    def test_compare(self):
+        results = benchmark.Results('bench')
+        results.add('same', [1.0])
+        results.add('slower', [2.0])
+        results.add('new', [1.0])
+        baseline = {'timings': {'same': {'p50': 0.9},
+                                'slower': {'p50': 1.0},
+                                'gone': {'p50': 1.0}}}
+        self.assertEqual(results.compare(baseline),
+                         [('slower', 1.0, 2.0)])
+        self.assertEqual(results.compare(baseline, threshold=1.5), [])
+
+
+class MainTest(unittest.TestCase):
+
+    def test_save_and_compare(self):
+        def run(results, quick):
+            self.assertTrue(quick)
+            results.add('step', [delay])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'base.json')
+            delay = 1.0
+            with captured_stdout():
+                rc = benchmark.main('b', run, argv=['--quick',
+                                                    '--save', path])
+            self.assertEqual(rc, 0)
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['timings']['step']['p50'], 1.0)
+            delay = 2.0
+            with captured_stdout() as out:
+                rc = benchmark.main('b', run, argv=['--quick',
+                                                    '--compare', path])
+            self.assertEqual(rc, 1)
+            self.assertIn('REGRESSION step', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
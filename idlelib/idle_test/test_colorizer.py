@@ -6,7 +6,9 @@ from unittest import mock
 from idlelib.idle_test.tkinter_testing_utils import run_in_tk_mainloop
 
 from functools import partial
+import queue
 import textwrap
+import threading
 from tkinter import Tk, Text
 from idlelib import config
 from idlelib.percolator import Percolator
@@ -77,7 +79,10 @@ class FunctionTest(unittest.TestCase):
         eq = self.assertEqual
         line = 'def f():\n    print("hello")\n'
         m = prog.search(line)
-        eq(m.groupdict()['KEYWORD'], 'def')
+        eq(m.groupdict()['DEF_KEYWORD'], 'def')
+        eq(m.lastgroup, 'DEFINITION')
+        eq(m.group('DEFINITION'), 'f')
+        eq(m.end(), 3)  # The name is lexed again.
         m = prog.search(line, m.end())
         eq(m.groupdict()['SYNC'], '\n')
         m = prog.search(line, m.end())
@@ -94,6 +99,74 @@ class FunctionTest(unittest.TestCase):
         m = idprog.match(' space')
         self.assertEqual(m.group(0), ' space')
 
+    def test_line_starts(self):
+        self.assertEqual(colorizer.line_starts(''), [0])
+        self.assertEqual(colorizer.line_starts('ab\ncdef\n\ng'), [0, 3, 8, 9])
+
+    def test_offsets_to_indexes(self):
+        starts = colorizer.line_starts('ab\ncdef\n\ng')
+        offsets = [0, 2, 3, 7, 9, 10]
+        self.assertEqual(colorizer.offsets_to_indexes(starts, '3.4', offsets),
+                ['3.4', '3.6', '4.0', '4.4', '6.0', '6.1'])
+
+
+class SectionRangesTest(unittest.TestCase):
+
+    def ranges(self, chars, state=0):
+        color = colorizer.ColorDelegator()
+        return color._section_ranges(chars, colorizer.line_starts(chars),
+                                     state)
+
+    def test_line_states(self):
+        chars = textwrap.dedent('''\
+            x = """a
+            b
+            """ # c
+            y = 'd\\
+            e'
+            \'\'\'
+            ''')
+        ranges, states = self.ranges(chars)
+        self.assertEqual(ranges['STRING'], [4, 14, 23, 29, 30, 34])
+        self.assertEqual(ranges['COMMENT'], [15, 18])
+        self.assertEqual(states, [4, 4, 0, 1, 0, 3])
+
+    def test_continued_string(self):
+        chars = 'doc"""\ndef f(): pass\n'
+        ranges, states = self.ranges(chars, state=4)
+        self.assertEqual(ranges['STRING'], [0, 6])
+        self.assertEqual(ranges['KEYWORD'], [7, 10, 16, 20])
+        self.assertEqual(ranges['DEFINITION'], [11, 12])
+        self.assertEqual(states, [0, 0])
+
+        ranges, states = self.ranges('no end\n', state=3)
+        self.assertEqual(ranges['STRING'], [0, 7])
+        self.assertEqual(states, [3])
+
+    def test_lex_sections(self):
+        color = colorizer.ColorDelegator()
+        color.thread_lines = 2
+        chars = 'x = """a\nb\n"""\ny = 1 # c\nz\n'
+        results = queue.SimpleQueue()
+        color._lex_sections(chars, 0, results, threading.Event())
+        sections = [results.get_nowait() for _ in range(4)]
+        self.assertIsNone(sections.pop())
+        self.assertTrue(results.empty())
+        self.assertEqual([starts for starts, _, _ in sections],
+                         [[0, 9, 11], [0, 4, 14], [0, 2]])
+        self.assertEqual([states for _, _, states in sections],
+                         [[4, 4], [0, 0], [0]])
+        self.assertEqual(sections[0][1]['STRING'], [4, 11])
+        # The second section starts in the string.
+        self.assertEqual(sections[1][1]['STRING'], [0, 3])
+        self.assertEqual(sections[1][1]['COMMENT'], [10, 13])
+
+        # Nothing more after a cancel.
+        cancel = threading.Event()
+        cancel.set()
+        color._lex_sections(chars, 0, results, cancel)
+        self.assertTrue(results.empty())
+
 
 class ColorConfigTest(unittest.TestCase):
 
@@ -356,6 +429,7 @@ class ColorDelegatorTest(unittest.TestCase):
         color.colorizing = False
 
         # Colorizing is done, but not completed, so rescheduled.
+        color.threaded = False
         color.recolorize()
         self.assertFalse(color.stop_colorizing)
         self.assertFalse(color.colorizing)
@@ -364,14 +438,26 @@ class ColorDelegatorTest(unittest.TestCase):
         # Rescheduled when TODO tag still exists.
         eq(self.root.tk.call('after', 'info', color.after_id)[1], 'timer')
 
+        # Or continued in a worker thread.
+        text.after_cancel(color.after_id)
+        color.after_id = None
+        color.threaded = True
+        color.recolorize()
+        eq(mock_recmain.call_count, 2)
+        self.assertIsNone(color.after_id)
+        self.assertIsNotNone(color.thread_job)
+        eq(self.root.tk.call('after', 'info', color.poll_id)[1], 'timer')
+        color.stop_thread()
+
         # No changes to text, so no scheduling added.
         text.tag_remove('TODO', '1.0', 'end')
         color.recolorize()
         self.assertFalse(color.stop_colorizing)
         self.assertFalse(color.colorizing)
         mock_recmain.assert_called()
-        eq(mock_recmain.call_count, 2)
+        eq(mock_recmain.call_count, 3)
         self.assertIsNone(color.after_id)
+        self.assertIsNone(color.thread_job)
 
     @mock.patch.object(colorizer.ColorDelegator, 'notify_range')
     def test_recolorize_main(self, mock_notify):
@@ -435,6 +521,122 @@ class ColorDelegatorTest(unittest.TestCase):
         eq(text.tag_nextrange('SYNC', '8.0'), ('8.26', '9.0'))
         eq(text.tag_nextrange('SYNC', '30.0'), ('30.10', '32.0'))
 
+    @mock.patch.object(colorizer.ColorDelegator, 'notify_range')
+    def test_line_states(self, mock_notify):
+        text = self.text
+        color = self.color
+        text.insert('insert', 'a = 1\n"""doc\nmore\n"""\n')
+        self.assertEqual(list(color.line_states), [0, -1, -1, -1, -1])
+        text.tag_add('TODO', '1.0', 'end')
+        color.recolorize_main()
+        self.assertEqual(list(color.line_states), [0, 0, 4, 4, 0, 0])
+
+        # Inserted lines are unknown, deleted lines are dropped.
+        text.insert('3.2', 'x\ny\n')
+        self.assertEqual(list(color.line_states), [0, 0, 4, -1, -1, 4, 0, 0])
+        text.delete('2.0', '4.0')
+        self.assertEqual(list(color.line_states), [0, 0, -1, 4, 0, 0])
+
+        # At 'end', text goes before the final newline.
+        text.insert('end', 'z\n')
+        self.assertEqual(list(color.line_states), [0, 0, -1, 4, 0, -1, 0])
+        text.delete('5.0', 'end')
+        self.assertEqual(list(color.line_states), [0, 0, -1, 4, 0, 0])
+
+    @mock.patch.object(colorizer.ColorDelegator, 'notify_range')
+    def test_restart_in_string(self, mock_notify):
+        text = self.text
+        color = self.color
+        text.insert('insert', '"""\n' + 'doc\n' * 300 + '"""\n')
+        text.tag_add('TODO', '1.0', 'end')
+        color.recolorize_main()
+
+        # An edit inside the string is lexed from its own line only.
+        text.insert('200.0', 'x')
+        text.tag_add('TODO', '200.0')
+        with mock.patch.object(color, 'get', wraps=color.get) as get:
+            color.recolorize_main()
+        get.assert_called_once_with('200.0', '201.0')
+        self.assertEqual(text.tag_prevrange('STRING', '200.1'),
+                         ('1.0', '302.3'))
+
+    @mock.patch.object(colorizer.ColorDelegator, 'notify_range')
+    def test_colorize_view(self, mock_notify):
+        text = self.text
+        color = self.color
+        text.insert('insert', 'if x: pass  # c\n' * 500)
+        text.tag_add('TODO', '1.0', 'end')
+        text.yview('300.0')
+        text.update_idletasks()
+        top = text.index('@0,0')
+
+        color.colorize_view()
+        # The view is colored and left to check; the top is not done.
+        self.assertIn('KEYWORD', text.tag_names(top))
+        self.assertIn('TODO', text.tag_names(top))
+        self.assertEqual(text.tag_names('1.0'), ('TODO',))
+        self.assertEqual(text.tag_nextrange('SYNC', '1.0'), ())
+        self.assertIsNotNone(color.view_colorized)
+
+        color.recolorize_main()
+        self.assertEqual(text.tag_nextrange('TODO', '1.0'), ())
+        self.assertEqual(text.tag_names(top), ('KEYWORD',))
+        self.assertEqual(text.tag_names('1.0'), ('KEYWORD',))
+
+    @mock.patch.object(colorizer.ColorDelegator, 'notify_range')
+    def test_view_only(self, mock_notify):
+        text = self.text
+        color = self.color
+        color.view_only = True
+        text.insert('insert', 'if x: pass  # c\n' * 500)
+        text.tag_add('TODO', '1.0', 'end')
+        text.yview('300.0')
+        text.update_idletasks()
+        top = text.index('@0,0')
+
+        color.recolorize_main()
+        self.assertIn('KEYWORD', text.tag_names(top))
+        self.assertEqual(text.tag_names('1.0'), ('TODO',))
+        self.assertEqual(text.tag_names('end-2l'), ('TODO',))
+
+        # Scrolling to the top colorizes it on the next check.
+        text.after_cancel(color.after_id)
+        color.after_id = None
+        text.yview('1.0')
+        text.update_idletasks()
+        color.recolorize()
+        self.assertEqual(set(text.tag_names('1.0')), {'KEYWORD', 'TODO'})
+        # The view is checked again later, not in a thread.
+        self.assertIsNone(color.thread_job)
+        self.assertEqual(
+                self.root.tk.call('after', 'info', color.after_id)[1], 'timer')
+
+    @mock.patch.object(colorizer.ColorDelegator, 'notify_range')
+    def test_thread(self, mock_notify):
+        text = self.text
+        color = self.color
+        color.thread_lines = 7
+        text.insert('insert', source * 20)
+        text.tag_add('TODO', '1.0', 'end')
+
+        # Results for an older version of the text are dropped.
+        color.start_thread()
+        color.version += 1
+        color.poll_thread()
+        self.assertIsNone(color.thread_job)
+        self.assertEqual(text.tag_nextrange('KEYWORD', '1.0'), ())
+
+        color.start_thread()
+        while color.thread_job:
+            text.update()
+        self.assertEqual(text.tag_nextrange('TODO', '1.0'), ())
+        tags = {tag: text.tag_ranges(tag) for tag in color.tagdefs}
+        text.tag_add('TODO', '1.0', 'end')
+        color.recolorize_main()
+        for tag in tags:
+            with self.subTest(tag=tag):
+                self.assertEqual(text.tag_ranges(tag), tags[tag])
+
     def _assert_highlighting(self, source, tag_ranges):
         """Check highlighting of a given piece of code.
 
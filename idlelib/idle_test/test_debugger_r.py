@@ -1,6 +1,9 @@
-"Test debugger_r, coverage 30%."
+"Test debugger_r, coverage 70%."
 
 from idlelib import debugger_r
+import bdb
+import reprlib
+import sys
 import unittest
 
 # Boilerplate likely to be needed for future test classes.
@@ -15,8 +18,7 @@ import unittest
 ##    def tearDownClass(cls):
 ##        cls.root.destroy()
 
-# GUIProxy, IdbAdapter, FrameProxy, CodeProxy, DictProxy,
-# GUIAdapter, IdbProxy, and 7 functions still need tests.
+# GUIProxy, GUIAdapter, and 7 functions still need tests.
 
 class IdbAdapterTest(unittest.TestCase):
 
@@ -32,5 +34,95 @@ class IdbAdapterTest(unittest.TestCase):
         debugger_r.dicttable.clear()
 
 
+class Conn:
+    "Stand-in for the rpc link that calls the adapter directly."
+
+    def __init__(self, adapter):
+        self.adapter = adapter
+        self.calls = []
+
+    def remotecall(self, oid, methodname, args, kwargs):
+        self.calls.append(methodname)
+        return getattr(self.adapter, methodname)(*args, **kwargs)
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = Conn(debugger_r.IdbAdapter(bdb.Bdb()))
+        self.idb = debugger_r.IdbProxy(self.conn, None, 'idb_adapter')
+
+    def tearDown(self):
+        for table in (debugger_r.frametable, debugger_r.dicttable,
+                      debugger_r.codetable):
+            table.clear()
+
+    def stop(self, snapshot=True, with_globals=True):
+        "Return a FrameProxy for a frame with a local, as interaction does."
+        def func(arg):
+            local = [arg] * 1000
+            return sys._getframe()
+        self.conn.adapter.idb.botframe = sys._getframe()  # Stack bottom.
+        fid = debugger_r.wrap_frame(func(3))
+        if snapshot:
+            snapshot = self.conn.remotecall('idb_adapter', 'get_snapshot',
+                                            (fid, None, with_globals), {})
+        else:
+            snapshot = None
+        return debugger_r.FrameProxy(self.conn, fid, snapshot)
+
+    def show(self, frame):
+        "Read what the debugger GUI reads for a stop."
+        stack, i = self.idb.get_stack(frame, None)
+        for frame2, lineno in stack:
+            frame2.f_globals['__name__']
+            frame2.f_code.co_filename, frame2.f_code.co_name
+        frame = stack[i][0]
+        frame.f_code.co_filename, frame.f_lineno
+        shown = {}
+        for name in ('f_locals', 'f_globals'):
+            odict = getattr(frame, name)
+            shown[name] = {key: odict[key] for key in odict.keys()}
+        return stack, shown
+
+    def test_snapshot(self):
+        frame = self.stop()
+        stack, shown = self.show(frame)
+        self.assertEqual(self.conn.calls, ['get_snapshot'])
+        self.assertEqual(stack[-1][0].f_code.co_name, 'func')
+        self.assertEqual(shown['f_locals']['arg'], '3')
+        self.assertEqual(shown['f_locals']['local'],
+                         '[3, 3, 3, 3, 3, 3, ...]')
+        self.assertEqual(shown['f_globals']['__name__'],
+                         reprlib.repr(__name__))
+
+    def test_same_as_without_snapshot(self):
+        stack, shown = self.show(self.stop())
+        self.conn.calls.clear()
+        stack2, shown2 = self.show(self.stop(snapshot=False))
+        self.assertEqual(shown, shown2)
+        self.assertEqual([f.f_code.co_name for f, k in stack],
+                         [f.f_code.co_name for f, k in stack2])
+        # Without a snapshot, each namespace shown still takes one call.
+        self.assertEqual(self.conn.calls.count('dict_snapshot'), 2)
+        self.assertNotIn('dict_keys_list', self.conn.calls)
+
+    def test_snapshot_current_frame(self):
+        # Only the namespaces shown for the current frame are snapshot.
+        frame = self.stop(with_globals=False)
+        self.assertEqual(len(frame._snapshot['dicts']), 1)
+        stack, shown = self.show(frame)
+        self.assertEqual(self.conn.calls, ['get_snapshot', 'dict_snapshot'])
+        self.assertEqual(shown['f_globals']['__name__'],
+                         reprlib.repr(__name__))
+
+        # Other frames' namespaces are fetched when they are selected.
+        self.conn.calls.clear()
+        ldict = stack[-2][0].f_locals
+        shown = {key: ldict[key] for key in ldict.keys()}
+        self.assertEqual(shown['self'], reprlib.repr(self))
+        self.assertEqual(self.conn.calls, ['dict_snapshot'])
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
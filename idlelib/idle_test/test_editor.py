@@ -5,6 +5,8 @@ import unittest
 from collections import namedtuple
 from test.support import requires
 from tkinter import Tk, Text
+from idlelib.percolator import Percolator
+from idlelib.idle_test.mock_idle import Func
 
 Editor = editor.EditorWindow
 
@@ -30,6 +32,28 @@ class EditorWindowTest(unittest.TestCase):
         self.assertEqual(e.root, self.root)
         e._close()
 
+    def test_large_file(self):
+        e = Editor(root=self.root)
+        e.large_file_lines = 3
+        self.assertFalse(e.is_large_file('a\nb\n'))
+        self.assertTrue(e.is_large_file('a\nb\nc\n'))
+        self.assertFalse(e.large_file)
+        self.assertIsNone(e.undo.max_undo_chars)
+
+        e.set_large_file(True)
+        self.assertTrue(e.large_file)
+        self.assertTrue(e.color.view_only)
+        self.assertEqual(e.undo.max_undo_chars, e.large_file_undo_chars)
+        self.assertTrue(e.status_bar.labels['large_file']['text'])
+        e.code_context.toggle_code_context_event()
+        self.assertIsNone(e.code_context.context)
+
+        e.set_large_file(False)
+        self.assertFalse(e.color.view_only)
+        self.assertIsNone(e.undo.max_undo_chars)
+        self.assertEqual(e.status_bar.labels['large_file']['text'], '')
+        e._close()
+
 
 class GetLineIndentTest(unittest.TestCase):
     def test_empty_lines(self):
@@ -173,6 +197,16 @@ class IndentAndNewlineTest(unittest.TestCase):
                 nl(event=None)
                 eq(get('1.0', 'end'), test.expected)
 
+        # The same, too far past the lines in the statement index.
+        w.parse.stmt_index.max_extend = 0
+        for test in tests:
+            with self.subTest(label=test.label, max_extend=0):
+                insert(text, test.text)
+                text.mark_set('insert', test.mark)
+                nl(event=None)
+                eq(get('1.0', 'end'), test.expected)
+        del w.parse.stmt_index.max_extend
+
         # Selected text.
         insert(text, '  def f1(self, a, b):\n    return a + b')
         text.tag_add('sel', '1.17', '1.end')
@@ -237,5 +271,66 @@ class RMenuTest(unittest.TestCase):
         pass
 
 
+class ParseDelegatorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        requires('gui')
+        cls.root = Tk()
+        cls.root.withdraw()
+        cls.text = Text(cls.root)
+        cls.percolator = Percolator(cls.text)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.percolator.close()
+        del cls.percolator, cls.text
+        cls.root.destroy()
+        del cls.root
+
+    def test_edits(self):
+        parse = editor.ParseDelegator()
+        self.percolator.insertfilter(parse)
+        self.addCleanup(self.percolator.removefilter, parse)
+        stmt_start = parse.stmt_index.stmt_start
+        text = self.text
+        text.insert('1.0', 'x = [\n1,\n2]\ny = 1\n')
+        self.assertEqual([stmt_start(n) for n in range(1, 6)],
+                         [1, 1, 1, 4, 4])
+        text.delete('1.4')
+        self.assertEqual([stmt_start(n) for n in range(1, 6)],
+                         [1, 2, 3, 4, 4])
+        text.insert('2.0', '(')
+        self.assertEqual([stmt_start(n) for n in range(1, 6)],
+                         [1, 2, 2, 4, 4])
+        self.assertEqual(parse.revision, 3)
+
+    def test_edit_at_end(self):
+        parse = editor.ParseDelegator()
+        self.percolator.insertfilter(parse)
+        self.addCleanup(self.percolator.removefilter, parse)
+        stmt_start = parse.stmt_index.stmt_start
+        text = self.text
+        text.delete('1.0', 'end')
+        text.insert('1.0', 'x = 1\ny = 2')
+        self.assertEqual(stmt_start(3), 2)
+        # 'end' is on line 3, but the text goes at the end of line 2.
+        text.insert('end', ' + (')
+        text.insert('end', '\n1)')
+        self.assertEqual(stmt_start(3), 2)
+
+    def test_cached(self):
+        parse = editor.ParseDelegator()
+        self.percolator.insertfilter(parse)
+        self.addCleanup(self.percolator.removefilter, parse)
+        compute = Func(result=[])
+        value = parse.cached('key', compute)
+        self.assertIs(parse.cached('key', compute), value)
+        self.assertEqual(compute.called, 1)
+        self.text.insert('1.0', 'a')
+        parse.cached('key', compute)
+        self.assertEqual(compute.called, 2)
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
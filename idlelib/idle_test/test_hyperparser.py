@@ -4,7 +4,8 @@ from idlelib.hyperparser import HyperParser
 import unittest
 from test.support import requires
 from tkinter import Tk, Text
-from idlelib.editor import EditorWindow
+from idlelib.editor import EditorWindow, ParseDelegator
+from idlelib.percolator import Percolator
 
 class DummyEditwin:
     def __init__(self, text):
@@ -200,6 +201,37 @@ class HyperParserTest(unittest.TestCase):
         p = get('12.6')
         self.assertEqual(p.get_expression(), 'cliché')
 
+    def test_cache(self):
+        percolator = Percolator(self.text)
+        self.addCleanup(percolator.close)
+        parse = ParseDelegator()
+        percolator.insertfilter(parse)
+        self.editwin.parse = parse
+        self.addCleanup(delattr, self.editwin, 'parse')
+        self.editwin.prompt_last_line = ''
+        get = self.get_parser
+
+        p = get('7.14')
+        self.assertEqual(p.get_expression(), 'l')
+        self.assertEqual(p.get_surrounding_brackets(), ('6.4', '7.14'))
+        # Same statement and line, same parse.
+        q = get('7.9')
+        self.assertIs(q.bracketing, p.bracketing)
+        self.assertEqual(q.get_expression(), 'py')
+        # An edit invalidates it.
+        self.text.insert('7.14', 'ist')
+        p = get('7.17')
+        self.assertIsNot(p.bracketing, q.bracketing)
+        self.assertEqual(p.get_expression(), 'list')
+        # Too far past the indexed lines, it is parsed as without the index.
+        parse.stmt_index.invalidate(1)
+        parse.stmt_index.max_extend = 0
+        p = get('7.17')
+        self.assertEqual(parse.stmt_index.count, 0)
+        self.assertEqual(p.get_expression(), 'list')
+        self.assertEqual(p.get_surrounding_brackets(), ('6.4', '7.17'))
+        self.assertIs(get('7.9').bracketing, p.bracketing)
+
     def test_eat_identifier(self):
         def is_valid_id(candidate):
             result = HyperParser._eat_identifier(candidate, 0, len(candidate))
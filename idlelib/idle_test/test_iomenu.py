@@ -2,10 +2,13 @@
 
 from idlelib import iomenu
 import unittest
+from unittest import mock
 from test.support import requires
 from tkinter import Tk
 from idlelib.editor import EditorWindow
 from idlelib import util
+import os
+import tempfile
 from idlelib.idle_test.mock_idle import Func
 
 # Fail if either tokenize.open and t.detect_encoding does not exist.
@@ -57,6 +60,135 @@ class IOBindingTest(unittest.TestCase):
         eq(text.get('1.0', 'end-1c'), 'a\n')
         eq(fix(), 'a'+io.eol_convention)
 
+    def test_loadfile_large(self):
+        io = self.io
+        editwin = self.editwin
+        text = io.text
+        chars = ''.join(f'line {i}\n' for i in range(10))
+        with tempfile.TemporaryDirectory() as tmp:
+            with tempfile.NamedTemporaryFile('w', suffix='.txt', dir=tmp,
+                                             delete=False) as f:
+                f.write(chars)
+            filename = f.name
+            io.updaterecentfileslist = Func()
+            io.chunk_size = 15
+            editwin.large_file_lines = 5
+            try:
+                with mock.patch.object(text, 'insert',
+                                       wraps=text.insert) as insert:
+                    self.assertTrue(io.loadfile(filename))
+                self.assertTrue(editwin.large_file)
+                self.assertEqual(text.get('1.0', 'end-1c'), chars)
+                # Whole lines of up to 15 characters.
+                self.assertEqual(insert.call_count, 5)
+                insert.assert_called_with('end-1c', 'line 8\nline 9\n')
+            finally:
+                del io.updaterecentfileslist, io.chunk_size
+                del editwin.large_file_lines
+                editwin.set_large_file(False)
+                text.delete('1.0', 'end')
+
+
+    def test_start_load(self):
+        io = self.io
+        editwin = self.editwin
+        text = io.text
+        chars = ''.join(f'line {i}\r\n' for i in range(100))
+        with tempfile.TemporaryDirectory() as tmp:
+            with tempfile.NamedTemporaryFile('wb', suffix='.txt', dir=tmp,
+                                             delete=False) as f:
+                f.write(chars.encode())
+            io.updaterecentfileslist = Func()
+            io.chunk_size = 100
+            editwin.large_file_chars = 500
+            try:
+                # The first chunk is in before loadfile returns.
+                self.assertTrue(io.loadfile(f.name))
+                self.assertIsNotNone(io.loader)
+                self.assertTrue(editwin.large_file)
+                self.assertEqual(io.filename, f.name)
+                self.assertEqual(text.get('1.0', 'end-1c'),
+                                 chars[:100].replace('\r\n', '\n'))
+                self.assertIn('%', editwin.status_bar.labels['load']['text'])
+                while io.loader:
+                    self.root.update()
+                self.assertEqual(text.get('1.0', 'end-1c'),
+                                 chars.replace('\r\n', '\n'))
+                self.assertEqual(io.eol_convention, '\r\n')
+                self.assertTrue(io.get_saved())
+                self.assertEqual(io.updaterecentfileslist.args, (f.name,))
+
+                # Cancel keeps the part loaded, not as the file.
+                self.assertTrue(io.loadfile(f.name))
+                io.cancel_load()
+                self.assertIsNone(io.loader)
+                self.assertIsNone(io.filename)
+                self.assertEqual(text.get('1.0', 'end-1c'),
+                                 chars[:100].replace('\r\n', '\n'))
+            finally:
+                io.stop_load()
+                del io.updaterecentfileslist, io.chunk_size
+                del editwin.large_file_chars
+                editwin.set_large_file(False)
+                io.set_filename(None)
+                text.delete('1.0', 'end')
+
+
+class FileLoaderTest(unittest.TestCase):
+
+    def load(self, data, **kwds):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(data)
+        self.addCleanup(os.remove, f.name)
+        results = []
+        for use_mmap in True, False:
+            loader = iomenu.FileLoader(f.name, chunk_size=3,
+                                       use_mmap=use_mmap, **kwds)
+            self.addCleanup(loader.close)
+            chunks = []
+            while chars := loader.read():
+                chunks.append(chars)
+            self.assertEqual(loader.pos, len(data))
+            self.assertEqual(loader.map is not None, use_mmap and bool(data))
+            results.append((loader, chunks))
+        self.assertEqual(results[0][1], results[1][1])
+        return results[0]
+
+    def test_read(self):
+        loader, chunks = self.load('a = "\u00e9\u00e9"\r\nb\r\n'.encode())
+        self.assertEqual(''.join(chunks), 'a = "\u00e9\u00e9"\nb\n')
+        self.assertEqual(loader.encoding, 'utf-8')
+        self.assertEqual(loader.newlines, '\r\n')
+
+    def test_encoding(self):
+        loader, chunks = self.load(b'\xef\xbb\xbfx\n')
+        self.assertEqual(chunks, ['x\n'])
+        self.assertEqual(loader.encoding, 'utf-8-sig')
+
+        data = '# coding: latin-1\n\u00e9\n'.encode('latin-1')
+        loader, chunks = self.load(data)
+        self.assertEqual(''.join(chunks), '# coding: latin-1\n\u00e9\n')
+
+
+        # Two lines are checked for a declaration, the rest when read.
+        data = b'\n\n\n\xe9\n'
+        loader, chunks = self.load(data, encoding='latin-1')
+        self.assertEqual(''.join(chunks), '\n\n\n\u00e9\n')
+        with self.assertRaises(SyntaxError):
+            self.load(data[2:])
+        with self.assertRaises(UnicodeDecodeError):
+            self.load(data)
+
+    def test_mixed_newlines(self):
+        loader, chunks = self.load(b'a\nb\r\nc\rd')
+        self.assertEqual(''.join(chunks), 'a\nb\nc\nd')
+        self.assertIsInstance(loader.newlines, tuple)
+
+    def test_empty(self):
+        loader, chunks = self.load(b'')
+        self.assertEqual(chunks, [])
+        self.assertIsNone(loader.newlines)
+
 
 def _extension_in_filetypes(extension):
     return any(
@@ -67,6 +67,7 @@ class OutputWindowTest(unittest.TestCase):
         delete('1.0', 'end')
         test_text = 'test text'
         eq(write(test_text), len(test_text))
+        self.window.flush()
         eq(get('1.0', '1.end'), 'test text')
         eq(get('insert linestart', 'insert lineend'), 'test text')
 
@@ -74,6 +75,7 @@ class OutputWindowTest(unittest.TestCase):
         delete('1.0', 'end')
         test_text = 'test text\n'
         eq(write(test_text), len(test_text))
+        self.window.flush()
         eq(get('1.0', '1.end'), 'test text')
         eq(get('insert linestart', 'insert lineend'), '')
 
@@ -81,6 +83,7 @@ class OutputWindowTest(unittest.TestCase):
         delete('1.0', 'end')
         test_text = 'test text\nLine 2'
         eq(write(test_text), len(test_text))
+        self.window.flush()
         eq(get('1.0', '1.end'), 'test text')
         eq(get('2.0', '2.end'), 'Line 2')
         eq(get('insert linestart', 'insert lineend'), 'Line 2')
@@ -91,6 +94,7 @@ class OutputWindowTest(unittest.TestCase):
         test_text2 = 'Line 2\n'
         eq(write(test_text, tags='mytag'), len(test_text))
         eq(write(test_text2, tags='secondtag'), len(test_text2))
+        self.window.flush()
         eq(get('mytag.first', 'mytag.last'), test_text)
         eq(get('secondtag.first', 'secondtag.last'), test_text2)
         eq(get('1.0', '1.end'), test_text.rstrip('\n'))
@@ -102,11 +106,35 @@ class OutputWindowTest(unittest.TestCase):
         writelines = self.window.writelines
 
         writelines(('Line 1\n', 'Line 2\n', 'Line 3\n'))
+        self.window.flush()
         eq(get('1.0', '1.end'), 'Line 1')
         eq(get('2.0', '2.end'), 'Line 2')
         eq(get('3.0', '3.end'), 'Line 3')
         eq(get('insert linestart', 'insert lineend'), '')
 
+    def test_flush(self):
+        eq = self.assertEqual
+        w = self.window
+        get = self.text.get
+
+        # A write right after an insert is held.
+        w.flush()
+        w.rendered = outwin.time.monotonic()
+        w.write('held ', 'mytag')
+        w.write('output', 'mytag')
+        eq(get('1.0', 'end-1c'), '')
+        eq(w.pending, [(('mytag', 'insert'), ['held ', 'output'])])
+        self.assertIsNotNone(w.render_after)
+        w.flush()
+        eq(get('mytag.first', 'mytag.last'), 'held output')
+        eq(w.pending, [])
+        self.assertIsNone(w.render_after)
+
+        # Or inserted once the interval has passed.
+        w.rendered = 0.0
+        w.write('\nnow')
+        eq(get('2.0', '2.end'), 'now')
+
     def test_goto_file_line(self):
         eq = self.assertEqual
         w = self.window
@@ -479,5 +479,94 @@ class PyParseTest(unittest.TestCase):
                 eq(bracketing(), test.bracket)
 
 
+class StatementIndexTest(unittest.TestCase):
+
+    code = ('def f(a,\n'        # 1
+            '      b):\n'       # 2
+            '    """Doc.\n'     # 3
+            '\n'                # 4
+            '    """\n'         # 5
+            '    # c\n'         # 6
+            '    x = \\\n'      # 7
+            '        1\n'       # 8
+            '\n'                # 9
+            "s = 'a\\\n"        # 10
+            "b'\n")             # 11
+
+    def setUp(self):
+        self.lines = self.code.splitlines(keepends=True)
+        self.calls = []
+        self.index = pyparse.StatementIndex(self.get_lines)
+
+    def get_lines(self, first, last):
+        self.calls.append((first, last))
+        return ''.join(self.lines[first-1:last-1])
+
+    def test_line_states(self):
+        self.assertEqual(pyparse._line_states(self.code), [
+                ((1,), ''), ((), ''), ((), '"""'), ((), '"""'), ((), ''),
+                ((), ''), ((), '\\'), ((), ''), ((), ''), ((), "'"),
+                ((), '')])
+        # Starting on line 5 in a string within a bracket opened on line 2.
+        self.assertEqual(
+                pyparse._line_states('a"""\nb(\n)]\n', 5, (2,), '"""'),
+                [((2,), ''), ((2, 6), ''), ((), '')])
+
+    def test_stmt_start(self):
+        starts = [self.index.stmt_start(n) for n in range(1, 13)]
+        self.assertEqual(starts, [1, 1, 3, 3, 3, 6, 7, 7, 7, 10, 10, 10])
+        self.assertEqual(self.calls, [(n, n + 1) for n in range(1, 13)])
+        self.calls.clear()
+        self.assertEqual(self.index.stmt_start(12), 10)
+        self.assertEqual(self.calls, [])
+
+    def test_max_extend(self):
+        index = self.index
+        index.max_extend = 3
+        self.assertIsNone(index.stmt_start(4))
+        self.assertIsNone(index.indent_start(4))
+        self.assertEqual(self.calls, [])
+        self.assertEqual(index.stmt_start(3), 3)
+        self.assertEqual(index.stmt_start(6), 6)
+        self.assertEqual(index.indent_start(7), 6)
+        self.assertEqual(self.calls, [(1, 4), (4, 7), (7, 8)])
+        self.assertIsNone(index.stmt_start(11))
+
+    def test_invalidate(self):
+        index = self.index
+        self.assertEqual(index.stmt_start(8), 7)
+        # Close the docstring on line 3.
+        self.lines[2] = '    """Doc."""\n'
+        index.invalidate(3)
+        self.calls.clear()
+        self.assertEqual(index.stmt_start(5), 5)
+        self.assertEqual(self.calls, [(3, 6)])
+        self.assertEqual(index.stmt_start(4), 3)
+        self.assertEqual(index.count, 5)
+        # Stale entries after the edit are overwritten, not deleted.
+        index.invalidate(2)
+        self.assertEqual(index.count, 1)
+        self.assertEqual(len(index.starts), 8)
+        self.assertEqual(index.stmt_start(3), 3)
+        self.assertEqual(len(index.starts), 8)
+
+    def test_indent_start(self):
+        self.lines = ['x = {\n',               # 1
+                      "    'a': [1,\n",        # 2
+                      '          2],\n',       # 3
+                      "    'b': '''\n",        # 4
+                      "''', 'c': (\n",         # 5
+                      '\n']                    # 6
+        index = self.index
+        # The line of the innermost bracket.
+        self.assertEqual(index.indent_start(2), 1)
+        self.assertEqual(index.indent_start(3), 2)
+        self.assertEqual(index.indent_start(4), 1)
+        # In a string.
+        self.assertEqual(index.indent_start(5), 1)
+        # The bracket line starts in a string.
+        self.assertEqual(index.indent_start(6), 1)
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
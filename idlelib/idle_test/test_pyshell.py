@@ -1,8 +1,12 @@
-"Test pyshell, coverage 12%."
+"Test pyshell, coverage 24%."
 # Plus coverage of test_warning.  Was 20% with test_openshell.
 
 from idlelib import pyshell
+import subprocess
+import sys
+import time
 import unittest
+from unittest import mock
 from test.support import requires
 from tkinter import Tk
 
@@ -60,6 +64,136 @@ class PyShellFileListTest(unittest.TestCase):
 ##        self.assertIsInstance(ps, pyshell.PyShell)
 
 
+class DummyInterp:
+    "Start subprocesses running code, with argv[-1] the address."
+    port = 0
+    subprocess_arglist = None
+    forkserver = None
+    build_forkserver_arglist = (
+            pyshell.ModifiedInterpreter.build_forkserver_arglist)
+    spawn_subprocess = pyshell.ModifiedInterpreter.spawn_subprocess
+    close_forkserver = pyshell.ModifiedInterpreter.close_forkserver
+
+    def __init__(self, code="import time; time.sleep(60)"):
+        self.code = code
+
+    def unix_rpcclient(self):
+        return None
+
+    def build_subprocess_arglist(self, port=None):
+        if port is None:
+            port = self.port
+        return [sys.executable, '-c', self.code, str(port)]
+
+    def popen_subprocess(self, arglist, pass_fds=()):
+        return subprocess.Popen(arglist, pass_fds=pass_fds)
+
+
+class SpareSubprocessTest(unittest.TestCase):
+    sleep = DummyInterp().code
+    connect = ("import socket, sys, time; "
+               "s = socket.create_connection(('127.0.0.1', int(sys.argv[-1])))"
+               "; time.sleep(60)")
+
+    def spare(self, code):
+        spare = pyshell.SpareSubprocess(DummyInterp(code))
+        self.addCleanup(spare.close)
+        return spare
+
+    def assertClosed(self, spare):
+        self.assertIsNotNone(spare.rpcsubproc.returncode)
+        self.assertEqual(spare.rpcclt.listening_sock.fileno(), -1)
+
+    def test_close_unconnected(self):
+        spare = self.spare(self.sleep)
+        self.assertFalse(spare.poll_connect())
+        self.assertFalse(spare.expired())
+        spare.close()
+        self.assertClosed(spare)
+
+    def test_close_connected(self):
+        spare = self.spare(self.connect)
+        self.assertTrue(spare.poll_connect(10))
+        sock = spare.rpcclt.sock
+        spare.close()
+        self.assertClosed(spare)
+        self.assertIsNone(spare.rpcclt.sock)
+        self.assertEqual(sock.fileno(), -1)
+
+    def test_take_socket(self):
+        spare = self.spare(self.connect)
+        self.assertTrue(spare.poll_connect(10))
+        sock = spare.take_socket()
+        self.addCleanup(sock.close)
+        self.assertIsNone(spare.rpcclt.sock)
+        spare.close()
+        self.assertClosed(spare)
+        self.assertNotEqual(sock.fileno(), -1)
+
+    def test_close_kills_on_error(self):
+        spare = self.spare(self.sleep)
+        with mock.patch.object(spare.rpcclt, 'close_listening',
+                               side_effect=OSError):
+            self.assertRaises(OSError, spare.close)
+        self.assertIsNotNone(spare.rpcsubproc.returncode)
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'Linux only')
+class ForkServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.interp = DummyInterp()
+        self.interp.forkserver = pyshell.ForkServer(self.interp, ('json',))
+        self.addCleanup(self.interp.close_forkserver)
+
+    def kill(self, proc):
+        proc.kill()
+        proc.wait()
+
+    def wait_ready(self, forkserver):
+        deadline = time.monotonic() + 10
+        while not forkserver.poll_ready():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_fork_subprocess(self):
+        forkserver = self.interp.forkserver
+        self.wait_ready(forkserver)
+        rpcclt = pyshell.MyRPCClient((pyshell.HOST, 0))
+        self.addCleanup(rpcclt.close_listening)
+        proc = forkserver.fork_subprocess(rpcclt.subprocess_address())
+        self.assertIsInstance(proc, pyshell.ForkedSubprocess)
+        self.addCleanup(self.kill, proc)
+        rpcclt.listening_sock.settimeout(10)
+        rpcclt.accept()
+        self.addCleanup(rpcclt.close)
+        tip = rpcclt.remotecall('exec', 'get_the_calltip', ('len',), {})
+        self.assertTrue(tip.startswith('(obj'))
+        self.assertIsNone(proc.poll())
+        self.kill(proc)
+        self.assertEqual(proc.returncode, -1)
+
+    def test_spawn_without_server(self):
+        self.interp.close_forkserver()
+        self.interp.spawn_subprocess()
+        self.addCleanup(self.kill, self.interp.rpcsubproc)
+        self.assertIsInstance(self.interp.rpcsubproc, subprocess.Popen)
+
+    def test_spawn_with_dead_server(self):
+        for ready in (False, True):
+            with self.subTest(ready=ready):
+                interp = DummyInterp()
+                interp.forkserver = forkserver = pyshell.ForkServer(interp, ())
+                self.addCleanup(forkserver.close)
+                if ready:
+                    self.wait_ready(forkserver)
+                self.kill(forkserver.proc)
+                interp.spawn_subprocess()
+                self.addCleanup(self.kill, interp.rpcsubproc)
+                self.assertIsInstance(interp.rpcsubproc, subprocess.Popen)
+                self.assertIsNone(interp.forkserver)
+
+
 class PyShellRemoveLastNewlineAndSurroundingWhitespaceTest(unittest.TestCase):
     regexp = pyshell.PyShell._last_newline_re
 
@@ -1,10 +1,15 @@
-"Test rpc, coverage 20%."
+"Test rpc, coverage 70%."
 
 from idlelib import rpc
+import os
+import pickle
+import socket
+import struct
+import tempfile
+import threading
 import unittest
 
 
-
 class CodePicklerTest(unittest.TestCase):
 
     def test_pickle_unpickle(self):
@@ -25,5 +30,265 @@ class CodePicklerTest(unittest.TestCase):
         self.assertIn(b'test_rpc.py', rpc.dumps(f.__code__))
 
 
+class SocketIOReceiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.wsock, rsock = socket.socketpair()
+        self.sockio = rpc.SocketIO(rsock, objtable={}, debugging=False)
+
+    def tearDown(self):
+        self.wsock.close()
+        self.sockio.close()
+
+    def send_frames(self, *payloads):
+        data = b''.join(struct.pack("<i", len(p)) + p for p in payloads)
+        self.wsock.sendall(data)
+
+    def test_small_packets_in_one_read(self):
+        self.send_frames(b'abc', b'', b'defgh')
+        poll = self.sockio.pollpacket
+        self.assertEqual(bytes(poll(1)), b'abc')
+        self.assertEqual(bytes(poll(1)), b'')
+        self.assertEqual(bytes(poll(1)), b'defgh')
+        self.assertIsNone(poll(0))
+
+    def test_split_header_and_body(self):
+        data = struct.pack("<i", 5) + b'hello'
+        self.wsock.sendall(data[:2])
+        self.assertIsNone(self.sockio.pollpacket(0.01))
+        self.wsock.sendall(data[2:6])
+        self.assertIsNone(self.sockio.pollpacket(0.01))
+        self.wsock.sendall(data[6:])
+        self.assertEqual(bytes(self.sockio.pollpacket(1)), b'hello')
+
+    def test_packet_straddles_stage_buffer(self):
+        first = b'x' * (rpc.BUFSIZE - 100)
+        second = b'y' * 500
+        self.send_frames(first, second)
+        self.assertEqual(bytes(self.sockio.pollpacket(1)), first)
+        self.assertEqual(bytes(self.sockio.pollpacket(1)), second)
+
+    def test_large_packet(self):
+        big = bytes(range(256)) * (4 * rpc.BUFSIZE)
+        # Write from a thread since the payload exceeds the socket buffer.
+        writer = threading.Thread(target=self.send_frames,
+                                  args=(big, b'tail'))
+        writer.start()
+        self.assertEqual(self.sockio.pollpacket(1), big)
+        self.assertEqual(bytes(self.sockio.pollpacket(1)), b'tail')
+        writer.join()
+
+    def test_packet_ready(self):
+        self.assertFalse(self.sockio.packet_ready())
+        self.send_frames(b'one', b'two')
+        self.sockio.pollpacket(1)
+        self.assertTrue(self.sockio.packet_ready())
+        self.sockio.pollpacket(1)
+        self.assertFalse(self.sockio.packet_ready())
+
+    def test_response_queue_wakeup(self):
+        queue = rpc.response_queue
+        self.assertIsNotNone(queue.wakeup_sock)
+        threading.Timer(0.05, queue.put, ((2, 'done'),)).start()
+        # Returns when the response is queued, not after the full wait.
+        self.assertIsNone(self.sockio.pollpacket(60))
+        self.assertEqual(queue.get(0), (2, 'done'))
+        self.assertIsNone(self.sockio.pollpacket(0))
+
+    def test_pollresponse_sends_all_queued(self):
+        for seq in 2, 4, 6:
+            rpc.response_queue.put((seq, None))
+        self.assertIsNone(self.sockio.pollresponse(None, 0))
+        self.assertTrue(rpc.response_queue.empty())
+        peer = rpc.SocketIO(self.wsock, objtable={}, debugging=False)
+        seqs = [peer.pollmessage(1)[0] for _ in range(3)]
+        self.assertEqual(seqs, [2, 4, 6])
+
+    def test_pollmessage(self):
+        message = (2, ('OK', ['item'] * 10000))
+        self.send_frames(pickle.dumps(message))
+        self.assertEqual(self.sockio.pollmessage(1), message)
+
+    def test_eof(self):
+        self.wsock.close()
+        with self.assertRaises(EOFError):
+            self.sockio.pollpacket(1)
+
+
+class SocketIOSendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.wsock, rsock = socket.socketpair()
+        self.sockio = rpc.SocketIO(self.wsock, objtable={}, debugging=False)
+        self.reader = rpc.SocketIO(rsock, objtable={}, debugging=False)
+
+    def tearDown(self):
+        self.wsock.close()
+        self.reader.close()
+
+    def test_putmessage(self):
+        message = (1, ('CALL', ('oid', 'meth', (1, 2), {})))
+        self.sockio.putmessage(message)
+        self.assertEqual(self.reader.pollmessage(1), message)
+        self.assertEqual(self.sockio.outqueue, [])
+        self.assertFalse(self.sockio.sending)
+
+    def test_sendparts_without_sendmsg(self):
+        sent = []
+        class Sock:
+            sendall = sent.append
+        self.sockio.sock = Sock()
+        self.sockio.putmessage((3, ('OK', None)))
+        payload = rpc.dumps((3, ('OK', None)))
+        self.assertEqual(sent, [struct.pack("<i", len(payload)) + payload])
+
+    def test_sendparts_partial(self):
+        chunks = []
+        class Sock:
+            def sendmsg(self, parts):
+                data = b''.join(parts)[:3]  # Short writes.
+                chunks.append(data)
+                return len(data)
+        self.sockio.sock = Sock()
+        self.sockio._sendparts([b'ab', b'cdefg', b'h'])
+        self.assertEqual(b''.join(chunks), b'abcdefgh')
+
+    def test_no_socket(self):
+        self.sockio.close()
+        self.assertRaises(OSError, self.sockio.putmessage, (5, ('OK', 1)))
+        self.assertFalse(self.sockio.sending)
+
+    def test_threads_do_not_interleave(self):
+        messages = [(seq, ('OK', 'x' * seq * 100)) for seq in range(40)]
+        def send(seqs):
+            for seq in seqs:
+                self.sockio.putmessage(messages[seq])
+        threads = [threading.Thread(target=send, args=(range(i, 40, 4),))
+                   for i in range(4)]
+        for t in threads:
+            t.start()
+        received = [self.reader.pollmessage(1) for _ in messages]
+        for t in threads:
+            t.join()
+        self.assertCountEqual(received, messages)
+
+
+class Target:
+
+    def add(self, a, b):
+        return a + b
+
+    def fail(self):
+        raise ValueError('fail')
+
+
+class PeerIO(rpc.SocketIO):
+
+    def exithook(self):
+        raise EOFError  # Return from mainloop() rather than exit.
+
+
+class FutureTest(unittest.TestCase):
+
+    def setUp(self):
+        csock, ssock = socket.socketpair()
+        self.client = rpc.SocketIO(csock, objtable={}, debugging=False)
+        server = PeerIO(ssock, objtable={'t': Target()}, debugging=False)
+        self.server_thread = threading.Thread(target=self.serve,
+                                              args=(server,))
+        self.server_thread.start()
+
+    def serve(self, server):
+        server.sockthread = threading.current_thread()
+        server.mainloop()
+        server.close()
+
+    def tearDown(self):
+        self.client.close()
+        self.server_thread.join()
+
+    def test_submit(self):
+        futures = [self.client.submit('t', 'add', (i, 1), {})
+                   for i in range(5)]
+        # Responses read while waiting for the last one are kept.
+        self.assertEqual(futures[-1].result(), 5)
+        self.assertTrue(all(f.done() for f in futures))
+        self.assertEqual([f.result() for f in futures], [1, 2, 3, 4, 5])
+        self.assertEqual(self.client.pending, set())
+        self.assertEqual(self.client.responses, {})
+
+    def test_done(self):
+        future = self.client.submit('t', 'add', ('a', 'b'), {})
+        while not future.done():
+            pass
+        self.assertEqual(future.result(), 'ab')
+
+    def test_exception(self):
+        future = self.client.submit('t', 'fail', (), {})
+        for _ in range(2):
+            with self.assertRaisesRegex(ValueError, 'fail'):
+                future.result()
+
+    def test_batch(self):
+        with self.client.batch():
+            futures = [self.client.submit('t', 'add', (i, i), {})
+                       for i in range(3)]
+            self.assertEqual(len(self.client.outqueue), 6)
+        self.assertEqual(self.client.outqueue, [])
+        self.assertEqual([f.result() for f in futures], [0, 2, 4])
+
+    def test_wait_in_batch(self):
+        with self.client.batch():
+            self.assertEqual(self.client.remotecall('t', 'add', (1, 2), {}),
+                             3)
+            future = self.client.submit('t', 'add', (3, 4), {})
+            self.assertEqual(future.result(), 7)
+
+    def test_other_thread(self):
+        results = []
+        def call():
+            results.append(self.client.submit('t', 'add', (2, 2), {}))
+            results.append(results[0].result())
+        thread = threading.Thread(target=call)
+        thread.start()
+        while thread.is_alive():
+            self.client.pollresponse(None, 0.01)
+        thread.join()
+        self.assertEqual(results[1], 4)
+
+
+class ConnectTest(unittest.TestCase):
+
+    def connect(self, address, family=socket.AF_INET):
+        client = rpc.RPCClient(address, family)
+        self.addCleanup(client.listening_sock.close)
+        server = rpc.RPCServer(client.listening_sock.getsockname())
+        self.addCleanup(server.socket.close)
+        client.accept()
+        self.addCleanup(client.close)
+        peer = rpc.SocketIO(server.socket, objtable={}, debugging=False)
+        client.putmessage((1, ('OK', 'hello')))
+        self.assertEqual(peer.pollmessage(1), (1, ('OK', 'hello')))
+        return client
+
+    def test_tcp(self):
+        client = self.connect((rpc.LOCALHOST, 0))
+        self.assertTrue(client.sock.getsockopt(socket.IPPROTO_TCP,
+                                               socket.TCP_NODELAY))
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'requires AF_UNIX')
+    def test_unix(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            client = self.connect(os.path.join(tmp, 'rpc'), socket.AF_UNIX)
+            self.assertEqual(client.sock.family, socket.AF_UNIX)
+
+    def test_bind_error_closes_socket(self):
+        client = rpc.RPCClient((rpc.LOCALHOST, 0))
+        self.addCleanup(client.listening_sock.close)
+        address = client.listening_sock.getsockname()
+        with self.assertRaises(OSError):
+            rpc.RPCClient(address)
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -3,6 +3,8 @@
 from idlelib import run
 import io
 import sys
+import threading
+import time
 from test.support import captured_output, captured_stderr
 import unittest
 from unittest import mock
@@ -328,6 +330,88 @@ class StdOutputFilesTest(unittest.TestCase):
         self.assertRaises(TypeError, f.close, 1)
 
 
+class OutputBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.shell = MockShell()
+        self.buffer = run.OutputBuffer(self.shell, maxsize=20, delay=60)
+        self.stdout = run.StdOutputFile(self.shell, 'stdout',
+                                        writebuffer=self.buffer)
+        self.stderr = run.StdOutputFile(self.shell, 'stderr',
+                                        writebuffer=self.buffer)
+
+    def test_coalesce_and_order(self):
+        self.assertEqual(self.stdout.write('a'), 1)
+        self.stdout.write('b')
+        self.stderr.write('E')
+        self.stdout.write('c')
+        self.assertEqual(self.shell.written, [])
+        self.stdout.flush()
+        self.assertEqual(self.shell.written,
+                         [('ab', 'stdout'), ('E', 'stderr'), ('c', 'stdout')])
+        self.shell.reset()
+        self.buffer.flush()
+        self.assertEqual(self.shell.written, [])
+
+    def test_size_limit(self):
+        self.stdout.write('x' * 15)
+        self.assertEqual(self.shell.written, [])
+        self.stdout.write('y' * 5)
+        self.assertEqual(self.shell.written, [('x' * 15 + 'y' * 5, 'stdout')])
+        self.assertEqual(self.buffer.size, 0)
+
+    def test_deadline(self):
+        self.buffer.delay = 0.001
+        sent = threading.Event()
+        self.shell.write = lambda *args: sent.set()
+        self.stdout.write('late')
+        self.assertTrue(sent.wait(5))
+
+    def test_timer_waits_for_sender(self):
+        sending = threading.Event()
+        release = threading.Event()
+        def write(s, tags):
+            sending.set()
+            release.wait(5)
+            self.shell.written.append((s, tags))
+        self.shell.write = write
+        self.stdout.write('first')
+        sender = threading.Thread(target=self.buffer.flush)
+        sender.start()
+        self.assertTrue(sending.wait(5))
+
+        # A deadline passing while the other thread sends does not make
+        # the timer thread spin.
+        waits = []
+        cond_wait = self.buffer.cond.wait
+        def wait(timeout=None):
+            waits.append(timeout)
+            return cond_wait(timeout)
+        self.buffer.cond.wait = wait
+        self.buffer.delay = 0.001
+        self.stdout.write('late')
+        time.sleep(0.1)
+        self.assertLess(len(waits), 5)
+        release.set()
+        sender.join(5)
+        self.assertEqual(self.shell.written,
+                         [('first', 'stdout'), ('late', 'stdout')])
+
+    def test_close_flushes(self):
+        self.stdout.write('test')
+        self.stdout.close()
+        self.assertEqual(self.shell.written, [('test', 'stdout')])
+
+    def test_flush_stdout_before_input(self):
+        self.addCleanup(setattr, run, 'output_buffer', None)
+        run.output_buffer = self.buffer
+        self.stdout.write('prompt: ')
+        self.shell.push(['answer\n'])
+        stdin = run.StdInputFile(self.shell, 'stdin')
+        self.assertEqual(stdin.readline(), 'answer\n')
+        self.assertEqual(self.shell.written, [('prompt: ', 'stdout')])
+
+
 class RecursionLimitTest(unittest.TestCase):
     # Test (un)install_recursionlimit_wrappers and fixdoc.
 
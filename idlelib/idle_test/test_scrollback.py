@@ -0,0 +1,209 @@
+"Test scrollback, coverage 90%."
+
+from tkinter import Text, Tk
+import unittest
+from unittest.mock import NonCallableMagicMock, patch
+from test.support import requires
+
+from idlelib.colorizer import ColorDelegator
+from idlelib.editor import ParseDelegator
+from idlelib.percolator import Percolator
+from idlelib.scrollback import Scrollback, ScrollbackButton
+from idlelib.spool import Spool
+from idlelib.squeezer import ExpandingButton
+
+
+class ScrollbackTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        requires('gui')
+        cls.root = Tk()
+        cls.root.withdraw()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.root.update_idletasks()
+        cls.root.destroy()
+        del cls.root
+
+    def setUp(self):
+        text = self.text = Text(self.root)
+        percolator = Percolator(text)
+        self.addCleanup(percolator.close)
+        editwin = self.editwin = NonCallableMagicMock()
+        editwin.text = editwin.per.bottom = text
+        editwin.parse = ParseDelegator()
+        percolator.insertfilter(editwin.parse)
+        # The Shell's UndoDelegator would be above the colorizer.
+        self.color = editwin.undo.delegate = ColorDelegator()
+        percolator.insertfilter(self.color)
+        self.addCleanup(self.color.close)
+        editwin.squeezer.expandingbuttons = []
+        editwin.squeezer.spool = Spool()
+        self.addCleanup(editwin.squeezer.spool.close)
+        self.scrollback = Scrollback(editwin)
+        self.addCleanup(self.scrollback.close)
+        self.scrollback.max_lines = 10
+        text.mark_set('iomark', '1.0')
+
+    def write(self, s, tags='stdout'):
+        self.text.mark_gravity('iomark', 'right')
+        self.text.insert('iomark', s, tags)
+        self.text.mark_gravity('iomark', 'left')
+
+    def lines(self, first, last):
+        return ''.join(f'line {i}\n' for i in range(first, last))
+
+    def test_reload(self):
+        Scrollback.reload()
+        self.assertIsInstance(Scrollback.max_lines, int)
+
+    def test_trim_unlimited(self):
+        self.scrollback.max_lines = 0
+        self.write(self.lines(1, 100))
+        self.scrollback.trim()
+        self.assertEqual(self.scrollback.blocks, [])
+        self.assertIsNone(self.scrollback.button)
+
+    def test_trim_not_yet(self):
+        self.write(self.lines(1, 11))
+        self.scrollback.trim()
+        self.assertEqual(self.scrollback.blocks, [])
+
+    def test_trim(self):
+        text = self.text
+        scrollback = self.scrollback
+        self.write(self.lines(1, 31))
+        self.write('>>> ', 'console')
+        text.insert('end-1c', 'input')
+        scrollback.trim()
+
+        # Lines 1-21 moved out; 9 lines and the prompt are left.
+        self.assertIsInstance(scrollback.button, ScrollbackButton)
+        self.assertEqual(text.index(scrollback.button), '1.0')
+        self.assertEqual(scrollback.button['text'], '较早的输出已移出（共21行）')
+        self.assertEqual(text.get('2.0', 'end-1c'),
+                         self.lines(22, 31) + '>>> input')
+        self.assertEqual(text.get('iomark', 'end-1c'), 'input')
+        self.assertEqual(text.get('stdout.first', 'stdout.last'),
+                         self.lines(22, 31))
+        self.assertEqual(scrollback.get(), self.lines(1, 22))
+        self.assertEqual(list(scrollback.search('line 2')),
+                         ['line 2\n', 'line 20\n', 'line 21\n'])
+        self.editwin.shell_sidebar.update_sidebar.assert_called()
+
+        # A second trim adds a block below the button.
+        self.write(self.lines(31, 40))
+        scrollback.trim()
+        self.assertEqual(len(scrollback.blocks), 2)
+        self.assertEqual(scrollback.numoflines(), 30)
+        self.assertEqual(text.get('2.0', 'iomark'),
+                         '>>> ' + self.lines(31, 40))
+        self.assertEqual(scrollback.get(), self.lines(1, 31))
+
+        # Loading puts the last block back, with its tags.
+        scrollback.load()
+        self.assertEqual(scrollback.numoflines(), 21)
+        self.assertEqual(scrollback.loaded, 9)
+        self.assertEqual(text.get('2.0', 'iomark'),
+                         self.lines(22, 31) + '>>> ' + self.lines(31, 40))
+        self.assertEqual(text.get('stdout.first', 'stdout.first lineend'),
+                         'line 22')
+        self.assertEqual(text.get('console.first', 'console.last'), '>>> ')
+        # It stays until the text is too long again.
+        scrollback.trim()
+        self.assertEqual(scrollback.numoflines(), 21)
+        scrollback.load()
+        self.assertIsNone(scrollback.button)
+        self.assertEqual(text.get('1.0', 'iomark'),
+                         self.lines(1, 31) + '>>> ' + self.lines(31, 40))
+
+    def test_trim_squeezed(self):
+        text = self.text
+        squeezer = self.editwin.squeezer
+        squeezer.editwin = self.editwin
+        self.write(self.lines(1, 5))
+        for s in 'first\n', 'second\n':
+            button = ExpandingButton(s, 'stdout', 1, squeezer)
+            text.mark_gravity('iomark', 'right')
+            text.window_create('iomark', window=button)
+            self.write('\n')
+            squeezer.expandingbuttons.append(button)
+        self.write(self.lines(5, 25))
+        text.update_idletasks()
+        self.scrollback.trim()
+
+        self.assertEqual(squeezer.expandingbuttons, [])
+        self.assertEqual(self.scrollback.get(),
+                         self.lines(1, 5) + 'first\n\nsecond\n\n' +
+                         self.lines(5, 16))
+        self.scrollback.load()
+        first, second = squeezer.expandingbuttons
+        self.assertEqual((first.s, second.s), ('first\n', 'second\n'))
+        self.assertEqual(text.index(first), '6.0')
+        self.assertEqual(text.index(second), '7.0')
+
+    def test_line_states(self):
+        # The colorizer sees the lines moved out and back.
+        text = self.text
+        scrollback = self.scrollback
+
+        def check():
+            nlines = int(text.index('end-1c').split('.')[0])
+            self.assertEqual(len(self.color.line_states), nlines)
+        self.write(self.lines(1, 31))
+        check()
+        scrollback.trim()
+        check()
+        scrollback.load()
+        check()
+
+    def test_trim_expanding(self):
+        text = self.text
+        squeezer = self.editwin.squeezer
+        squeezer.editwin = self.editwin
+        squeezer.count_lines = lambda s: s.count('\n')
+        self.write(self.lines(1, 5))
+        button = ExpandingButton(self.lines(5, 25), 'stdout', 20, squeezer)
+        button.chunk_size = 50
+        squeezer.expandingbuttons.append(button)
+        text.mark_gravity('iomark', 'right')
+        text.window_create('iomark', window=button)
+        self.write('\n' + self.lines(26, 40))
+        button.expand()
+        self.assertIsNotNone(button.expanding)
+
+        # The expansion stops, and what was not inserted is moved out
+        # with the button, once.
+        self.scrollback.trim()
+        self.assertIsNone(button.expanding)
+        self.assertEqual(squeezer.expandingbuttons, [])
+        self.assertEqual(self.scrollback.get(),
+                         self.lines(1, 25) + '\n' + self.lines(26, 31))
+        text.update()
+
+    @patch('idlelib.scrollback.view_text')
+    @patch('idlelib.scrollback.query.Query')
+    def test_button(self, Query, view_text):
+        self.write(self.lines(1, 31))
+        self.scrollback.trim()
+        button = self.scrollback.button
+
+        Query.return_value.result = 'line 1'
+        button.find()
+        self.assertEqual(view_text.call_args.args[2],
+                         'line 1\n' + self.lines(10, 20))
+        Query.return_value.result = 'no such line'
+        button.find()
+        self.assertEqual(view_text.call_args.args[2], '找不到。')
+
+        button.view()
+        self.assertEqual(view_text.call_args.args[2], self.lines(1, 22))
+
+        button.load()
+        self.assertEqual(self.scrollback.blocks, [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
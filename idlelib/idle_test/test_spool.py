@@ -0,0 +1,66 @@
+"Test spool, coverage 100%."
+
+from idlelib.spool import Spool
+import unittest
+
+
+class SpoolTest(unittest.TestCase):
+
+    def test_append_read(self):
+        spool = Spool()
+        self.addCleanup(spool.close)
+        self.assertIsNone(spool.file)
+        strings = ['abc', '', 'cliché\n', '\ud800 lone', 'x' * 100000]
+        keys = [spool.append(s) for s in strings]
+        self.assertIsNotNone(spool.file)
+        for key, s in reversed(list(zip(keys, strings))):
+            self.assertEqual(spool.read(key), s)
+        # Appending after reading does not overwrite.
+        key = spool.append('more')
+        self.assertEqual(spool.read(keys[0]), 'abc')
+        self.assertEqual(spool.read(key), 'more')
+
+    def test_cache(self):
+        spool = Spool()
+        self.addCleanup(spool.close)
+        spool.cache_size = 10
+        a, b, c = (spool.append(s) for s in ('aaaa', 'bbbb', 'c' * 11))
+        s = spool.read(a)
+        self.assertIs(spool.read(a), s)
+        spool.read(b)
+        self.assertEqual(list(spool.cache), [a, b])
+        self.assertEqual(spool.cached, 8)
+        spool.read(a)
+        spool.append('dddd')
+        spool.read((spool.size - 4, 4))
+        self.assertEqual(list(spool.cache), [a, (spool.size - 4, 4)])
+        self.assertEqual(spool.read(c), 'c' * 11)  # Too big to keep.
+        self.assertEqual(spool.cached, 8)
+
+    def test_slice(self):
+        spool = Spool()
+        self.addCleanup(spool.close)
+        spool.append('abc')
+        s = 'cliché\n\ud800 lone\n€'
+        key = spool.append(s)
+        size = spool.size
+        for start, stop in ((0, None), (3, None), (0, 7), (5, 11), (8, 8)):
+            with self.subTest(start=start, stop=stop):
+                part = spool.slice(key, s, start, stop)
+                self.assertEqual(spool.read(part), s[start:stop])
+        self.assertEqual(spool.size, size)
+
+    def test_close(self):
+        spool = Spool()
+        spool.read(spool.append('abc'))
+        f = spool.file
+        spool.close()
+        self.assertTrue(f.closed)
+        self.assertIsNone(spool.file)
+        self.assertEqual(spool.size, 0)
+        self.assertEqual(spool.cache, {})
+        spool.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -7,7 +7,9 @@ from unittest.mock import Mock, NonCallableMagicMock, patch, sentinel, ANY
 from test.support import requires
 
 from idlelib.config import idleConf
+from idlelib.editor import ParseDelegator
 from idlelib.percolator import Percolator
+from idlelib.spool import Spool
 from idlelib.squeezer import count_lines_with_wrapping, ExpandingButton, \
     Squeezer
 from idlelib import macosx
@@ -77,6 +79,21 @@ class CountLinesTest(unittest.TestCase):
         self.check(expected=7, text=text, linewidth=20)
         self.check(expected=11, text=text, linewidth=10)
 
+    def test_tabs(self):
+        self.check(expected=1, text='a\tb', linewidth=80)
+        self.check(expected=1, text='\t' * 10, linewidth=80)
+        self.check(expected=2, text='\t' * 10, linewidth=40)
+        self.check(expected=2, text='a' * 75 + '\tb', linewidth=80)
+        self.check(expected=3, text='x\n' + '\t' * 11 + 'y\n', linewidth=80)
+
+    def test_limit(self):
+        # Counting stops once there are at least limit lines.
+        text = ('a' * 200 + '\n') * 10
+        self.assertEqual(count_lines_with_wrapping(text, 80), 30)
+        self.assertEqual(count_lines_with_wrapping(text, 80, 31), 30)
+        self.assertEqual(count_lines_with_wrapping(text, 80, 15), 16)
+        self.assertEqual(count_lines_with_wrapping(text, 80, 5), 10)
+
 
 class SqueezerTest(unittest.TestCase):
     """Tests for the Squeezer class."""
@@ -88,7 +105,7 @@ class SqueezerTest(unittest.TestCase):
         if with_text_widget:
             editwin.root = get_test_tk_root(self)
             text_widget = self.make_text_widget(root=editwin.root)
-            editwin.text = editwin.per.bottom = text_widget
+            editwin.text = editwin.undo.delegate = text_widget
 
         return editwin
 
@@ -312,6 +329,9 @@ class ExpandingButtonTest(unittest.TestCase):
         squeezer.editwin.text = Text(root)
         squeezer.editwin.per = Percolator(squeezer.editwin.text)
         self.addCleanup(squeezer.editwin.per.close)
+        squeezer.editwin.undo.delegate = squeezer.editwin.per.bottom
+        squeezer.spool = Spool()
+        self.addCleanup(squeezer.spool.close)
 
         # Set default values for the configuration settings.
         squeezer.auto_squeeze_min_lines = 50
@@ -325,6 +345,9 @@ class ExpandingButtonTest(unittest.TestCase):
 
         expandingbutton = ExpandingButton('TEXT', 'TAGS', 50, squeezer)
         self.assertEqual(expandingbutton.s, 'TEXT')
+        # The text is kept in the spool.
+        self.assertEqual(squeezer.spool.read(expandingbutton.key), 'TEXT')
+        self.assertNotIn('s', vars(expandingbutton))
 
         # Check that the underlying tkinter.Button is properly configured.
         self.assertEqual(expandingbutton.master, text_widget)
@@ -373,6 +396,19 @@ class ExpandingButtonTest(unittest.TestCase):
         self.assertEqual(squeezer.expandingbuttons.remove.call_count, 1)
         squeezer.expandingbuttons.remove.assert_called_with(expandingbutton)
 
+    def test_expand_filters(self):
+        """Test that expanding changes the text below the undo filter."""
+        squeezer = self.make_mock_squeezer()
+        parse = ParseDelegator()
+        squeezer.editwin.per.insertfilter(parse)
+        squeezer.editwin.undo.delegate = parse
+        expandingbutton = ExpandingButton('TEXT', 'TAGS', 50, squeezer)
+        squeezer.editwin.text.window_create("1.0", window=expandingbutton)
+
+        expandingbutton.expand()
+        # The filter saw the insert of the text and the delete of the button.
+        self.assertEqual(parse.revision, 2)
+
     def test_expand_dangerous_oupput(self):
         """Test that expanding very long output asks user for confirmation."""
         squeezer = self.make_mock_squeezer()
@@ -380,6 +416,8 @@ class ExpandingButtonTest(unittest.TestCase):
         expandingbutton = ExpandingButton(text, 'TAGS', 50, squeezer)
         expandingbutton.set_is_dangerous()
         self.assertTrue(expandingbutton.is_dangerous)
+        self.assertEqual(expandingbutton.length, 10**5)
+        self.assertEqual(expandingbutton.max_line_length, 10**5)
 
         # Insert the button into the text widget
         # (this is normally done by the Squeezer class).
@@ -404,10 +442,106 @@ class ExpandingButtonTest(unittest.TestCase):
             # Trigger the expand event.
             retval = expandingbutton.expand(event=Mock())
 
-        # Check that the event chain wasn't broken and the text was inserted.
+        # Check that the event chain wasn't broken and the text was inserted,
+        # in more than one chunk.
         self.assertEqual(retval, None)
+        self.assertIsNotNone(expandingbutton.expanding)
+        while expandingbutton.expanding is not None:
+            text_widget.update()
         self.assertEqual(expandingbutton.text.get('1.0', 'end-1c'), text)
 
+    def test_expand_chunks(self):
+        """Test expanding in chunks, and canceling it."""
+        squeezer = self.make_mock_squeezer()
+        squeezer.count_lines = lambda s: s.count('\n')
+        text = ''.join(f'{i}\n' for i in range(100))
+        expandingbutton = ExpandingButton(text, 'TAGS', 100, squeezer)
+        expandingbutton.chunk_size = 25
+        text_widget = squeezer.editwin.text
+        text_widget.window_create("1.0", window=expandingbutton)
+
+        # The first chunk is inserted at once, up to a newline.
+        expandingbutton.expand()
+        self.assertEqual(text_widget.get('1.0', 'end-1c'), text[:23])
+        self.assertEqual(text_widget.index(expandingbutton), '12.0')
+        self.assertEqual(expandingbutton.cget('text'), '正在展开…7%（单击取消）')
+        # The next ones from after() callbacks.
+        self.assertIsNotNone(expandingbutton.expanding)
+        expandingbutton.after_cancel(expandingbutton.expanding)
+        expandingbutton.expand_chunk()
+        self.assertEqual(text_widget.get('1.0', 'end-1c'), text[:47])
+
+        # Clicking the button cancels; the rest stays squeezed.
+        expandingbutton.event_generate('<Button-1>')
+        self.assertIsNone(expandingbutton.expanding)
+        self.assertEqual(expandingbutton.s, text[47:])
+        self.assertEqual(expandingbutton.numoflines, 81)
+        self.assertEqual(expandingbutton.cget('text'), '输出已被折叠（共81行）')
+        squeezer.editwin.on_squeezed_expand.assert_called_with(
+            '1.0', text[:47], 'TAGS')
+        squeezer.expandingbuttons.remove.assert_not_called()
+        # The rest is read from where the whole text is in the spool.
+        self.assertEqual(squeezer.spool.size, len(text))
+
+        # It can be expanded again.
+        expandingbutton.chunk_size = 1000
+        expandingbutton.expand()
+        self.assertEqual(text_widget.get('1.0', 'end-1c'), text)
+        squeezer.expandingbuttons.remove.assert_called_with(expandingbutton)
+
+    def test_destroy_expanding(self):
+        """Test that destroying the button stops expanding it."""
+        squeezer = self.make_mock_squeezer()
+        squeezer.count_lines = lambda s: s.count('\n')
+        text = 'a\n' * 100
+        expandingbutton = ExpandingButton(text, 'TAGS', 100, squeezer)
+        expandingbutton.chunk_size = 10
+        text_widget = squeezer.editwin.text
+        text_widget.window_create("1.0", window=expandingbutton)
+        after_info = lambda: text_widget.tk.splitlist(
+                text_widget.tk.call('after', 'info'))
+
+        expandingbutton.expand()
+        afterid = expandingbutton.expanding
+        self.assertIn(afterid, after_info())
+        expandingbutton.destroy()
+        self.assertIsNone(expandingbutton.expanding)
+        self.assertNotIn(afterid, after_info())
+
+    @patch('idlelib.squeezer.query.Goto')
+    def test_expand_part(self, Goto):
+        """Test expanding the first or last lines."""
+        squeezer = self.make_mock_squeezer()
+        squeezer.count_lines = count_lines_with_wrapping
+        text = '\n'.join(str(i) for i in range(10))
+        expandingbutton = ExpandingButton(text, 'TAGS', 10, squeezer)
+        text_widget = squeezer.editwin.text
+        text_widget.insert('1.0', '\n>>> ')
+        text_widget.window_create("1.0", window=expandingbutton)
+
+        Goto.return_value.result = 3
+        expandingbutton.expand_first()
+        self.assertEqual(text_widget.index(expandingbutton), '4.0')
+        self.assertEqual(text_widget.get('1.0', '4.0'), '0\n1\n2\n')
+        self.assertEqual(expandingbutton.s, text[6:])
+        self.assertEqual(expandingbutton.numoflines, 7)
+
+        Goto.return_value.result = 2
+        expandingbutton.expand_last()
+        self.assertEqual(text_widget.get('4.1', 'end-1c'), '\n8\n9\n>>> ')
+        self.assertEqual(expandingbutton.s, text[6:15])
+        self.assertEqual(expandingbutton.numoflines, 5)
+        self.assertEqual(squeezer.spool.size, len(text))
+
+        # Canceled, or asking for all the lines.
+        Goto.return_value.result = None
+        expandingbutton.expand_first()
+        self.assertEqual(expandingbutton.numoflines, 5)
+        Goto.return_value.result = 5
+        expandingbutton.expand_last()
+        self.assertEqual(text_widget.get('1.0', 'end-1c'), text + '\n>>> ')
+        squeezer.expandingbuttons.remove.assert_called_with(expandingbutton)
+
     def test_copy(self):
         """Test the copy event."""
         # Testing with the actual clipboard proved problematic, so this
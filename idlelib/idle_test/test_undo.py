@@ -130,6 +130,25 @@ class UndoDelegatorTest(unittest.TestCase):
             text.insert('insert', 'foo')
             self.assertLessEqual(len(self.delegator.undolist), max_undo)
 
+    def test_max_undo_chars(self):
+        text = self.text
+        delegator = self.delegator
+        delegator.max_undo_chars = 10
+        text.insert('insert', 'foo ')
+        text.insert('insert', 'bar ')
+        self.assertEqual(len(delegator.undolist), 2)
+        text.insert('insert', 'spam ')
+        # The oldest insert is dropped to stay within 10 characters.
+        self.assertEqual([cmd.chars for cmd in delegator.undolist],
+                         ['bar ', 'spam '])
+        self.assertEqual(delegator.pointer, 2)
+        self.assertFalse(delegator.get_saved())
+        # A command larger than the cap is not kept.
+        text.insert('insert', 'x' * 11)
+        self.assertEqual(delegator.undolist, [])
+        self.assertEqual(delegator.pointer, 0)
+        self.assertFalse(delegator.get_saved())
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2, exit=False)
@@ -1,4 +1,6 @@
+import codecs
 import io
+import mmap
 import os
 import shlex
 import sys
@@ -17,6 +19,61 @@ encoding = 'utf-8'
 errors = 'surrogatepass' if sys.platform == 'win32' else 'surrogateescape'
 
 
+class FileLoader:
+    """Read and decode a file a chunk at a time.
+
+    The file is memory-mapped if possible.  Newlines are translated to
+    '\n'; afterwards, newlines is the kind found as for a text file.
+    Without encoding, the encoding is detected as for Python source.
+    """
+
+    def __init__(self, filename, encoding=None, chunk_size=1 << 20,
+                 use_mmap=True):
+        self.file = open(filename, 'rb')
+        try:
+            if encoding is None:
+                encoding, _ = tokenize.detect_encoding(self.file.readline)
+                self.file.seek(0)
+            decoder = codecs.getincrementaldecoder(encoding)()
+            self.size = os.fstat(self.file.fileno()).st_size
+            self.map = None
+            if use_mmap and self.size:
+                try:
+                    self.map = mmap.mmap(self.file.fileno(), 0,
+                                         access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    pass
+        except BaseException:
+            self.file.close()
+            raise
+        self.encoding = encoding
+        self.decoder = io.IncrementalNewlineDecoder(decoder, translate=True)
+        self.chunk_size = chunk_size
+        self.pos = 0
+
+    @property
+    def newlines(self):
+        return self.decoder.newlines
+
+    def read(self):
+        "Return the next chunk of text, or '' at the end of the file."
+        while True:
+            if self.map is not None:
+                data = self.map[self.pos:self.pos + self.chunk_size]
+            else:
+                data = self.file.read(self.chunk_size)
+            self.pos += len(data)
+            chars = self.decoder.decode(data, final=not data)
+            # A chunk of only part of a character decodes to ''.
+            if chars or not data:
+                return chars
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+
 class IOBinding:
 # One instance per editor Window so methods know which to save, close.
 # Open returns focus to self.editwin if aborted.
@@ -35,6 +92,7 @@ class IOBinding:
         self.__id_print = self.text.bind("<<print-window>>", self.print_window)
 
     def close(self):
+        self.stop_load()
         # Undo command bindings
         self.text.unbind("<<open-window-from-file>>", self.__id_open)
         self.text.unbind("<<save-window>>", self.__id_save)
@@ -121,6 +179,12 @@ class IOBinding:
     eol_convention = os.linesep  # default
 
     def loadfile(self, filename):
+        try:
+            size = os.path.getsize(filename)
+        except OSError:
+            size = 0
+        if size >= self.editwin.large_file_chars:
+            return self.start_load(filename)
         try:
             try:
                 with tokenize.open(filename) as f:
@@ -129,15 +193,7 @@ class IOBinding:
                     eol_convention = f.newlines
                     converted = False
             except (UnicodeDecodeError, SyntaxError):
-                # Wait for the editor window to appear
-                self.editwin.text.update()
-                enc = askstring(
-                    "请指定文件编码",
-                    "当前文件的编码在 Python 3.x 无效，\n"
-                    "IDLE 将会把它转换成 UTF-8 编码。\n"
-                    "请问这个文件当前是什么编码？",
-                    initialvalue='utf-8',
-                    parent=self.editwin.text)
+                enc = self.ask_encoding()
                 with open(filename, encoding=enc) as f:
                     chars = f.read()
                     fileencoding = f.encoding
@@ -152,22 +208,19 @@ class IOBinding:
                                    parent=self.text)
             return False
 
-        if not isinstance(eol_convention, str):
-            # If the file does not contain line separators, it is None.
-            # If the file contains mixed line separators, it is a tuple.
-            if eol_convention is not None:
-                messagebox.showwarning("混用换行符",
-                                         "检测到混用不同的换行符。\n"
-                                         "文件换行符将在下次保存的时候被统一。",
-                                         parent=self.text)
-                converted = True
-            eol_convention = os.linesep  # default
+        eol_convention, mixed = self.check_eol_convention(eol_convention)
+        converted = converted or mixed
 
         self.text.delete("1.0", "end")
         self.set_filename(None)
         self.fileencoding = fileencoding
         self.eol_convention = eol_convention
-        self.text.insert("1.0", chars)
+        large = self.editwin.is_large_file(chars)
+        self.editwin.set_large_file(large)
+        if large:
+            self.insert_chunks(chars)
+        else:
+            self.text.insert("1.0", chars)
         self.reset_undo()
         self.set_filename(filename)
         if converted:
@@ -179,6 +232,152 @@ class IOBinding:
         self.updaterecentfileslist(filename)
         return True
 
+    def ask_encoding(self):
+        "Return the encoding the user gives for a file, or None."
+        # Wait for the editor window to appear
+        self.editwin.text.update()
+        return askstring(
+            "请指定文件编码",
+            "当前文件的编码在 Python 3.x 无效，\n"
+            "IDLE 将会把它转换成 UTF-8 编码。\n"
+            "请问这个文件当前是什么编码？",
+            initialvalue='utf-8',
+            parent=self.editwin.text)
+
+    def check_eol_convention(self, newlines):
+        """Return the eol convention for newlines found in a file.
+
+        Also return True if the newlines were mixed, after warning that
+        they will be unified on save.
+        """
+        if isinstance(newlines, str):
+            return newlines, False
+        # If the file does not contain line separators, it is None.
+        # If the file contains mixed line separators, it is a tuple.
+        if newlines is not None:
+            messagebox.showwarning("混用换行符",
+                                     "检测到混用不同的换行符。\n"
+                                     "文件换行符将在下次保存的时候被统一。",
+                                     parent=self.text)
+        return os.linesep, newlines is not None
+
+    # Files are loaded a chunk at a time by a FileLoader.
+    loader = None
+    load_id = None
+    use_mmap = True
+
+    def start_load(self, filename, encoding=None):
+        """Load filename in chunks, one chunk per after() callback.
+
+        The first chunk is in the text before this returns, so the top
+        of the file shows at once.  The status bar shows the progress;
+        clicking it cancels the load.  Return False if the file cannot
+        be opened.
+        """
+        self.stop_load()
+        try:
+            loader = FileLoader(filename, encoding, self.chunk_size,
+                                self.use_mmap)
+        except (SyntaxError, LookupError):
+            # Bad or unknown encoding declaration.
+            encoding = self.ask_encoding()
+            return bool(encoding) and self.start_load(filename, encoding)
+        except OSError as err:
+            messagebox.showerror("文件输入输出错误", str(err), parent=self.text)
+            return False
+        self.text.delete("1.0", "end")
+        self.editwin.set_large_file(True)
+        self.set_filename(filename)
+        self.fileencoding = loader.encoding
+        self.loader = loader
+        self.load_converted = encoding is not None
+        if not self.load_next():
+            return False
+        self.text.mark_set("insert", "1.0")
+        self.text.yview("insert")
+        return True
+
+    def load_next(self):
+        "Insert the next chunk of the file loading; return False on error."
+        self.load_id = None
+        loader = self.loader
+        filename = self.filename
+        try:
+            chars = loader.read()
+        except UnicodeDecodeError:
+            self.stop_load()
+            encoding = self.ask_encoding()
+            if encoding:
+                return self.start_load(filename, encoding)
+            self.abandon_load()
+            messagebox.showerror("解码错误",
+                                   "文件 %s\n无法解码" % filename,
+                                   parent=self.text)
+            return False
+        except OSError as err:
+            self.stop_load()
+            self.abandon_load()
+            messagebox.showerror("文件输入输出错误", str(err), parent=self.text)
+            return False
+        if chars:
+            self.text.insert("end-1c", chars)
+            self.show_load_progress()
+            self.load_id = self.text.after(1, self.load_next)
+        else:
+            self.finish_load()
+        return True
+
+    def show_load_progress(self):
+        loader = self.loader
+        percent = 100 * loader.pos // loader.size if loader.size else 100
+        status_bar = self.editwin.status_bar
+        status_bar.set_label('load', f'正在载入 {percent}%（点击取消）',
+                             side='right')
+        status_bar.labels['load'].bind('<Button-1>', self.cancel_load)
+
+    def finish_load(self):
+        newlines = self.loader.newlines
+        self.stop_load()
+        self.eol_convention, mixed = self.check_eol_convention(newlines)
+        self.reset_undo()
+        if self.load_converted or mixed:
+            self.set_saved(False)
+        self.updaterecentfileslist(self.filename)
+
+    def stop_load(self):
+        "Stop loading a file, if one is loading."
+        if self.load_id:
+            self.text.after_cancel(self.load_id)
+            self.load_id = None
+        if self.loader:
+            self.loader.close()
+            self.loader = None
+            self.editwin.status_bar.set_label('load', '')
+
+    def abandon_load(self):
+        # Keep what was loaded, but not as the file, to not save over it.
+        self.set_filename(None)
+        self.reset_undo()
+
+    def cancel_load(self, event=None):
+        "Stop loading a file, keeping the part loaded as a new file."
+        if self.loader:
+            self.stop_load()
+            self.abandon_load()
+            self.editwin.status_bar.set_label('load', '已取消载入')
+
+    chunk_size = 1 << 20  # Characters per insert in large file mode.
+
+    def insert_chunks(self, chars):
+        "Insert chars at the end of the text, whole lines at a time."
+        start = 0
+        while start < len(chars):
+            end = chars.rfind('\n', start, start + self.chunk_size) + 1
+            if end <= start:
+                end = start + self.chunk_size
+            self.text.insert("end-1c", chars[start:end])
+            start = end
+
     def maybesave(self):
         """Return 'yes', 'no', 'cancel' as appropriate.
 
@@ -238,6 +437,10 @@ class IOBinding:
         return "break"
 
     def writefile(self, filename):
+        if self.loader:
+            messagebox.showerror("文件输入输出错误", "文件尚未载入完毕，无法保存。",
+                                 parent=self.text)
+            return False
         text = self.fixnewlines()
         chars = self.encode(text)
         try:
@@ -2,6 +2,7 @@
 """
 
 import re
+import time
 
 from tkinter import messagebox
 
@@ -74,10 +75,14 @@ class OutputWindow(EditorWindow):
     ]
 
     allow_code_context = False
+    render_rate = 30  # Most times per second write() updates the widget.
 
     def __init__(self, *args):
         EditorWindow.__init__(self, *args)
         self.text.bind("<<goto-file-line>>", self.goto_file_line)
+        self.pending = []  # ((tags, mark), [str, ...]) not yet inserted.
+        self.rendered = 0.0  # time.monotonic() after the last insert.
+        self.render_after = None
 
     # Customize EditorWindow
     def ispythonsource(self, filename):
@@ -99,7 +104,10 @@ class OutputWindow(EditorWindow):
         The text is inserted at the given index with the provided
         tags.  The text widget is then scrolled to make it visible
         and updated to display it, giving the effect of seeing each
-        line as it is added.
+        line as it is added.  Writes that come faster than render_rate
+        per second are held and inserted together by flush(), which
+        runs once the interval since the last insert has passed, from
+        an after() callback unless another write comes first.
 
         Args:
             s: Text to insert into text widget.
@@ -110,9 +118,17 @@ class OutputWindow(EditorWindow):
             Length of text inserted.
         """
         assert isinstance(s, str)
-        self.text.insert(mark, s, tags)
-        self.text.see(mark)
-        self.text.update()
+        pending = self.pending
+        if pending and pending[-1][0] == (tags, mark):
+            pending[-1][1].append(s)
+        else:
+            pending.append(((tags, mark), [s]))
+        wait = self.rendered + 1 / self.render_rate - time.monotonic()
+        if wait <= 0:
+            self.flush()
+        elif self.render_after is None:
+            self.render_after = self.text.after(int(wait * 1000) + 1,
+                                                self.flush)
         return len(s)
 
     def writelines(self, lines):
@@ -121,8 +137,25 @@ class OutputWindow(EditorWindow):
             self.write(line)
 
     def flush(self):
-        "No flushing needed as write() directly writes to widget."
-        pass
+        "Insert held writes into the text widget and display them."
+        if self.render_after is not None:
+            self.text.after_cancel(self.render_after)
+            self.render_after = None
+        pending, self.pending = self.pending, []
+        for (tags, mark), strings in pending:
+            self.text.insert(mark, ''.join(strings), tags)
+        if pending:
+            self.text.see(mark)
+            self.text.update()
+            self.rendered = time.monotonic()
+
+    def _close(self):
+        "Extend EditorWindow._close(), dropping held writes."
+        if self.render_after is not None:
+            self.text.after_cancel(self.render_after)
+            self.render_after = None
+        self.pending = []
+        EditorWindow._close(self)
 
     def showerror(self, *args, **kwargs):
         messagebox.showerror(*args, **kwargs)
@@ -136,6 +169,7 @@ class OutputWindow(EditorWindow):
 
         Otherwise, display an error messagebox.
         """
+        self.flush()
         line = self.text.get("insert linestart", "insert lineend")
         result = file_line_helper(line)
         if not result:
@@ -120,6 +120,222 @@ trans = ParseMap.fromkeys(range(128), 120)
 trans.update((ord(c), ord('(')) for c in "({[")  # open brackets => '(';
 trans.update((ord(c), ord(')')) for c in ")}]")  # close brackets => ')'.
 trans.update((ord(c), ord(c)) for c in "\"'\\\n#")  # Keep these.
+# The same for the UTF-8 bytes of a str, all non-ASCII ones => 'x'.
+# bytes.translate() is much faster than str.translate() with a dict.
+_trans_bytes = bytes(trans[i] for i in range(128)) + b'x' * 128
+
+
+def _squash(code):
+    """Return code reduced to the characters that matter for structure.
+
+    Map all uninteresting characters to "x", all open brackets to "(",
+    all close brackets to ")", then collapse runs of uninteresting
+    characters.  This can cut the number of chars by a factor of 10-40,
+    and so greatly speed the loops over the result.  Line breaks are
+    kept.  A non-ASCII character becomes as many "x" as its UTF-8 bytes,
+    which is as good as one.
+    """
+    code = (code.encode('utf-8', 'surrogatepass')
+            .translate(_trans_bytes).decode('ascii'))
+    code = code.replace('xxxxxxxx', 'x')
+    code = code.replace('xxxx', 'x')
+    code = code.replace('xx', 'x')
+    code = code.replace('xx', 'x')
+    code = code.replace('\nx', '\n')
+    # Replacing x\n with \n would be incorrect because
+    # x may be preceded by a backslash.
+    return code
+
+
+def _line_states(code, first=1, brackets=(), cont=''):
+    """Return the state at the start of each line after the first.
+
+    A state is a (brackets, cont) pair.  brackets is a tuple of the
+    numbers of the lines with the open brackets, innermost last.  cont
+    says why the line continues the line before: the quote of the
+    string it starts in, '\\' after a backslash, or '' for neither.
+    code starts at line number first, in state (brackets, cont), and
+    must end with a newline.  The states are those after each newline.
+    """
+    if cont != '\\':
+        # A string continued from above is lexed from its quotes.
+        code = cont + code
+    code = _squash(code)
+    stack = list(brackets)
+    changed = False
+    states = []
+    push_state = states.append
+    lno = first
+    i, n = 0, len(code)
+    while i < n:
+        ch = code[i]
+        i = i+1
+
+        if ch == 'x':
+            continue
+
+        if ch == '\n':
+            if changed:
+                # Lines with the same brackets share one tuple.
+                brackets = tuple(stack)
+                changed = False
+            push_state((brackets, ''))
+            lno = lno + 1
+            continue
+
+        if ch == '(':
+            stack.append(lno)
+            changed = True
+            continue
+
+        if ch == ')':
+            if stack:
+                del stack[-1]
+                changed = True
+            continue
+
+        if ch == '"' or ch == "'":
+            # consume the string, as in Parser._study1()
+            quote = ch
+            if code[i-1:i+2] == quote * 3:
+                quote = quote * 3
+            w = len(quote) - 1
+            i = i+w
+            while i < n:
+                ch = code[i]
+                i = i+1
+
+                if ch == 'x':
+                    continue
+
+                if code[i-1:i+w] == quote:
+                    i = i+w
+                    break
+
+                if ch == '\n' or ch == '\\' and code[i] == '\n':
+                    if ch == '\\':
+                        i = i+1
+                    elif w == 0:
+                        # unterminated single-quoted string
+                        i = i-1
+                        break
+                    if changed:
+                        brackets = tuple(stack)
+                        changed = False
+                    push_state((brackets, quote))
+                    lno = lno + 1
+                    continue
+
+                if ch == '\\':
+                    i = i+1
+            continue
+
+        if ch == '#':
+            # consume the comment, but not the newline
+            i = code.find('\n', i)
+            continue
+
+        # ch == '\\'
+        if code[i] == '\n':
+            if changed:
+                brackets = tuple(stack)
+                changed = False
+            push_state((brackets, '\\'))
+            lno = lno + 1
+        i = i+1
+    return states
+
+
+class StatementIndex:
+    """Index of where the statement of each line of a text starts.
+
+    A statement starts on a line that begins outside any bracket or
+    string and does not follow a backslash continuation, and is not
+    blank or a non-indenting comment line (see _junkre).  Other lines
+    belong to the statement before.  Line numbers start at 1.
+
+    get_lines(first, last) must return lines first to last - 1 of the
+    text, each ending with a newline, or fewer at the end of the text.
+
+    The index covers the lines up to the last one asked about.  After
+    an edit, invalidate() forgets the lines from the first edited one
+    on, which are then redone from the state at its start when needed.
+    So a lookup near where the text is being edited takes time in
+    proportion to the distance, not to the size of the text.
+
+    count is the number of lines indexed.  For n <= count, states[n - 1]
+    is the _line_states() state at the start of line n, as is
+    states[count], and starts[n - 1] is the line where the statement of
+    line n starts.  Entries after those are out of date.  They are
+    overwritten rather than deleted, so an edit costs the same
+    wherever it is in the text.
+
+    A lookup indexes at most max_extend lines, a few ms worth.  Further
+    past the indexed lines, as after opening a long file at its end, it
+    returns None and the caller parses as if there were no index.
+    """
+    max_extend = 5000
+
+    def __init__(self, get_lines):
+        self.get_lines = get_lines
+        self.states = [((), '')]
+        self.starts = []
+        self.count = 0
+
+    def invalidate(self, lineno):
+        "Forget about lines lineno and after, which have changed."
+        self.count = min(self.count, max(lineno - 1, 0))
+
+    def stmt_start(self, lineno):
+        """Return the number of the line where the statement of lineno starts.
+
+        Return None if lineno is more than max_extend lines past the
+        indexed ones.
+        """
+        if self.count < lineno:
+            if lineno - self.count > self.max_extend:
+                return None
+            self._extend(lineno)
+        return self.starts[lineno - 1]
+
+    def indent_start(self, lineno):
+        """Return the line to parse from to indent new line lineno > 1.
+
+        Within brackets, Parser.compute_bracket_indent() needs only the
+        code from the line with the innermost open bracket, if that line
+        does not start in a string.  Otherwise return the start of the
+        statement before line lineno.  Return None as stmt_start() does.
+        """
+        if self.stmt_start(lineno) is None:
+            return None
+        brackets, cont = self.states[lineno - 1]
+        if brackets and cont in ('', '\\'):
+            if self.states[brackets[-1] - 1][1] in ('', '\\'):
+                return brackets[-1]
+        return self.stmt_start(lineno - 1)
+
+    def _extend(self, lineno):
+        "Index lines up to lineno."
+        first = self.count + 1
+        code = self.get_lines(first, lineno + 1)
+        state = self.states[first - 1]
+        states = _line_states(code, first, *state)
+        start = self.starts[first - 2] if first > 1 else 1
+        starts = []
+        pos = 0
+        for line, next_state in enumerate(states, first):
+            if state == ((), '') and not _junkre(code, pos):
+                start = line
+            starts.append(start)
+            state = next_state
+            pos = code.find('\n', pos) + 1
+        # Past the end of the text.
+        missing = lineno - first + 1 - len(starts)
+        starts.extend([start] * missing)
+        states.extend([state] * missing)
+        self.starts[first - 1:lineno] = starts
+        self.states[first:lineno + 1] = states
+        self.count = lineno
 
 
 class Parser:
@@ -205,19 +421,7 @@ class Parser:
             return
         self.study_level = 1
 
-        # Map all uninteresting characters to "x", all open brackets
-        # to "(", all close brackets to ")", then collapse runs of
-        # uninteresting characters.  This can cut the number of chars
-        # by a factor of 10-40, and so greatly speed the following loop.
-        code = self.code
-        code = code.translate(trans)
-        code = code.replace('xxxxxxxx', 'x')
-        code = code.replace('xxxx', 'x')
-        code = code.replace('xx', 'x')
-        code = code.replace('xx', 'x')
-        code = code.replace('\nx', '\n')
-        # Replacing x\n with \n would be incorrect because
-        # x may be preceded by a backslash.
+        code = _squash(self.code)
 
         # March over the squashed version of the program, accumulating
         # the line numbers of non-continued stmts, and determining
@@ -19,13 +19,17 @@ from tkinter import messagebox
 
 from code import InteractiveInterpreter
 import itertools
+import json
 import linecache
 import os
 import os.path
 from platform import python_version
 import re
+import select
+import signal
 import socket
 import subprocess
+import tempfile
 from textwrap import TextWrapper
 import threading
 import time
@@ -333,10 +337,10 @@ class PyShellFileList(FileList):
 
 class ModifiedColorDelegator(ColorDelegator):
     "Extend base class: colorizer for the shell window itself"
-    def recolorize_main(self):
+    def recolorize_main(self, deadline=None):
         self.tag_remove("TODO", "1.0", "iomark")
         self.tag_add("SYNC", "1.0", "iomark")
-        ColorDelegator.recolorize_main(self)
+        ColorDelegator.recolorize_main(self, deadline)
 
     def removecolors(self):
         # Don't remove shell color tags before "iomark"
@@ -388,10 +392,198 @@ class UserInputTaggingDelegator(Delegator):
 
 class MyRPCClient(rpc.RPCClient):
 
+    poll_buffered = None  # Callback when a reply leaves messages buffered.
+
+    def subprocess_address(self):
+        "Return the port number or socket path for the subprocess argv."
+        address = self.listening_sock.getsockname()
+        return address[1] if isinstance(address, tuple) else address
+
+    def close_listening(self):
+        "Close the listening socket and remove its file if it has one."
+        try:
+            path = self.listening_sock.getsockname()
+        except OSError:  # Already closed.
+            return
+        self.listening_sock.close()
+        if isinstance(path, str) and path:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
     def handle_EOF(self):
         "Override the base class - just re-raise EOFError"
         raise EOFError
 
+    def asyncreturn(self, seq):
+        "Extend base method to report messages read along with the reply."
+        try:
+            return rpc.RPCClient.asyncreturn(self, seq)
+        finally:
+            if (self.poll_buffered is not None and
+                    threading.current_thread() is self.sockthread and
+                    self.sock is not None and self.packet_ready()):
+                self.poll_buffered()
+
+class SpareSubprocess:
+    """Execution subprocess started ahead of a restart of the Shell.
+
+    The subprocess connects to its own listening socket and then waits,
+    with idlelib.run imported, to replace the Shell's subprocess.
+    """
+
+    def __init__(self, interp):
+        self.rpcclt = interp.unix_rpcclient() or MyRPCClient((HOST, 0))
+        self.cwd = os.getcwd()
+        try:
+            self.rpcsubproc = interp.popen_subprocess(
+                    interp.build_subprocess_arglist(
+                        self.rpcclt.subprocess_address()))
+        except OSError:
+            self.rpcclt.close_listening()
+            raise
+        self.deadline = time.monotonic() + 10  # Same as accept timeout.
+        self.connected = False
+
+    def poll_connect(self, wait=0):
+        """Accept the connection, waiting up to wait seconds for it.
+
+        Return True if connected.
+        """
+        if not self.connected:
+            sock = self.rpcclt.listening_sock
+            r, w, x = select.select([sock], [], [], wait)
+            if r:
+                self.rpcclt.accept()
+                self.connected = True
+        return self.connected
+
+    def expired(self):
+        return not self.connected and time.monotonic() >= self.deadline
+
+    def take_socket(self):
+        "Return the connected socket, leaving this object without one."
+        sock, self.rpcclt.sock = self.rpcclt.sock, None
+        return sock
+
+    def close(self):
+        try:
+            self.rpcclt.close_listening()
+            # Not connected, or the socket was taken: no client to close.
+            if getattr(self.rpcclt, 'sock', None) is not None:
+                self.rpcclt.close()
+        finally:
+            try:
+                self.rpcsubproc.kill()
+                self.rpcsubproc.wait()
+            except OSError:
+                pass
+
+
+class ForkServer:
+    """Template subprocess that forks execution subprocesses (Linux only).
+
+    The template imports idlelib.run and the preload modules once, so
+    each subprocess forked from it starts without re-importing them.
+    See run.forkserver_main for the protocol.
+    """
+
+    def __init__(self, interp, preload):
+        self.sock, child_sock = socket.socketpair()
+        arglist = interp.build_forkserver_arglist(child_sock.fileno(), preload)
+        try:
+            self.proc = interp.popen_subprocess(
+                    arglist, pass_fds=(child_sock.fileno(),))
+        finally:
+            child_sock.close()
+        self.rbuf = b''
+        self.ready = False
+
+    def _readline(self, timeout):
+        "Return a line from the template, or None if none within timeout."
+        deadline = time.monotonic() + timeout
+        while b'\n' not in self.rbuf:
+            wait = max(0, deadline - time.monotonic())
+            r, w, x = select.select([self.sock], [], [], wait)
+            if not r:
+                return None
+            data = self.sock.recv(rpc.BUFSIZE)
+            if not data:
+                raise EOFError
+            self.rbuf += data
+        line, self.rbuf = self.rbuf.split(b'\n', 1)
+        return line.decode('utf-8')
+
+    def poll_ready(self):
+        """Return True once the template has finished importing.
+
+        Raise OSError if the template has exited.
+        """
+        if not self.ready:
+            try:
+                self.ready = self._readline(0) == 'ready'
+            except EOFError:
+                raise OSError("fork server exited") from None
+        return self.ready
+
+    def fork_subprocess(self, address):
+        """Return a ForkedSubprocess connecting to the port or path address.
+
+        Raise OSError if the template does not answer.
+        """
+        request = json.dumps([address, os.getcwd()]) + '\n'
+        try:
+            self.sock.sendall(request.encode('utf-8'))
+            line = self._readline(10)
+        except EOFError:
+            line = None
+        if line is None:
+            raise OSError("fork server did not respond")
+        return ForkedSubprocess(int(line))
+
+    def close(self):
+        self.sock.close()  # The template exits on EOF.
+        try:
+            self.proc.kill()
+            self.proc.wait()
+        except OSError:
+            pass
+
+
+class ForkedSubprocess:
+    """Stand-in for subprocess.Popen for a child of the ForkServer.
+
+    The template reaps its children, so the exit status is not
+    available; returncode is -1 once the process has gone.
+    """
+
+    returncode = None
+
+    def __init__(self, pid):
+        self.pid = pid
+
+    def poll(self):
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, 0)
+            except ProcessLookupError:
+                self.returncode = -1
+        return self.returncode
+
+    def kill(self):
+        if self.returncode is None:  # Like Popen, do nothing once gone.
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                self.returncode = -1
+
+    def wait(self):
+        while self.poll() is None:
+            time.sleep(0.005)
+        return self.returncode
+
+
 def restart_line(width, filename):  # See bpo-38141.
     """Return width long restart line formatted with filename.
 
@@ -419,19 +611,38 @@ class ModifiedInterpreter(InteractiveInterpreter):
         self.original_compiler_flags = self.compile.compiler.flags
 
     _afterid = None
+    _watched_sock = None
+    _spare_afterid = None
     rpcclt = None
     rpcsubproc = None
+    spare = None
+    forkserver = None
+    sockdir = None
+    socknum = 0
 
     def spawn_subprocess(self):
+        if self.forkserver is not None:
+            try:
+                if self.forkserver.poll_ready():
+                    self.rpcsubproc = self.forkserver.fork_subprocess(
+                            self.port)
+                    return
+            except OSError:
+                self.close_forkserver()
         if self.subprocess_arglist is None:
             self.subprocess_arglist = self.build_subprocess_arglist()
+        self.rpcsubproc = self.popen_subprocess(self.subprocess_arglist)
+
+    def popen_subprocess(self, arglist, pass_fds=()):
         # gh-127060: Disable traceback colors
         env = dict(os.environ, TERM='dumb')
-        self.rpcsubproc = subprocess.Popen(self.subprocess_arglist, env=env)
+        return subprocess.Popen(arglist, env=env, pass_fds=pass_fds)
 
-    def build_subprocess_arglist(self):
-        assert (self.port!=0), (
-            "Socket should have been assigned a port number.")
+    def build_subprocess_arglist(self, port=None):
+        if port is None:
+            port = self.port
+        assert (port!=0), (
+            "Socket should have been assigned a port number or path.")
         w = ['-W' + s for s in sys.warnoptions]
         # Maybe IDLE is installed and is being accessed via sys.path,
         # or maybe it's not installed and the idle.py script is being
@@ -439,31 +650,72 @@ class ModifiedInterpreter(InteractiveInterpreter):
         del_exitf = idleConf.GetOption('main', 'General', 'delete-exitfunc',
                                        default=False, type='bool')
         command = f"__import__('idlelib.run').run.main({del_exitf!r})"
-        return [sys.executable] + w + ["-c", command, str(self.port)]
+        return [sys.executable] + w + ["-c", command, str(port)]
 
-    def start_subprocess(self):
-        addr = (HOST, self.port)
-        # GUI makes several attempts to acquire socket, listens for connection
-        for i in range(3):
-            time.sleep(i)
+    def build_forkserver_arglist(self, fd, preload):
+        w = ['-W' + s for s in sys.warnoptions]
+        del_exitf = idleConf.GetOption('main', 'General', 'delete-exitfunc',
+                                       default=False, type='bool')
+        command = ("__import__('idlelib.run').run."
+                   f"forkserver_main({del_exitf!r}, {preload!r})")
+        return [sys.executable] + w + ["-c", command, str(fd)]
+
+    def unix_rpcclient(self):
+        """Return a MyRPCClient listening on a new Unix domain socket.
+
+        The socket file is in a directory only the user can access.
+        Return None if Unix domain sockets are turned off or not
+        available, in which case the caller falls back to TCP.
+        """
+        if (PORT != 0 or not hasattr(socket, 'AF_UNIX') or
+                not idleConf.GetOption('main', 'PyShell', 'unix-socket',
+                                       default=True, type='bool')):
+            return None
+        try:
+            if self.sockdir is None:
+                self.sockdir = tempfile.mkdtemp(prefix='idle-')
+            self.socknum += 1
+            path = os.path.join(self.sockdir, f'rpc{self.socknum}')
+            return MyRPCClient(path, socket.AF_UNIX)
+        except OSError:  # For instance, path too long.
+            return None
+
+    def remove_sockdir(self):
+        sockdir, self.sockdir = self.sockdir, None
+        if sockdir is not None:
             try:
-                self.rpcclt = MyRPCClient(addr)
-                break
+                os.rmdir(sockdir)
             except OSError:
                 pass
-        else:
-            self.display_port_binding_error()
-            return None
-        # if PORT was 0, system will assign an 'ephemeral' port. Find it out:
-        self.port = self.rpcclt.listening_sock.getsockname()[1]
-        # if PORT was not 0, probably working with a remote execution server
-        if PORT != 0:
-            # To allow reconnection within the 2MSL wait (cf. Stevens TCP
-            # V1, 18.6),  set SO_REUSEADDR.  Note that this can be problematic
-            # on Windows since the implementation allows two active sockets on
-            # the same address!
-            self.rpcclt.listening_sock.setsockopt(socket.SOL_SOCKET,
-                                           socket.SO_REUSEADDR, 1)
+
+    def start_subprocess(self):
+        self.rpcclt = self.unix_rpcclient()
+        if self.rpcclt is None:
+            addr = (HOST, self.port)
+            # GUI makes several attempts to acquire socket, listens for
+            # connection
+            for i in range(3):
+                time.sleep(i)
+                try:
+                    self.rpcclt = MyRPCClient(addr)
+                    break
+                except OSError:
+                    pass
+            else:
+                self.display_port_binding_error()
+                return None
+            # if PORT was not 0, probably working with a remote execution
+            # server
+            if PORT != 0:
+                # To allow reconnection within the 2MSL wait (cf. Stevens
+                # TCP V1, 18.6),  set SO_REUSEADDR.  Note that this can be
+                # problematic on Windows since the implementation allows
+                # two active sockets on the same address!
+                self.rpcclt.listening_sock.setsockopt(socket.SOL_SOCKET,
+                                               socket.SO_REUSEADDR, 1)
+        # The socket path, or if PORT was 0, the 'ephemeral' port the
+        # system assigned.
+        self.port = self.rpcclt.subprocess_address()
         self.spawn_subprocess()
         #time.sleep(20) # test to simulate GUI not accepting connection
         # Accept the connection from the Python execution server
@@ -481,7 +733,12 @@ class ModifiedInterpreter(InteractiveInterpreter):
         self.rpcclt.register("linecache", linecache)
         self.rpcclt.register("interp", self)
         self.transfer_path(with_cwd=True)
-        self.poll_subprocess()
+        if hasattr(self.tkconsole.text.tk, 'createfilehandler'):
+            self.watch_subprocess()
+        else:
+            self.poll_subprocess()
+        self.tkconsole.text.after_idle(self.start_spare_subprocess)
+        self.tkconsole.text.after_idle(self.start_forkserver)
         return self.rpcclt
 
     def restart_subprocess(self, with_cwd=False, filename=''):
@@ -497,23 +754,31 @@ class ModifiedInterpreter(InteractiveInterpreter):
             except:
                 pass
         # Kill subprocess, spawn a new one, accept connection.
+        self.unwatch_subprocess()
         self.rpcclt.close()
         self.terminate_subprocess()
         console = self.tkconsole
         was_executing = console.executing
         console.executing = False
-        self.spawn_subprocess()
-        try:
-            self.rpcclt.accept()
-        except TimeoutError:
-            self.display_no_subprocess_error()
-            return None
+        if not self.take_spare_subprocess():
+            self.spawn_subprocess()
+            try:
+                self.rpcclt.accept()
+            except TimeoutError:
+                self.display_no_subprocess_error()
+                return None
         self.transfer_path(with_cwd=with_cwd)
+        console.text.after_idle(self.start_spare_subprocess)
+        # Watch the new socket as start_subprocess() does, even if the old
+        # one was not watched, as after a restart that timed out.
+        if hasattr(console.text.tk, 'createfilehandler'):
+            self.watch_subprocess()
         console.stop_readline()
         # annotate restart in shell window and mark it
         console.text.delete("iomark", "end-1c")
         console.write('\n')
         console.write(restart_line(console.width, filename))
+        console.flush()
         console.text.mark_set("restart", "end-1c")
         console.text.mark_gravity("restart", "left")
         if not filename:
@@ -537,10 +802,14 @@ class ModifiedInterpreter(InteractiveInterpreter):
     def kill_subprocess(self):
         if self._afterid is not None:
             self.tkconsole.text.after_cancel(self._afterid)
+        self.unwatch_subprocess()
+        self.close_spare_subprocess()
+        self.close_forkserver()
         try:
-            self.rpcclt.listening_sock.close()
+            self.rpcclt.close_listening()
         except AttributeError:  # no socket
             pass
+        self.remove_sockdir()
         try:
             self.rpcclt.close()
         except AttributeError:  # no socket
@@ -562,6 +831,81 @@ class ModifiedInterpreter(InteractiveInterpreter):
             except OSError:
                 return
 
+    def start_forkserver(self):
+        "Start the fork server on Linux if the Shell is configured to use it."
+        if (self.forkserver is not None or self.tkconsole.closing or
+                not sys.platform.startswith('linux') or
+                not idleConf.GetOption('main', 'PyShell', 'fork-server',
+                                       default=False, type='bool')):
+            return
+        preload = idleConf.GetOption('main', 'PyShell', 'preload', default='')
+        preload = tuple(preload.replace(',', ' ').split())
+        try:
+            self.forkserver = ForkServer(self, preload)
+        except OSError:
+            pass
+
+    def close_forkserver(self):
+        forkserver, self.forkserver = self.forkserver, None
+        if forkserver is not None:
+            forkserver.close()
+
+    def start_spare_subprocess(self):
+        "Start a spare subprocess if the Shell is configured to keep one."
+        if (self.spare is not None or self.rpcclt is None or
+                self.tkconsole.closing or
+                not idleConf.GetOption('main', 'PyShell', 'standby-subprocess',
+                                       default=False, type='bool')):
+            return
+        try:
+            self.spare = SpareSubprocess(self)
+        except OSError:
+            return
+        self._poll_spare_subprocess()
+
+    def _poll_spare_subprocess(self):
+        self._spare_afterid = None
+        spare = self.spare
+        if spare is None or spare.poll_connect():
+            return
+        if spare.expired():
+            self.close_spare_subprocess()
+            return
+        self._spare_afterid = self.tkconsole.text.after(
+                self.tkconsole.pollinterval, self._poll_spare_subprocess)
+
+    def close_spare_subprocess(self):
+        if self._spare_afterid is not None:
+            self.tkconsole.text.after_cancel(self._spare_afterid)
+            self._spare_afterid = None
+        spare, self.spare = self.spare, None
+        if spare is not None:
+            spare.close()
+
+    def take_spare_subprocess(self):
+        """Connect the closed rpcclt to the spare subprocess, if it is ready.
+
+        The caller still runs transfer_path(); the spare's working
+        directory is updated here if it changed since the spare started.
+        Return True if the spare was used.
+        """
+        spare = self.spare
+        if spare is None:
+            return False
+        # A spare still starting up is likely ready sooner than a new one.
+        wait = max(0, spare.deadline - time.monotonic())
+        if spare.rpcsubproc.poll() is not None or not spare.poll_connect(wait):
+            self.close_spare_subprocess()
+            return False
+        self.spare = None
+        rpc.SocketIO.__init__(self.rpcclt, spare.take_socket())
+        spare.rpcclt.close_listening()
+        self.rpcsubproc = spare.rpcsubproc
+        cwd = os.getcwd()
+        if cwd != spare.cwd:
+            self.runcommand(f"__import__('os').chdir({cwd!r})\n")
+        return True
+
     def transfer_path(self, with_cwd=False):
         if with_cwd:        # Issue 13506
             path = ['']     # include Current Working Directory
@@ -577,17 +921,67 @@ class ModifiedInterpreter(InteractiveInterpreter):
 
     active_seq = None
 
+    def watch_subprocess(self):
+        """Poll the subprocess as soon as its socket has data.
+
+        Used instead of rescheduling poll_subprocess every pollinterval
+        where Tk can watch sockets, which is everywhere except Windows.
+        """
+        self._watched_sock = self.rpcclt.sock
+        self.tkconsole.text.tk.createfilehandler(
+                self._watched_sock, READABLE, self._subprocess_readable)
+        self.rpcclt.poll_buffered = self._poll_buffered
+
+    def unwatch_subprocess(self):
+        "Stop watching the subprocess socket; return True if it was watched."
+        if self._watched_sock is None:
+            return False
+        self.tkconsole.text.tk.deletefilehandler(self._watched_sock)
+        self._watched_sock = None
+        return True
+
+    def _subprocess_readable(self, sock, mask):
+        # Unwatch while handling messages: the socket stays readable until
+        # the data is read, and writes to the shell call update(), which
+        # would call this again.
+        self.unwatch_subprocess()
+        try:
+            while self.handle_subprocess_message(wait=0):
+                pass
+        finally:
+            clt = self.rpcclt
+            if (clt is not None and clt.sock is not None and
+                    self._watched_sock is None and not self.tkconsole.closing):
+                self.watch_subprocess()
+
+    def _poll_buffered(self):
+        # Messages already read from the socket do not make it readable.
+        self.tkconsole.text.after_idle(self._subprocess_readable, None, None)
+
     def poll_subprocess(self):
+        if self.rpcclt is None:
+            return
+        self.handle_subprocess_message(wait=0.05)
+        # Reschedule myself
+        if not self.tkconsole.closing:
+            self._afterid = self.tkconsole.text.after(
+                self.tkconsole.pollinterval, self.poll_subprocess)
+
+    def handle_subprocess_message(self, wait):
+        """Handle messages from the subprocess, waiting up to wait seconds.
+
+        Return the response to the active command, if one arrived.
+        """
         clt = self.rpcclt
         if clt is None:
-            return
+            return None
         try:
-            response = clt.pollresponse(self.active_seq, wait=0.05)
+            response = clt.pollresponse(self.active_seq, wait=wait)
         except (EOFError, OSError, KeyboardInterrupt):
             # lost connection or subprocess terminated itself, restart
             # [the KBI is from rpc.SocketIO.handle_EOF()]
             if self.tkconsole.closing:
-                return
+                return None
             response = None
             self.restart_subprocess()
         if response:
@@ -610,10 +1004,7 @@ class ModifiedInterpreter(InteractiveInterpreter):
                 self.tkconsole.endexecuting()
             except AttributeError:  # shell may have closed
                 pass
-        # Reschedule myself
-        if not self.tkconsole.closing:
-            self._afterid = self.tkconsole.text.after(
-                self.tkconsole.pollinterval, self.poll_subprocess)
+        return response
 
     debugger = None
 
@@ -838,6 +1229,7 @@ class ModifiedInterpreter(InteractiveInterpreter):
 
 class PyShell(OutputWindow):
     from idlelib.squeezer import Squeezer
+    from idlelib.scrollback import Scrollback
 
     shell_title = "IDLE 命令行 " + python_version()
 
@@ -911,6 +1303,7 @@ class PyShell(OutputWindow):
             text.bind("<<view-restart>>", self.view_restart_mark)
             text.bind("<<restart-shell>>", self.restart_shell)
         self.squeezer = self.Squeezer(self)
+        self.scrollback = self.Scrollback(self)
         text.bind("<<squeeze-current-text>>",
                   self.squeeze_current_text_event)
 
@@ -1126,7 +1519,9 @@ class PyShell(OutputWindow):
         self.console = None
         self.flist.pyshell = None
         self.history = None
-        EditorWindow._close(self)
+        self.scrollback.close()
+        self.squeezer.spool.close()
+        OutputWindow._close(self)
 
     def ispythonsource(self, filename):
         "Override EditorWindow method: never remove the colorizer"
@@ -1169,6 +1564,7 @@ class PyShell(OutputWindow):
         self.top.quit()
 
     def readline(self):
+        self.flush()
         save = self.reading
         try:
             self.reading = True
@@ -1390,6 +1786,7 @@ class PyShell(OutputWindow):
             prompt = prompt[:-len(self.sys_ps1)]
         self.text.tag_add("console", "iomark-1c")
         self.console.write(prompt)
+        self.flush()
 
         self.shell_sidebar.update_sidebar()
         self.text.mark_set("insert", "end-1c")
@@ -1402,9 +1799,12 @@ class PyShell(OutputWindow):
         wrapped_msg = '\n'.join(wrapper.wrap(msg))
         if not wrapped_msg.endswith('\n'):
             wrapped_msg += '\n'
-        self.per.bottom.insert("iomark linestart", wrapped_msg, "stderr")
+        self.flush()
+        # Below the undo filter, which forbids inserting before the iomark.
+        self.undo.delegate.insert("iomark linestart", wrapped_msg, "stderr")
 
     def resetoutput(self):
+        self.flush()
         source = self.text.get("iomark", "end-1c")
         if self.history:
             self.history.store(source)
@@ -1416,9 +1816,12 @@ class PyShell(OutputWindow):
 
     def write(self, s, tags=()):
         try:
-            self.text.mark_gravity("iomark", "right")
             count = OutputWindow.write(self, s, tags, "iomark")
-            self.text.mark_gravity("iomark", "left")
+            if self.executing and not use_subprocess:
+                # The event loop does not run while the code does, so
+                # output held for the after() in OutputWindow.write()
+                # would not show until the code wrote again or ended.
+                self.flush()
         except:
             raise ###pass  # ### 11Aug07 KBK if we are expecting exceptions
                            # let's find out what they are and be specific.
@@ -1428,6 +1831,18 @@ class PyShell(OutputWindow):
                 raise KeyboardInterrupt
         return count
 
+    def flush(self):
+        """Extend OutputWindow.flush().
+
+        Keep the iomark after the output, then trim the scrollback.
+        """
+        self.text.mark_gravity("iomark", "right")
+        try:
+            OutputWindow.flush(self)
+        finally:
+            self.text.mark_gravity("iomark", "left")
+        self.scrollback.trim()
+
     def rmenu_check_cut(self):
         try:
             if self.text.compare('sel.first', '<', 'iomark'):
@@ -228,7 +228,8 @@ class ModuleName(Query):
 
 class Goto(Query):
     "Get a positive line number for editor Go To Line."
-    # Used in editor.EditorWindow.goto_line_event.
+    # Used in editor.EditorWindow.goto_line_event, and for a number of
+    # lines in squeezer.ExpandingButton.expand_part.
 
     def entry_ok(self):
         try:
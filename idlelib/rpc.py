@@ -27,6 +27,7 @@ accomplished in Idle.
 
 """
 import builtins
+import contextlib
 import copyreg
 import io
 import marshal
@@ -68,6 +69,7 @@ class CodePickler(pickle.Pickler):
 
 
 BUFSIZE = 8*1024
+IOVMAX = 512  # buffers per sendmsg() call, well under any IOV_MAX
 LOCALHOST = '127.0.0.1'
 
 class RPCServer(socketserver.TCPServer):
@@ -75,6 +77,8 @@ class RPCServer(socketserver.TCPServer):
     def __init__(self, addr, handlerclass=None):
         if handlerclass is None:
             handlerclass = RPCHandler
+        if isinstance(addr, str):  # Path of a Unix domain socket.
+            self.address_family = socket.AF_UNIX
         socketserver.TCPServer.__init__(self, addr, handlerclass)
 
     def server_bind(self):
@@ -120,9 +124,56 @@ class RPCServer(socketserver.TCPServer):
 
 #----------------- end class RPCServer --------------------
 
+class WakeupQueue(queue.Queue):
+    """Queue that makes wakeup_sock readable whenever an item is put.
+
+    A thread waiting in select() on its link socket can also watch
+    wakeup_sock and pick up queued items at once rather than when the
+    select() times out.  wakeup_sock is None if no socket pair could
+    be created.
+    """
+
+    wakeup_sock = _notify_sock = None
+
+    def __init__(self, maxsize=0):
+        super().__init__(maxsize)
+        self._make_wakeup()
+        if hasattr(os, 'register_at_fork'):
+            # A forked child must not share the pair with its parent.
+            os.register_at_fork(after_in_child=self._make_wakeup)
+
+    def _make_wakeup(self):
+        for sock in self.wakeup_sock, self._notify_sock:
+            if sock is not None:
+                sock.close()
+        try:
+            self.wakeup_sock, self._notify_sock = socket.socketpair()
+        except OSError:
+            self.wakeup_sock = self._notify_sock = None
+        else:
+            self.wakeup_sock.setblocking(False)
+            self._notify_sock.setblocking(False)
+
+    def _put(self, item):
+        super()._put(item)
+        if self._notify_sock is not None:
+            try:
+                self._notify_sock.send(b'\0')
+            except OSError:  # Buffer full: already readable.
+                pass
+
+    def clear_wakeup(self):
+        "Read all pending wakeup bytes."
+        try:
+            while self.wakeup_sock.recv(BUFSIZE):
+                pass
+        except OSError:
+            pass
+
+
 objecttable = {}
 request_queue = queue.Queue(0)
-response_queue = queue.Queue(0)
+response_queue = WakeupQueue(0)
 
 
 class SocketIO:
@@ -134,11 +185,30 @@ class SocketIO:
         if debugging is not None:
             self.debugging = debugging
         self.sock = sock
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            # Messages are small and answered at once; don't let Nagle's
+            # algorithm hold one back waiting for a delayed ACK.
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except OSError:
+                pass
         if objtable is None:
             objtable = objecttable
         self.objtable = objtable
         self.responses = {}
         self.cvars = {}
+        self.pending = set()  # Seqs of futures submitted by sockthread.
+        self.outlock = threading.Lock()
+        self.outqueue = []
+        self.sending = False
+        self.holding = 0
+        # Discard receive state left from any previous connection.
+        self.buff = None
+        self.bufstart = self.bufend = 0
+        self.bufneed = 4
+        self.bufstate = 0
+        self.frame = None
+        self.framelen = 0
 
     def close(self):
         sock = self.sock
@@ -243,6 +313,35 @@ class SocketIO:
         self.putmessage((seq, request))
         return seq
 
+    def submit(self, oid, methodname, args, kwargs):
+        """Send a call and return an RPCFuture for its result.
+
+        Unlike remotecall(), submit() does not wait, so several calls
+        can be sent back to back and their results collected as they
+        arrive.  Every future's result() should eventually be called.
+        """
+        seq = self.asynccall(oid, methodname, args, kwargs)
+        if threading.current_thread() is self.sockthread:
+            self.pending.add(seq)
+        return RPCFuture(self, seq)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Hold the messages sent in a with block and send them on exit.
+
+        The held messages go out together in as few writes as possible.
+        They are also sent if a response is awaited within the block.
+        """
+        with self.outlock:
+            self.holding += 1
+        try:
+            yield self
+        finally:
+            with self.outlock:
+                self.holding -= 1
+            if not self.holding:
+                self.flush()
+
     def asyncreturn(self, seq):
         self.debug("asyncreturn:%d:call getresponse(): " % seq)
         response = self.getresponse(seq, wait=0.05)
@@ -305,11 +404,17 @@ class SocketIO:
 
     def _getresponse(self, myseq, wait):
         self.debug("_getresponse:myseq:", myseq)
+        if self.outqueue:  # Held by batch().
+            self.flush()
         if threading.current_thread() is self.sockthread:
             # this thread does all reading of requests or responses
             while True:
+                if myseq in self.pending and myseq in self.responses:
+                    self.pending.discard(myseq)
+                    return self.responses.pop(myseq)
                 response = self.pollresponse(myseq, wait)
                 if response is not None:
+                    self.pending.discard(myseq)
                     return response
         else:
             # wait for notification from socket handling thread
@@ -330,55 +435,161 @@ class SocketIO:
         return seq
 
     def putmessage(self, message):
+        """Pickle message and queue it for sending.
+
+        Frames are written by whichever thread finds the queue idle.
+        Frames queued by other threads meanwhile are written by that
+        thread as well, coalesced into as few system calls as possible.
+        """
         self.debug("putmessage:%d:" % message[0])
         try:
             s = dumps(message)
         except pickle.PicklingError:
             print("无法序列化:", repr(message), file=sys.__stderr__)
             raise
-        s = struct.pack("<i", len(s)) + s
-        while len(s) > 0:
-            try:
-                r, w, x = select.select([], [self.sock], [])
-                n = self.sock.send(s[:BUFSIZE])
-            except (AttributeError, TypeError):
-                raise OSError("套接字不存在")
-            s = s[n:]
+        with self.outlock:
+            self.outqueue += (struct.pack("<i", len(s)), s)
+            if self.sending or self.holding:
+                return
+            self.sending = True
+        self._sendqueue()
+
+    def flush(self):
+        "Send the messages held by batch(), unless another thread is."
+        with self.outlock:
+            if self.sending or not self.outqueue:
+                return
+            self.sending = True
+        self._sendqueue()
+
+    def _sendqueue(self):
+        "Send until the queue is empty; the caller has set self.sending."
+        try:
+            while True:
+                with self.outlock:
+                    parts, self.outqueue = self.outqueue, []
+                    if not parts:
+                        self.sending = False
+                        return
+                self._sendparts(parts)
+        except:
+            with self.outlock:
+                self.sending = False
+            raise
 
-    buff = b''
+    def _sendparts(self, parts):
+        "Write the byte strings in parts, without joining them if possible."
+        try:
+            if not hasattr(self.sock, 'sendmsg'):
+                self.sock.sendall(b''.join(parts))
+                return
+            i = 0
+            while i < len(parts):
+                n = self.sock.sendmsg(parts[i:i+IOVMAX])
+                while i < len(parts) and n >= len(parts[i]):
+                    n -= len(parts[i])
+                    i += 1
+                if n:
+                    parts[i] = memoryview(parts[i])[n:]
+        except (AttributeError, TypeError):
+            raise OSError("套接字不存在")
+
+    # Receive state.  Headers and small packets are staged in self.buff;
+    # a packet too large for it is read straight into its own bytearray.
+    buff = None
+    bufstart = bufend = 0  # unconsumed staged bytes are buff[bufstart:bufend]
     bufneed = 4
     bufstate = 0 # meaning: 0 => reading count; 1 => reading data
+    frame = None
+    framelen = 0  # bytes of frame received so far
 
     def pollpacket(self, wait):
-        self._stage0()
-        if len(self.buff) < self.bufneed:
-            r, w, x = select.select([self.sock.fileno()], [], [], wait)
-            if len(r) == 0:
-                return None
-            try:
-                s = self.sock.recv(BUFSIZE)
-            except OSError:
-                raise EOFError
-            if len(s) == 0:
-                raise EOFError
-            self.buff += s
+        """Return the next complete packet as a memoryview, or None.
+
+        Once data starts arriving, keep reading until the packet is
+        complete or nothing arrives within wait seconds.  Also return
+        None as soon as a response is put on response_queue.  The
+        returned view is only valid until the next call.
+        """
+        fd = self.sock.fileno()
+        fds = [fd]
+        if response_queue.wakeup_sock is not None:
+            fds.append(response_queue.wakeup_sock)
+        while True:
             self._stage0()
-        return self._stage1()
+            packet = self._stage1()
+            if packet is not None:
+                return packet
+            r, w, x = select.select(fds, [], [], wait)
+            if fd not in r:
+                if r:  # A queued response is ready to send.
+                    response_queue.clear_wakeup()
+                return None
+            self._recv()
+
+    def packet_ready(self):
+        "Return True if a complete packet has already been received."
+        self._stage0()
+        if self.bufstate != 1:
+            return False
+        if self.frame is not None:
+            return self.framelen >= self.bufneed
+        return self.bufend - self.bufstart >= self.bufneed
+
+    def _recv(self):
+        "Receive available bytes into the pending frame or the stage buffer."
+        try:
+            if self.frame is not None:
+                view = memoryview(self.frame)[self.framelen:]
+                n = self.sock.recv_into(view)
+                self.framelen += n
+            else:
+                if self.buff is None:
+                    self.buff = bytearray(BUFSIZE)
+                elif self.bufstart:
+                    # Move the unconsumed tail to the front.
+                    size = self.bufend - self.bufstart
+                    self.buff[:size] = self.buff[self.bufstart:self.bufend]
+                    self.bufstart, self.bufend = 0, size
+                view = memoryview(self.buff)[self.bufend:]
+                n = self.sock.recv_into(view)
+                self.bufend += n
+        except OSError:
+            raise EOFError
+        if n == 0:
+            raise EOFError
 
     def _stage0(self):
-        if self.bufstate == 0 and len(self.buff) >= 4:
-            s = self.buff[:4]
-            self.buff = self.buff[4:]
-            self.bufneed = struct.unpack("<i", s)[0]
+        if self.bufstate == 0 and self.bufend - self.bufstart >= 4:
+            self.bufneed = struct.unpack_from("<i", self.buff,
+                                              self.bufstart)[0]
+            self.bufstart += 4
             self.bufstate = 1
+            if self.bufneed > BUFSIZE:
+                # Everything staged belongs to this packet.
+                self.frame = bytearray(self.bufneed)
+                self.framelen = self.bufend - self.bufstart
+                self.frame[:self.framelen] = \
+                        self.buff[self.bufstart:self.bufend]
+                self.bufstart = self.bufend = 0
 
     def _stage1(self):
-        if self.bufstate == 1 and len(self.buff) >= self.bufneed:
-            packet = self.buff[:self.bufneed]
-            self.buff = self.buff[self.bufneed:]
-            self.bufneed = 4
-            self.bufstate = 0
-            return packet
+        if self.bufstate != 1:
+            return None
+        if self.frame is not None:
+            if self.framelen < self.bufneed:
+                return None
+            packet = memoryview(self.frame)
+            self.frame = None
+        else:
+            if self.bufend - self.bufstart < self.bufneed:
+                return None
+            start = self.bufstart
+            self.bufstart += self.bufneed
+            packet = memoryview(self.buff)[start:self.bufstart]
+        self.bufneed = 4
+        self.bufstate = 0
+        return packet
 
     def pollmessage(self, wait):
         packet = self.pollpacket(wait)
@@ -388,7 +599,8 @@ class SocketIO:
             message = pickle.loads(packet)
         except pickle.UnpicklingError:
             print("-----------------------", file=sys.__stderr__)
-            print("无法反序列化包:", repr(packet), file=sys.__stderr__)
+            print("无法反序列化包:", repr(bytes(packet)),
+                  file=sys.__stderr__)
             traceback.print_stack(file=sys.__stderr__)
             print("-----------------------", file=sys.__stderr__)
             raise
@@ -418,15 +630,18 @@ class SocketIO:
 
         """
         while True:
-            # send queued response if there is one available
-            try:
-                qmsg = response_queue.get(0)
-            except queue.Empty:
-                pass
-            else:
+            # send the queued responses that are available
+            while True:
+                try:
+                    qmsg = response_queue.get(0)
+                except queue.Empty:
+                    break
                 seq, response = qmsg
                 message = (seq, ('OK', response))
                 self.putmessage(message)
+            # don't wait for a reply to a message still held by batch()
+            if self.outqueue:
+                self.flush()
             # poll for message on link
             try:
                 message = self.pollmessage(wait)
@@ -465,6 +680,10 @@ class SocketIO:
                     self.responses[seq] = resq
                     cv.notify()
                     cv.release()
+                elif seq in self.pending:
+                    # for a future of this thread, read while waiting
+                    # for something else
+                    self.responses[seq] = resq
                 continue
 
     def handle_EOF(self):
@@ -477,6 +696,8 @@ class SocketIO:
             self.responses[key] = ('EOF', None)
             cv.notify()
             cv.release()
+        for key in self.pending:
+            self.responses[key] = ('EOF', None)
         # call our (possibly overridden) exit function
         self.exithook()
 
@@ -486,6 +707,47 @@ class SocketIO:
 
 #----------------- end class SocketIO --------------------
 
+class RPCFuture:
+    "Result of a call sent by SocketIO.submit(), possibly still pending."
+
+    _done = False
+    _result = _exception = None
+
+    def __init__(self, sockio, seq):
+        self.sockio = sockio
+        self.seq = seq
+
+    def done(self):
+        """Return True if the response has arrived, without waiting.
+
+        In the thread that reads the socket, read what is available.
+        """
+        sockio = self.sockio
+        if self._done or self.seq in sockio.responses:
+            return True
+        if threading.current_thread() is sockio.sockthread:
+            response = sockio.pollresponse(self.seq, 0)
+            if response is not None:
+                sockio.responses[self.seq] = response
+                return True
+        return False
+
+    def result(self):
+        """Wait for the response; return or raise as remotecall() would.
+
+        Later calls return or raise the same again.
+        """
+        if not self._done:
+            try:
+                self._result = self.sockio.asyncreturn(self.seq)
+            except Exception as exc:
+                self._exception = exc
+            self._done = True
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+
 class RemoteObject:
     # Token mix-in class
     pass
@@ -530,14 +792,21 @@ class RPCClient(SocketIO):
 
     def __init__(self, address, family=socket.AF_INET, type=socket.SOCK_STREAM):
         self.listening_sock = socket.socket(family, type)
-        self.listening_sock.bind(address)
-        self.listening_sock.listen(1)
+        try:
+            self.listening_sock.bind(address)
+            self.listening_sock.listen(1)
+        except OSError:
+            self.listening_sock.close()
+            raise
 
     def accept(self):
         working_sock, address = self.listening_sock.accept()
         if self.debugging:
             print("****** 连接请求发自 ", address, file=sys.__stderr__)
-        if address[0] == LOCALHOST:
+        # A Unix domain peer has no host address; the permissions on the
+        # socket file decide who can connect.
+        if (self.listening_sock.family == getattr(socket, 'AF_UNIX', None)
+                or address[0] == LOCALHOST):
             SocketIO.__init__(self, working_sock)
         else:
             print("** 无效主机: ", address, file=sys.__stderr__)
@@ -7,8 +7,12 @@ f'''{sys.executable} -c "__import__('idlelib.run').run.main()"'''
 import contextlib
 import functools
 import io
+import json
 import linecache
+import os
 import queue
+import signal
+import socket
 import sys
 import textwrap
 import time
@@ -20,6 +24,7 @@ import warnings
 import idlelib  # testing
 from idlelib import autocomplete  # AutoComplete, fetch_encodings
 from idlelib import calltip  # Calltip
+from idlelib.config import idleConf  # output buffering options
 from idlelib import debugger_r  # start_debugger
 from idlelib import debugobj_r  # remote_object_tree_item
 from idlelib import iomenu  # encoding
@@ -113,6 +118,7 @@ else:
 exit_now = False
 quitting = False
 interruptible = False
+output_buffer = None  # OutputBuffer shared by sys.stdout and sys.stderr
 
 def main(del_exitfunc=False):
     """Start the Python execution server in a subprocess
@@ -139,9 +145,11 @@ def main(del_exitfunc=False):
     #time.sleep(15) # test subprocess not responding
     try:
         assert(len(sys.argv) > 1)
-        port = int(sys.argv[-1])
+        address = sys.argv[-1]
+        if not os.path.isabs(address):  # Else a Unix domain socket path.
+            address = (LOCALHOST, int(address))
     except:
-        print("IDLE 子进程: 没有 IP 端口传入 sys.argv。",
+        print("IDLE 子进程: 没有 IP 端口或套接字路径传入 sys.argv。",
               file=sys.__stderr__)
         return
 
@@ -149,7 +157,7 @@ def main(del_exitfunc=False):
     sys.argv[:] = [""]
     threading.Thread(target=manage_socket,
                      name='SockThread',
-                     args=((LOCALHOST, port),),
+                     args=(address,),
                      daemon=True,
                     ).start()
 
@@ -192,6 +200,42 @@ def main(del_exitfunc=False):
             else:
                 continue
 
+def forkserver_main(del_exitfunc=False, preload=()):
+    """Fork execution subprocesses on request of the IDLE GUI (Linux only).
+
+    This template process imports idlelib.run and the preload modules
+    once.  The GUI passes the number of a connected socket in sys.argv.
+    Once ready, the template writes 'ready'; then, for each JSON
+    [address, cwd] request line, it forks a child that changes to cwd
+    and runs main() on the port or socket path address, and writes back
+    the child's pid.  The template
+    exits when the GUI closes the socket.
+    """
+    for name in preload:
+        try:
+            __import__(name)
+        except Exception:
+            traceback.print_exc(file=sys.__stderr__)
+    # Children are reaped automatically; the GUI only kills them.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    control = socket.socket(fileno=int(sys.argv[-1]))
+    with control, control.makefile('rw', encoding='utf-8') as cfile:
+        print('ready', file=cfile, flush=True)
+        for line in cfile:
+            address, cwd = json.loads(line)
+            pid = os.fork()
+            if pid == 0:
+                cfile.close()
+                control.close()
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                try:
+                    os.chdir(cwd)
+                except OSError:
+                    pass
+                sys.argv[-1] = str(address)
+                return main(del_exitfunc)
+            print(pid, file=cfile, flush=True)
+
 def manage_socket(address):
     for i in range(3):
         time.sleep(i)
@@ -218,9 +262,11 @@ def show_socket_error(err, address):
     root = tkinter.Tk()
     fix_scaling(root)
     root.withdraw()
+    if not isinstance(address, str):
+        address = f"{address[0]}:{address[1]}"
     showerror(
             "子进程连接错误",
-            f"子进程无法连接到 {address[0]}:{address[1]}。\n"
+            f"子进程无法连接到 {address}。\n"
             f"致命的 OSError #{err.errno}: {err.strerror}。\n"
             "参见 IDLE 文档的 '启动失败' 一节，或访问\n"
             "https://docs.python.org/zh-cn/3/library/idle.html#startup-failure",
@@ -307,7 +353,9 @@ def cleanup_traceback(tb, exclude):
         tb[i] = fn, ln, nm, line
 
 def flush_stdout():
-    """XXX How to do this now?"""
+    "Send output held by the shared output buffer, if any, to the shell."
+    if output_buffer is not None:
+        output_buffer.flush()
 
 def exit():
     """Exit subprocess, possibly after first clearing exit functions.
@@ -466,6 +514,11 @@ class StdioFile(io.TextIOBase):
 
 class StdOutputFile(StdioFile):
 
+    def __init__(self, shell, tags, encoding='utf-8', errors='strict',
+                 writebuffer=None):
+        super().__init__(shell, tags, encoding, errors)
+        self.writebuffer = writebuffer
+
     def writable(self):
         return True
 
@@ -473,8 +526,108 @@ class StdOutputFile(StdioFile):
         if self.closed:
             raise ValueError("write to closed file")
         s = str.encode(s, self.encoding, self.errors).decode(self.encoding, self.errors)
+        if self.writebuffer is not None:
+            return self.writebuffer.write(s, self.tags)
         return self.shell.write(s, self.tags)
 
+    def flush(self):
+        super().flush()
+        if self.writebuffer is not None:
+            self.writebuffer.flush()
+
+
+class OutputBuffer:
+    """Coalesce writes to the shell into fewer write calls.
+
+    StdOutputFiles sharing one buffer keep their relative order.
+    Consecutive writes with the same tags are joined into one call.
+    Pending output is sent once it reaches maxsize characters, delay
+    seconds after the first pending write, or when flush() is called.
+    """
+
+    def __init__(self, shell, maxsize=65536, delay=0.005):
+        self.shell = shell
+        self.maxsize = maxsize
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.pending = []  # (tags, [str, ...]); adjacent tags differ.
+        self.size = 0
+        self.deadline = None
+        self.sender = None  # Thread currently calling shell.write.
+        self.timer = None
+
+    def write(self, s, tags):
+        with self.lock:
+            if self.pending and self.pending[-1][0] == tags:
+                self.pending[-1][1].append(s)
+            else:
+                self.pending.append((tags, [s]))
+            self.size += len(s)
+            full = self.size >= self.maxsize
+            if not full and self.deadline is None:
+                self.deadline = time.monotonic() + self.delay
+                if self.timer is None:
+                    self.timer = threading.Thread(target=self._run_timer,
+                                                  name='OutputTimer',
+                                                  daemon=True)
+                    self.timer.start()
+                self.cond.notify_all()
+        if full:
+            self.flush(wait=False)
+        return len(s)
+
+    def flush(self, wait=True):
+        """Send pending output to the shell.
+
+        Only one thread sends at a time, and it also sends anything
+        written while it was busy.  If another thread is sending, wait
+        for it to finish unless wait is False.
+        """
+        me = threading.current_thread()
+        with self.lock:
+            if self.sender is not None:
+                if wait and self.sender is not me:
+                    self.cond.wait_for(lambda: self.sender is None)
+                return
+            self.sender = me
+        try:
+            while True:
+                with self.lock:
+                    pending, self.pending = self.pending, []
+                    self.size = 0
+                    self.deadline = None
+                    if not pending:
+                        break
+                for tags, strings in pending:
+                    self.shell.write(''.join(strings), tags)
+        finally:
+            with self.lock:
+                self.sender = None
+                self.cond.notify_all()
+
+    def _run_timer(self):
+        "Flush pending output once its deadline passes."
+        while True:
+            with self.lock:
+                while (self.sender is not None or self.deadline is None or
+                       self.deadline > time.monotonic()):
+                    # While another thread sends, wait for its notify:
+                    # a past deadline would make the wait return at once.
+                    if self.sender is not None or self.deadline is None:
+                        timeout = None
+                    else:
+                        timeout = self.deadline - time.monotonic()
+                    self.cond.wait(timeout)
+            try:
+                self.flush(wait=False)
+            except Exception:
+                # Lost connection; the subprocess is shutting down.
+                with self.lock:
+                    self.pending = []
+                    self.size = 0
+                    self.deadline = None
+
 
 class StdInputFile(StdioFile):
     _line_buffer = ''
@@ -489,6 +642,7 @@ class StdInputFile(StdioFile):
             size = -1
         elif not isinstance(size, int):
             raise TypeError('must be int, not ' + type(size).__name__)
+        flush_stdout()
         result = self._line_buffer
         self._line_buffer = ''
         if size < 0:
@@ -510,6 +664,7 @@ class StdInputFile(StdioFile):
             size = -1
         elif not isinstance(size, int):
             raise TypeError('must be int, not ' + type(size).__name__)
+        flush_stdout()
         line = self._line_buffer or self.shell.readline()
         if size < 0:
             size = len(line)
@@ -527,15 +682,26 @@ class MyHandler(rpc.RPCHandler):
 
     def handle(self):
         """Override base method"""
+        global output_buffer
         executive = Executive(self)
         self.register("exec", executive)
         self.console = self.get_remote_proxy("console")
+        if idleConf.GetOption('main', 'PyShell', 'buffer-output',
+                              default=False, type='bool'):
+            size = idleConf.GetOption('main', 'PyShell', 'buffer-output-size',
+                                      default=65536, type='int')
+            delay = idleConf.GetOption('main', 'PyShell',
+                                       'buffer-output-delay',
+                                       default=5, type='int')
+            output_buffer = OutputBuffer(self.console, size, delay / 1000)
         sys.stdin = StdInputFile(self.console, "stdin",
                                  iomenu.encoding, iomenu.errors)
         sys.stdout = StdOutputFile(self.console, "stdout",
-                                   iomenu.encoding, iomenu.errors)
+                                   iomenu.encoding, iomenu.errors,
+                                   output_buffer)
         sys.stderr = StdOutputFile(self.console, "stderr",
-                                   iomenu.encoding, "backslashreplace")
+                                   iomenu.encoding, "backslashreplace",
+                                   output_buffer)
 
         sys.displayhook = rpc.displayhook
         # page help() text to shell.
@@ -594,6 +760,7 @@ class Executive:
                 if not isinstance(ob, (type(None), int)):
                     print('SystemExit: ' + str(ob), file=sys.stderr)
             # Return to the interactive prompt.
+            flush_stdout()
         except:
             self.user_exc_info = sys.exc_info()  # For testing, hook, viewer.
             if quitting:
@@ -606,6 +773,7 @@ class Executive:
                 except:
                     self.user_exc_info = sys.exc_info()  # For testing.
                     print_exception()
+            flush_stdout()
             jit = self.rpchandler.console.getvar("<<toggle-jit-stack-viewer>>")
             if jit:
                 self.rpchandler.interp.open_remote_stack_viewer()
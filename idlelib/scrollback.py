@@ -0,0 +1,264 @@
+"""Keep the Shell's scrollback to a limited number of lines.
+
+Once the Shell holds more than the scrollback-lines configured in the
+[PyShell] section of config-main, the oldest lines of output are moved
+out of the text widget, in blocks, into a temporary file.  A button at
+the top of the Shell stands for them.  Double-clicking it loads the
+most recent block back.  Right-clicking it offers to find text in, copy
+or view everything moved out.
+"""
+import json
+
+import tkinter as tk
+
+from idlelib import query
+from idlelib.config import idleConf
+from idlelib.spool import Spool
+from idlelib.textview import view_text
+from idlelib.tooltip import Hovertip
+from idlelib import macosx
+
+# Tags not kept with moved text: the selection and colorizer state.
+SKIP_TAGS = {"sel", "TODO", "SYNC"}
+
+
+class ScrollbackButton(tk.Button):
+    """The button at the top of the Shell standing for moved output.
+
+    It is tied to a Scrollback instance, which does the work.
+    """
+    def __init__(self, scrollback):
+        self.scrollback = scrollback
+        self.text = text = scrollback.text
+        tk.Button.__init__(self, text, background="#E0E8FF",
+                           activebackground="#F0F4FF")
+        Hovertip(self, "双击载入较早的输出，右键更多选项。", hover_delay=80)
+
+        self.bind("<Double-Button-1>", self.load)
+        if macosx.isAquaTk():
+            # AquaTk defines <2> as the right button, not <3>.
+            self.bind("<Button-2>", self.context_menu_event)
+        else:
+            self.bind("<Button-3>", self.context_menu_event)
+
+    def set_numoflines(self, numoflines):
+        self["text"] = f"较早的输出已移出（共{numoflines}行）"
+
+    def load(self, event=None):
+        """load event handler
+
+        Load the most recently moved block of output back above the
+        rest of the Shell's text.
+        """
+        self.scrollback.load()
+
+    def find(self, event=None):
+        """find event handler
+
+        Ask for a string and view the moved lines that contain it.
+        """
+        s = query.Query(self.text, "查找较早的输出", "要查找的文本：").result
+        if s:
+            lines = list(self.scrollback.search(s))
+            view_text(self.text, f"查找结果：{s}",
+                      "".join(lines) if lines else "找不到。",
+                      modal=False, wrap='none')
+
+    def copy(self, event=None):
+        """copy event handler
+
+        Copy all moved output to the clipboard.
+        """
+        self.clipboard_clear()
+        self.clipboard_append(self.scrollback.get())
+
+    def view(self, event=None):
+        """view event handler
+
+        View all moved output in a separate text viewer window.
+        """
+        view_text(self.text, "较早的输出", self.scrollback.get(),
+                  modal=False, wrap='none')
+
+    rmenu_specs = (
+        # Item structure: (label, method_name).
+        ('载入', 'load'),
+        ('查找', 'find'),
+        ('复制', 'copy'),
+        ('查看', 'view'),
+    )
+
+    def context_menu_event(self, event):
+        rmenu = tk.Menu(self.text, tearoff=0)
+        for label, method_name in self.rmenu_specs:
+            rmenu.add_command(label=label, command=getattr(self, method_name))
+        rmenu.tk_popup(event.x_root, event.y_root)
+        return "break"
+
+
+class Scrollback:
+    """Move the Shell's oldest lines into a Spool past max_lines.
+
+    The text is trimmed once it is a tenth longer than max_lines, so
+    that each block moved out is at least that long.  A max_lines of 0
+    keeps everything.
+
+    blocks lists the (spool key, number of lines) of the blocks moved
+    out, oldest first.  A block is stored as the JSON of a list with
+    [chars, tags] items, and [chars, tags, numoflines] items for the
+    output of squeezed buttons.
+    """
+    @classmethod
+    def reload(cls):
+        """Load class variables from config."""
+        cls.max_lines = idleConf.GetOption(
+            "main", "PyShell", "scrollback-lines", type="int", default=0,
+        )
+
+    def __init__(self, editwin):
+        """Initialize settings for Scrollback.
+
+        editwin is the shell's Editor window.
+        self.text is the editor window text widget.
+        self.button is the ScrollbackButton on the first line, if any
+            output was moved out.
+        self.loaded counts the lines loaded back and not trimmed since.
+        """
+        self.editwin = editwin
+        self.text = editwin.text
+        self.spool = Spool()
+        self.blocks = []
+        self.button = None
+        self.loaded = 0
+
+    def base(self):
+        """Return the filter to change the text before the iomark with.
+
+        It is the one below the Shell's UndoDelegator, which forbids such
+        changes, so that the colorizer and the parser still see them.
+        """
+        return self.editwin.undo.delegate
+
+    def numoflines(self):
+        "Return the number of lines moved out."
+        return sum(numoflines for key, numoflines in self.blocks)
+
+    def trim(self):
+        """Move the oldest lines out if there are too many.
+
+        Only whole lines before the iomark line are moved, so that the
+        input and the prompt bookkeeping are left as they are.
+        """
+        max_lines = self.max_lines
+        if max_lines <= 0:
+            return
+        text = self.text
+        nlines = int(text.index("end-1c").split(".")[0])
+        if nlines <= max_lines + self.loaded + max_lines // 10:
+            return
+        first = 1 if self.button is None else 2
+        last = min(nlines - max_lines + 1,
+                   int(text.index("iomark").split(".")[0]))
+        if last <= first:
+            return
+        start, end = f"{first}.0", f"{last}.0"
+
+        squeezer = self.editwin.squeezer
+        for button in squeezer.expandingbuttons:
+            # Leave what is still to expand squeezed, to be moved out.
+            if (button.expanding is not None and
+                    text.compare(button, "<", end)):
+                button.cancel_expand()
+        squeezed = {str(button): button
+                    for button in squeezer.expandingbuttons}
+        moved = []
+        items = []
+        tags = set(text.tag_names(start))
+        for key, value, index in text.dump(start, end, text=True, tag=True,
+                                           window=True):
+            if key == "tagon":
+                tags.add(value)
+            elif key == "tagoff":
+                tags.discard(value)
+            elif key == "text":
+                item_tags = sorted(tags - SKIP_TAGS)
+                if items and len(items[-1]) == 2 and items[-1][1] == item_tags:
+                    items[-1][0] += value
+                else:
+                    items.append([value, item_tags])
+            elif key == "window" and value in squeezed:
+                button = squeezed[value]
+                moved.append(button)
+                items.append([button.s, button.tags, button.numoflines])
+        self.blocks.append((self.spool.append(json.dumps(items)),
+                            last - first))
+        self.loaded = 0
+
+        base = self.base()
+        base.delete(start, end)
+        if moved:
+            squeezer.expandingbuttons[:] = [
+                button for button in squeezer.expandingbuttons
+                if button not in moved]
+        if self.button is None:
+            self.button = ScrollbackButton(self)
+            text.window_create("1.0", window=self.button, padx=3, pady=5)
+            base.insert("1.1", "\n")
+        self.button.set_numoflines(self.numoflines())
+        self.editwin.shell_sidebar.update_sidebar()
+
+    def load(self):
+        "Load the last block moved out back into the text."
+        from idlelib.squeezer import ExpandingButton
+        if not self.blocks:
+            return
+        key, numoflines = self.blocks.pop()
+        text = self.text
+        base = self.base()
+        squeezer = self.editwin.squeezer
+        buttons = []
+        # Insert from the end, each item before the ones after it.
+        for item in reversed(json.loads(self.spool.read(key))):
+            if len(item) == 2:
+                base.insert("2.0", item[0], tuple(item[1]))
+            else:
+                button = ExpandingButton(*item, squeezer)
+                text.window_create("2.0", window=button, padx=3, pady=5)
+                buttons.insert(0, button)
+        squeezer.expandingbuttons[:0] = buttons
+        self.loaded += numoflines
+        if self.blocks:
+            self.button.set_numoflines(self.numoflines())
+        else:
+            base.delete("1.0", "2.0")
+            self.button = None
+        self.editwin.shell_sidebar.update_sidebar()
+
+    def blocks_text(self):
+        "Yield the text of each block moved out, oldest first."
+        for key, numoflines in self.blocks:
+            yield "".join(item[0] for item in json.loads(self.spool.read(key)))
+
+    def get(self):
+        "Return all text moved out."
+        return "".join(self.blocks_text())
+
+    def search(self, s):
+        "Yield the lines moved out that contain s."
+        for chars in self.blocks_text():
+            for line in chars.splitlines(keepends=True):
+                if s in line:
+                    yield line
+
+    def close(self):
+        "Forget all output moved out."
+        self.blocks = []
+        self.spool.close()
+
+
+Scrollback.reload()
+
+
+if __name__ == "__main__":
+    from unittest import main
+    main('idlelib.idle_test.test_scrollback', verbosity=2, exit=False)
@@ -0,0 +1,83 @@
+"""Keep strings out of memory in a temporary file for the session.
+
+The Shell keeps the text of squeezed output buttons, and the output its
+scrollback moved out, in Spools, and reads it back when it is needed.
+"""
+from collections import OrderedDict
+import tempfile
+
+
+class Spool:
+    """Append-only store of strings in an unnamed temporary file.
+
+    append() returns the key to read() the string back with.  The file
+    is made on first use and is gone once closed, or when IDLE exits.
+    Space is not reused; a Spool lives as long as its Shell.
+
+    The strings read most recently are kept in memory, up to cache_size
+    characters in all, as they are often read again soon, for instance
+    by each request for a part of the selection.
+    """
+    encoding = 'utf-8'
+    errors = 'surrogatepass'  # Output may hold lone surrogates.
+    cache_size = 1 << 23
+
+    def __init__(self):
+        self.file = None
+        self.size = 0
+        self.cache = OrderedDict()
+        self.cached = 0  # Characters in cache.
+
+    def append(self, s):
+        "Store s and return a key for it."
+        if self.file is None:
+            self.file = tempfile.TemporaryFile(prefix='idle-spool-')
+        data = s.encode(self.encoding, self.errors)
+        self.file.seek(self.size)
+        self.file.write(data)
+        key = self.size, len(data)
+        self.size += len(data)
+        return key
+
+    def read(self, key):
+        "Return the string stored with key."
+        cache = self.cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        offset, length = key
+        self.file.seek(offset)
+        s = self.file.read(length).decode(self.encoding, self.errors)
+        if len(s) <= self.cache_size:
+            cache[key] = s
+            self.cached += len(s)
+            while self.cached > self.cache_size:
+                self.cached -= len(cache.popitem(last=False)[1])
+        return s
+
+    def slice(self, key, s, start=0, stop=None):
+        """Return a key for s[start:stop], where s is the string of key.
+
+        The part is not stored again.  Only the characters outside it
+        are encoded, to find where it is in the file.
+        """
+        if stop is None:
+            stop = len(s)
+        offset, length = key
+        head = len(s[:start].encode(self.encoding, self.errors))
+        tail = len(s[stop:].encode(self.encoding, self.errors))
+        return offset + head, length - head - tail
+
+    def close(self):
+        "Remove the file and forget all strings."
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.size = 0
+        self.cache.clear()
+        self.cached = 0
+
+
+if __name__ == '__main__':
+    from unittest import main
+    main('idlelib.idle_test.test_spool', verbosity=2)
@@ -7,78 +7,89 @@ completely unusable.
 
 This extension will automatically replace long texts with a small button.
 Double-clicking this button will remove it and insert the original text instead.
-Middle-clicking will copy the text to the clipboard. Right-clicking will open
-the text in a separate viewing window.
+Long texts are inserted a chunk at a time, and clicking the button meanwhile
+stops, leaving the rest squeezed. Middle-clicking will copy the text to the
+clipboard. Right-clicking will open a menu to expand only the first or last
+lines, or to copy the text, or view it in a separate viewing window.
 
 Additionally, any output can be manually "squeezed" by the user. This includes
 output written to the standard error stream ("stderr"), such as exception
 messages and their tracebacks.
 """
+from itertools import chain
 import re
 
 import tkinter as tk
 from tkinter import messagebox
 
+from idlelib import query
 from idlelib.config import idleConf
+from idlelib.spool import Spool
 from idlelib.textview import view_text
 from idlelib.tooltip import Hovertip
 from idlelib import macosx
 
 
-def count_lines_with_wrapping(s, linewidth=80):
+def count_lines_with_wrapping(s, linewidth=80, limit=None):
     """Count the number of lines in a given string.
 
     Lines are counted as if the string was wrapped so that lines are never over
     linewidth characters long.
 
     Tabs are considered tabwidth characters long.
+
+    If limit is given, counting stops once there are at least limit lines,
+    so the count returned may be short of the whole when it is >= limit.
     """
+    if not s:
+        return 0
+    # Each newline ends a line, as does the end of the text.
+    linecount = s.count('\n') + (s[-1] != '\n')
+    if limit is not None and linecount >= limit:
+        return linecount
+
+    # Only lines over linewidth characters, or with tabs, can take more
+    # than one line when wrapped.  Find them with regular expressions:
+    # searching for the newline before each line is much faster than for
+    # ^ in MULTILINE mode, but leaves the first line to match on its own.
     tabwidth = 8  # Currently always true in Shell.
-    pos = 0
-    linecount = 1
+    has_tabs = '\t' in s
+    wrapping = rf"([^\n]{{{linewidth + 1},}}"
+    wrapping += r"|[^\n\t]*\t[^\n]*)" if has_tabs else ")"
+    first = re.match(wrapping, s)
+    for m in chain([first] if first else [], re.finditer("\n" + wrapping, s)):
+        if has_tabs and '\t' in (line := m.group(1)):
+            # Most lines with tabs fit once the tabs are expanded.
+            if len(line.expandtabs(tabwidth)) > linewidth:
+                linecount += _count_tab_line_wraps(line, linewidth, tabwidth)
+        else:
+            # If the length is an exact multiple of linewidth, no new
+            # line has been started yet, hence the - 1.
+            linecount += (m.end(1) - m.start(1) - 1) // linewidth
+        if limit is not None and linecount >= limit:
+            break
+    return linecount
+
+
+def _count_tab_line_wraps(line, linewidth, tabwidth):
+    "Return how many more lines a line with tabs takes when wrapped."
+    wraps = 0
     current_column = 0
+    *parts, last = line.split('\t')
+    for part in parts:
+        current_column += len(part)
+        current_column += tabwidth - (current_column % tabwidth)
 
-    for m in re.finditer(r"[\t\n]", s):
-        # Process the normal chars up to tab or newline.
-        numchars = m.start() - pos
-        pos += numchars
-        current_column += numchars
-
-        # Deal with tab or newline.
-        if s[pos] == '\n':
-            # Avoid the `current_column == 0` edge-case, and while we're
-            # at it, don't bother adding 0.
-            if current_column > linewidth:
-                # If the current column was exactly linewidth, divmod
-                # would give (1,0), even though a new line hadn't yet
-                # been started. The same is true if length is any exact
-                # multiple of linewidth. Therefore, subtract 1 before
-                # dividing a non-empty line.
-                linecount += (current_column - 1) // linewidth
-            linecount += 1
-            current_column = 0
-        else:
-            assert s[pos] == '\t'
-            current_column += tabwidth - (current_column % tabwidth)
-
-            # If a tab passes the end of the line, consider the entire
-            # tab as being on the next line.
-            if current_column > linewidth:
-                linecount += 1
-                current_column = tabwidth
-
-        pos += 1 # After the tab or newline.
-
-    # Process remaining chars (no more tabs or newlines).
-    current_column += len(s) - pos
-    # Avoid divmod(-1, linewidth).
-    if current_column > 0:
-        linecount += (current_column - 1) // linewidth
-    else:
-        # Text ended with newline; don't count an extra line after it.
-        linecount -= 1
+        # If a tab passes the end of the line, consider the entire
+        # tab as being on the next line.
+        if current_column > linewidth:
+            wraps += 1
+            current_column = tabwidth
 
-    return linecount
+    current_column += len(last)
+    if current_column > linewidth:
+        wraps += (current_column - 1) // linewidth
+    return wraps
 
 
 class ExpandingButton(tk.Button):
@@ -90,22 +101,21 @@ class ExpandingButton(tk.Button):
     window.
 
     Each button is tied to a Squeezer instance, and it knows to update the
-    Squeezer instance when it is expanded (and therefore removed).
+    Squeezer instance when it is expanded (and therefore removed).  The
+    original text is kept in the Squeezer's spool, not in the button.
     """
+    chunk_size = 1 << 16  # Characters inserted per step of expanding.
+    partial_lines = 100  # Suggested number of lines to expand in part.
+
     def __init__(self, s, tags, numoflines, squeezer):
-        self.s = s
         self.tags = tags
-        self.numoflines = numoflines
         self.squeezer = squeezer
         self.editwin = editwin = squeezer.editwin
         self.text = text = editwin.text
-        # The base Text widget is needed to change text before iomark.
-        self.base_text = editwin.per.bottom
 
-        line_plurality = "行" if numoflines != 1 else "行"
-        button_text = f"输出已被折叠（共{numoflines}{line_plurality}）"
-        tk.Button.__init__(self, text, text=button_text,
+        tk.Button.__init__(self, text,
                            background="#FFFFC0", activebackground="#FFFFE0")
+        self.set_text(s, numoflines)
 
         button_tooltip_text = (
             "双击展开，右键更多选项。"
@@ -119,21 +129,40 @@ class ExpandingButton(tk.Button):
         else:
             self.bind("<Button-3>", self.context_menu_event)
         self.selection_handle(  # X windows only.
-            lambda offset, length: s[int(offset):int(offset) + int(length)])
+            lambda offset, length:
+                self.s[int(offset):int(offset) + int(length)])
 
+        self.expanding = None  # The after() id while expanding.
         self.is_dangerous = None
         self.after_idle(self.set_is_dangerous)
 
+    def set_text(self, s, numoflines, key=None):
+        """Store the text s the button stands for, and label the button.
+
+        If key is given, s is already in the spool with that key.
+        """
+        self.key = self.squeezer.spool.append(s) if key is None else key
+        self.length = len(s)
+        self.max_line_length = max(map(len, s.split('\n')))
+        self.numoflines = numoflines
+        line_plurality = "行" if numoflines != 1 else "行"
+        self["text"] = f"输出已被折叠（共{numoflines}{line_plurality}）"
+
+    @property
+    def s(self):
+        "The original text, read back from the Squeezer's spool."
+        return self.squeezer.spool.read(self.key)
+
+    @property
+    def base_text(self):
+        "The filter to change text before the iomark with; see Squeezer."
+        return self.editwin.undo.delegate
+
     def set_is_dangerous(self):
+        # Expanding is done in chunks, but the Text widget slows down
+        # on very long lines however they were inserted.
         dangerous_line_len = 50 * self.text.winfo_width()
-        self.is_dangerous = (
-            self.numoflines > 1000 or
-            len(self.s) > 50000 or
-            any(
-                len(line_match.group(0)) >= dangerous_line_len
-                for line_match in re.finditer(r'[^\n]+', self.s)
-            )
-        )
+        self.is_dangerous = self.max_line_length >= dangerous_line_len
 
     def expand(self, event=None):
         """expand event handler
@@ -141,30 +170,141 @@ class ExpandingButton(tk.Button):
         This inserts the original text in place of the button in the Text
         widget, removes the button and updates the Squeezer instance.
 
-        If the original text is dangerously long, i.e. expanding it could
-        cause a performance degradation, ask the user for confirmation.
+        The text is inserted chunk_size characters at a time, from after()
+        callbacks, while the button shows the progress.  Clicking the
+        button then cancels the rest, which stays squeezed.
+
+        If the original text has dangerously long lines, i.e. expanding it
+        could cause a performance degradation, ask the user for
+        confirmation.
         """
+        if self.expanding is not None:
+            return "break"
         if self.is_dangerous is None:
             self.set_is_dangerous()
         if self.is_dangerous:
             confirm = messagebox.askokcancel(
-                title="展开超多输出？",
+                title="展开超长的行？",
                 message="\n\n".join([
-                    "被折叠的输出非常大：%d行、%d个字符。",
+                    "被折叠的输出有超长的行：%d行、%d个字符。",
                     "将它展开可能导致 IDLE 卡顿或者停止响应。",
-                    "推荐右键查看或者复制，而不是直接展开。",
+                    "推荐右键查看、复制或者只展开前后几行，而不是全部展开。",
                     "真的要展开吗？"
-                ]) % (self.numoflines, len(self.s)),
+                ]) % (self.numoflines, self.length),
                 default=messagebox.CANCEL,
                 parent=self.text)
             if not confirm:
                 return "break"
 
-        index = self.text.index(self)
-        self.base_text.insert(index, self.s, self.tags)
-        self.base_text.delete(self)
-        self.editwin.on_squeezed_expand(index, self.s, self.tags)
-        self.squeezer.expandingbuttons.remove(self)
+        self.expanding_text = self.s
+        self.expanded = 0
+        self.start_mark = f"expand{id(self)}"
+        self.text.mark_set(self.start_mark, self)
+        self.text.mark_gravity(self.start_mark, "left")
+        self.bind("<Button-1>", self.cancel_expand)
+        self.expand_chunk()
+
+    def expand_chunk(self):
+        "Insert the next chunk of the text, ending at a newline if any."
+        s = self.expanding_text
+        start = self.expanded
+        end = start + self.chunk_size
+        if end < len(s):
+            end = s.rfind("\n", start, end) + 1 or end
+        else:
+            end = len(s)
+        self.base_text.insert(self.text.index(self), s[start:end], self.tags)
+        self.expanded = end
+        if end < len(s):
+            self["text"] = f"正在展开…{100 * end // len(s)}%（单击取消）"
+            self.expanding = self.after(1, self.expand_chunk)
+        else:
+            self.expanding = None
+            self.end_expand()
+
+    def cancel_expand(self, event=None):
+        "Stop expanding, leaving the text not yet inserted squeezed."
+        if self.expanding is not None:
+            self.after_cancel(self.expanding)
+            self.expanding = None
+            self.end_expand()
+        return "break"
+
+    def destroy(self):
+        "Extend Button.destroy() to stop expanding, with the Shell closing."
+        if self.expanding is not None:
+            self.after_cancel(self.expanding)
+            self.expanding = None
+        tk.Button.destroy(self)
+
+    def end_expand(self):
+        s, done = self.expanding_text, self.expanded
+        del self.expanding_text
+        self.unbind("<Button-1>")
+        index = self.text.index(self.start_mark)
+        self.text.mark_unset(self.start_mark)
+        if done == len(s):
+            self.base_text.delete(self)
+            self.editwin.on_squeezed_expand(index, s, self.tags)
+            self.squeezer.expandingbuttons.remove(self)
+        else:
+            self.editwin.on_squeezed_expand(index, s[:done], self.tags)
+            rest = s[done:]
+            self.set_text(rest, self.squeezer.count_lines(rest),
+                          self.squeezer.spool.slice(self.key, s, done))
+
+    def expand_first(self, event=None):
+        """expand first event handler
+
+        Ask for a number of lines and expand that many at the start of
+        the text, above the button.
+        """
+        self.expand_part(first=True)
+
+    def expand_last(self, event=None):
+        """expand last event handler
+
+        Ask for a number of lines and expand that many at the end of the
+        text, below the button.
+        """
+        self.expand_part(first=False)
+
+    def expand_part(self, first):
+        if self.expanding is not None:
+            return
+        numoflines = query.Goto(
+                self.text, "展开前几行" if first else "展开后几行",
+                "请输入要展开的行数：", text0=str(self.partial_lines)
+                ).result
+        if numoflines is None:
+            return
+        s = self.s
+        if first:
+            pos = 0
+            for _ in range(numoflines):
+                pos = s.find("\n", pos) + 1
+                if not pos:
+                    pos = len(s)
+                    break
+            shown, rest = s[:pos], s[pos:]
+            key = self.squeezer.spool.slice(self.key, s, pos)
+            index = self.text.index(self)
+        else:
+            pos = len(s) - s.endswith("\n")
+            for _ in range(numoflines):
+                pos = s.rfind("\n", 0, pos)
+                if pos < 0:
+                    pos = 0
+                    break
+            # The newline before the shown lines goes after the button.
+            rest, shown = s[:pos], s[pos:]
+            key = self.squeezer.spool.slice(self.key, s, 0, pos)
+            index = self.text.index(f"{self}+1c")
+        if not rest:
+            return self.expand()
+        self.base_text.insert(index, shown, self.tags)
+        self.editwin.on_squeezed_expand(index, shown, self.tags)
+        self.set_text(rest, self.squeezer.count_lines(rest), key)
 
     def copy(self, event=None):
         """copy event handler
@@ -184,6 +324,8 @@ class ExpandingButton(tk.Button):
 
     rmenu_specs = (
         # Item structure: (label, method_name).
+        ('展开前几行', 'expand_first'),
+        ('展开后几行', 'expand_last'),
         ('复制', 'copy'),
         ('查看', 'view'),
     )
@@ -216,21 +358,15 @@ class Squeezer:
 
         editwin is the shell's Editor window.
         self.text is the editor window text widget.
-        self.base_test is the actual editor window Tk text widget, rather than
-            EditorWindow's wrapper.
+        self.base_text is the filter below the shell's UndoDelegator, used
+            to change text before the iomark.
         self.expandingbuttons is the list of all buttons representing
             "squeezed" output.
+        self.spool keeps the text of the buttons.
         """
         self.editwin = editwin
         self.text = text = editwin.text
 
-        # Get the base Text widget of the PyShell object, used to change
-        # text before the iomark. PyShell deliberately disables changing
-        # text before the iomark via its 'text' attribute, which is
-        # actually a wrapper for the actual Text widget. Squeezer,
-        # however, needs to make such changes.
-        self.base_text = editwin.per.bottom
-
         # Twice the text widget's border width and internal padding;
         # pre-calculated here for the get_line_width() method.
         self.window_width_delta = 2 * (
@@ -239,6 +375,7 @@ class Squeezer:
         )
 
         self.expandingbuttons = []
+        self.spool = Spool()
 
         # Replace the PyShell instance's write method with a wrapper,
         # which inserts an ExpandingButton instead of a long text.
@@ -253,15 +390,19 @@ class Squeezer:
             # First, a very quick check to skip very short texts.
             if len(s) < auto_squeeze_min_lines:
                 return write(s, tags)
-            # Now the full line-count check.
-            numoflines = self.count_lines(s)
+            # Now the line-count check, which stops counting at the
+            # minimum, then the full count for the button.
+            numoflines = self.count_lines(s, auto_squeeze_min_lines)
             if numoflines < auto_squeeze_min_lines:
                 return write(s, tags)
+            numoflines = self.count_lines(s)
 
             # Create an ExpandingButton instance.
             expandingbutton = ExpandingButton(s, tags, numoflines, self)
 
-            # Insert the ExpandingButton into the Text widget.
+            # Insert the ExpandingButton into the Text widget, after any
+            # output held by write().
+            editwin.flush()
             text.mark_gravity("iomark", tk.RIGHT)
             text.window_create("iomark", window=expandingbutton,
                                padx=3, pady=5)
@@ -274,7 +415,18 @@ class Squeezer:
 
         editwin.write = mywrite
 
-    def count_lines(self, s):
+    @property
+    def base_text(self):
+        """The filter used to change text before the iomark.
+
+        PyShell deliberately disables changing text before the iomark
+        in its UndoDelegator.  Squeezer, however, needs to make such
+        changes, through the filter below it, so that the colorizer and
+        the parser below still see them.
+        """
+        return self.editwin.undo.delegate
+
+    def count_lines(self, s, limit=None):
         """Count the number of lines in a given text.
 
         Before calculation, the tab width and line length of the text are
@@ -284,8 +436,10 @@ class Squeezer:
         over linewidth characters long.
 
         Tabs are considered tabwidth characters long.
+
+        If limit is given, counting may stop once there are limit lines.
         """
-        return count_lines_with_wrapping(s, self.editwin.width)
+        return count_lines_with_wrapping(s, self.editwin.width, limit)
 
     def squeeze_current_text(self):
         """Squeeze the text block where the insertion cursor is.
@@ -293,6 +447,7 @@ class Squeezer:
         If the cursor is not in a squeezable block of text, give the
         user a small warning and do nothing.
         """
+        self.editwin.flush()
         # Set tag_name to the first valid tag found on the "insert" cursor.
         tag_names = self.text.tag_names(tk.INSERT)
         for tag_name in ("stdout", "stderr"):
@@ -21,6 +21,7 @@ from idlelib.delegator import Delegator
 class UndoDelegator(Delegator):
 
     max_undo = 1000
+    max_undo_chars = None  # If set, cap on characters kept for undo.
 
     def __init__(self):
         Delegator.__init__(self)
@@ -129,13 +130,24 @@ class UndoDelegator(Delegator):
         self.pointer = self.pointer + 1
         if len(self.undolist) > self.max_undo:
             ##print "truncating undo list"
-            del self.undolist[0]
-            self.pointer = self.pointer - 1
-            if self.saved >= 0:
-                self.saved = self.saved - 1
+            self.drop_oldest(1)
+        if self.max_undo_chars is not None:
+            size = 0
+            for i in range(len(self.undolist) - 1, -1, -1):
+                size += self.undolist[i].size()
+                if size > self.max_undo_chars:
+                    self.drop_oldest(i + 1)
+                    break
         self.can_merge = True
         self.check_saved()
 
+    def drop_oldest(self, count):
+        "Forget the first count commands of the undo list."
+        del self.undolist[:count]
+        self.pointer = self.pointer - count
+        if self.saved >= 0:
+            self.saved = max(self.saved - count, -1)
+
     def undo_event(self, event):
         if self.pointer == 0:
             self.bell()
@@ -192,6 +204,10 @@ class Command:
     def merge(self, cmd):
         return 0
 
+    def size(self):
+        "Return the number of characters kept to undo or redo."
+        return len(self.chars) if self.chars else 0
+
     def save_marks(self, text):
         marks = {}
         for name in text.mark_names():
@@ -321,6 +337,9 @@ class CommandSequence(Command):
     def getcmd(self, i):
         return self.cmds[i]
 
+    def size(self):
+        return sum(cmd.size() for cmd in self.cmds)
+
     def redo(self, text):
         for cmd in self.cmds:
             cmd.redo(text)